@@ -13,9 +13,12 @@ import random
 import logging
 from typing import Dict, List, Any, Set
 
+from signal_form_split_servers_and_configs.frame_clock import FrameClock
+
 class EigenmodeStreamServer:
-    def __init__(self, port: int = 7070):
+    def __init__(self, port: int = 7070, fps: float = 60.0):
         self.port = port
+        self.clock = FrameClock(fps)
         self.clients: Set[websockets.WebSocketServerProtocol] = set()
         self.running = True
         self.logger = logging.getLogger(__name__)
@@ -137,6 +140,8 @@ class EigenmodeStreamServer:
         error_count = 0
         max_errors = 100
 
+        self.clock.reset()
+
         self.logger.info("🌊 Data generator started")
 
         while self.running:
@@ -158,10 +163,12 @@ class EigenmodeStreamServer:
                 error_count = 0  # Reset error count on successful frame
 
                 if frame_count % 300 == 0:  # Log every 5 seconds at 60fps
-                    self.logger.info(f"🌊 Streamed {frame_count} frames, {len(self.clients)} clients")
+                    stats = self.clock.stats()
+                    self.logger.info(f"🌊 Streamed {frame_count} frames, {len(self.clients)} clients, "
+                                     f"{stats['skipped']} skipped, jitter p99 {stats['jitter_p99_ms']:.2f} ms")
 
-                # Maintain ~60 FPS
-                await asyncio.sleep(1/60.0)
+                # Hold the frame rate on absolute deadlines (overruns skip frames)
+                await self.clock.wait()
 
             except Exception as e:
                 error_count += 1
@@ -0,0 +1,75 @@
+# basis_cache.py
+# On-disk eigenbasis cache for SignalFormEngine
+# Requires: numpy
+#
+# Each basis is stored as two .npy files named after a hash of the graph and K:
+#   <key>.lambdas.npy   (K,)    eigenvalues, ascending
+#   <key>.modes.npy     (K, n)  eigenvectors, one row per mode
+# Loads use mmap_mode="r", so a warm start only maps the file and every engine
+# process on the host shares the same page-cache pages.
+import hashlib
+import os
+import tempfile
+from typing import Optional, Tuple
+
+import numpy as np
+
+CACHE_VERSION = 1
+
+
+def graph_key(nodes: int, edges, normalized: bool, K: int) -> str:
+    """Stable hex digest of the graph topology (nodes, edges, normalized) plus K.
+
+    `edges` is an (i, j, w) listing or a scipy.sparse adjacency; a sparse matrix is hashed
+    in canonical CSR form, so COO and CSR copies of one graph share an entry."""
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}|n={int(nodes)}|norm={bool(normalized)}|K={int(K)}|".encode())
+    if hasattr(edges, "tocsr"):
+        A = edges.tocsr(copy=True)
+        A.sum_duplicates()   # also sorts the column indices
+        h.update(b"csr|")
+        for arr in (A.indptr.astype(np.int64), A.indices.astype(np.int64), A.data.astype(np.float64)):
+            h.update(np.ascontiguousarray(arr).tobytes())
+        return h.hexdigest()[:32]
+    e = np.ascontiguousarray(np.asarray(edges, dtype=np.float64).reshape(-1, 3))
+    h.update(e.tobytes())
+    return h.hexdigest()[:32]
+
+
+def _paths(cache_dir: str, key: str) -> Tuple[str, str]:
+    base = os.path.join(os.path.expanduser(cache_dir), key)
+    return base + ".lambdas.npy", base + ".modes.npy"
+
+
+def load_basis(cache_dir: str, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Memory-map a cached (lambdas, modes_T) pair, or None if absent or unreadable."""
+    lam_path, modes_path = _paths(cache_dir, key)
+    try:
+        lambdas = np.load(lam_path, mmap_mode="r")
+        modes_T = np.load(modes_path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if lambdas.ndim != 1 or modes_T.ndim != 2 or modes_T.shape[0] != lambdas.shape[0]:
+        return None
+    return lambdas, modes_T
+
+
+def _atomic_save(path: str, arr: np.ndarray) -> None:
+    # write next to the target and rename, so concurrent readers never see a partial file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, arr)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def store_basis(cache_dir: str, key: str, lambdas: np.ndarray, modes_T: np.ndarray) -> None:
+    """Persist (lambdas, modes_T); modes are written first so lambdas mark a complete entry."""
+    os.makedirs(os.path.expanduser(cache_dir), exist_ok=True)
+    lam_path, modes_path = _paths(cache_dir, key)
+    _atomic_save(modes_path, np.ascontiguousarray(modes_T, dtype=np.float64))
+    _atomic_save(lam_path, np.ascontiguousarray(lambdas, dtype=np.float64))
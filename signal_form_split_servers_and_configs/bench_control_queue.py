@@ -0,0 +1,66 @@
+# bench_control_queue.py
+# Control-command throughput: parse + enqueue + apply at tick boundaries
+# Requires: numpy, scipy, fastapi (for --http)
+# Run:
+#   python bench_control_queue.py                    # 10k commands/s for 5 s
+#   python bench_control_queue.py --rate 50000 --batch 32 --http
+import argparse, time
+
+from engine_runner import EngineRunner, FPS, parse_control
+from engine_server import app
+
+
+def bench_in_process(rate, seconds, batch):
+    runner = EngineRunner()
+    per_tick = max(1, round(rate / FPS))
+    body = {"batch": [{"pulse": {"k": 3, "amp": 0.01, "decay": 0.5}}] * batch}
+    enq = step = 0.0
+    ticks = int(seconds * FPS)
+    for _ in range(ticks):
+        t0 = time.perf_counter()
+        for _ in range(max(1, per_tick // batch)):
+            cmds, at = parse_control(body)
+            runner.commands.push(cmds, at)
+        t1 = time.perf_counter()
+        runner.step()
+        step += time.perf_counter() - t1
+        enq += t1 - t0
+    idle = EngineRunner()
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        idle.step()
+    base = time.perf_counter() - t0
+    n = ticks * max(1, per_tick // batch) * batch
+    return n, enq, step, base, ticks
+
+
+def bench_http(n_requests, batch):
+    from fastapi.testclient import TestClient
+    client = TestClient(app)
+    body = [{"pulse": {"k": 3, "amp": 0.01, "decay": 0.5}}] * batch
+    t0 = time.perf_counter()
+    for _ in range(n_requests):
+        client.post("/control", json=body)
+    return n_requests * batch, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rate", type=int, default=10000, help="commands per second")
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--batch", type=int, default=1, help="commands per request")
+    ap.add_argument("--http", action="store_true", help="also time POST /control through TestClient")
+    args = ap.parse_args()
+
+    n, enq, step, base, ticks = bench_in_process(args.rate, args.seconds, args.batch)
+    print(f"{n} commands over {ticks} ticks ({n / args.seconds:.0f}/s offered, batch {args.batch})")
+    print(f"  parse+enqueue  {enq / n * 1e6:8.2f} us/command  ({n / enq:,.0f} commands/s)")
+    print(f"  tick with load {step / ticks * 1e3:8.3f} ms   idle tick {base / ticks * 1e3:.3f} ms"
+          f"   (budget {1e3 / FPS:.1f} ms)")
+    if args.http:
+        m, dt = bench_http(max(1, 2000 // args.batch), args.batch)
+        print(f"  POST /control  {dt / m * 1e6:8.2f} us/command  ({m / dt:,.0f} commands/s)")
+
+
+if __name__ == "__main__":
+    main()
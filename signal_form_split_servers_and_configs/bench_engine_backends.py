@@ -0,0 +1,62 @@
+# bench_engine_backends.py
+# Accuracy and per-tick cost of the eigenbasis vs Chebyshev engine backends
+# Requires: numpy, scipy
+# Run:
+#   python bench_engine_backends.py                 # default sizes
+#   python bench_engine_backends.py --sizes 1000 100000 --K 32 --order 64
+import argparse, time
+import numpy as np
+from scipy.sparse.linalg import expm_multiply
+
+from engine import GraphConfig, EngineConfig, SignalFormEngine, ChebyshevEngine, lowest_modes
+from graph_builder import ring_lattice
+
+
+def per_tick_ms(eng, s, reps):
+    eng.step(s)
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        eng.step(s)
+    return (time.perf_counter() - t0) / reps * 1e3
+
+
+def band_error(cheb, s):
+    # exact band energies from a full eigendecomposition (small graphs only)
+    w, V = lowest_modes(cheb.L, cheb.n, "dense")
+    proj = (V.T @ s) ** 2
+    edges = np.linspace(0.0, cheb.lambdas[-1] + (cheb.lambdas[1] - cheb.lambdas[0]) / 2, cheb.K + 1)
+    exact = np.histogram(w, bins=edges, weights=proj)[0]
+    return float(np.abs(cheb.band_energies(s) - exact).sum() / max(exact.sum(), 1e-12))
+
+
+def heat_error(eng, x0, t):
+    e = np.zeros(eng.n); e[x0] = 1.0
+    ref = expm_multiply(-t * eng.L, e)
+    return float(np.linalg.norm(eng.heat_kernel(x0, t) - ref) / np.linalg.norm(ref))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--K", type=int, default=32)
+    ap.add_argument("--order", type=int, default=64)
+    ap.add_argument("--t", type=float, default=5.0)
+    ap.add_argument("--reps", type=int, default=50)
+    args = ap.parse_args()
+
+    print(f"{'n':>8} {'backend':>10} {'init s':>8} {'tick ms':>8} {'heat err':>9} {'band err':>9}")
+    for n in args.sizes:
+        gcfg = GraphConfig(nodes=n, edges=ring_lattice(n), normalized=True)
+        s = np.random.default_rng(0).standard_normal(n)
+        for name, cls in (("eigen", SignalFormEngine), ("chebyshev", ChebyshevEngine)):
+            t0 = time.perf_counter()
+            eng = cls(gcfg, EngineConfig(K=args.K, cheb_order=args.order, backend=name))
+            init = time.perf_counter() - t0
+            tick = per_tick_ms(eng, s, args.reps)
+            herr = heat_error(eng, 0, args.t)
+            berr = band_error(eng, s) if name == "chebyshev" and n <= 2000 else float("nan")
+            print(f"{n:>8} {name:>10} {init:>8.2f} {tick:>8.3f} {herr:>9.2e} {berr:>9.2e}")
+
+
+if __name__ == "__main__":
+    main()
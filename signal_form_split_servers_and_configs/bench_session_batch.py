@@ -0,0 +1,48 @@
+# bench_session_batch.py
+# Per-tick cost of S sessions: one EngineRunner each vs one SessionBatch
+# Requires: numpy, scipy
+# Run:
+#   python bench_session_batch.py                          # 10..1000 sessions, n=256, K=32
+#   python bench_session_batch.py --sessions 100 500 --n 1024 --K 64
+import argparse, time
+
+from engine_runner import EngineRunner, FPS
+from session_batch import SessionBatch
+
+
+def per_tick_ms(step, reps):
+    step()
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        step()
+    return (time.perf_counter() - t0) / reps * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, nargs="+", default=[10, 100, 300, 1000])
+    ap.add_argument("--n", type=int, default=256)
+    ap.add_argument("--K", type=int, default=32)
+    ap.add_argument("--pulses", type=int, default=4, help="live pulses per session")
+    ap.add_argument("--reps", type=int, default=30)
+    ap.add_argument("--separate-max", type=int, default=300, help="skip the per-runner loop above this many sessions")
+    args = ap.parse_args()
+
+    print(f"{'sessions':>8} {'separate ms':>12} {'batched ms':>11} {'speedup':>8}   (budget {1e3 / FPS:.1f} ms)")
+    for S in args.sessions:
+        batch = SessionBatch(n=args.n, K=args.K, capacity=S)
+        for i in range(S):
+            batch.add(i)
+            batch.apply(i, [("pulse", (i + j) % args.K, 0.5, 0.999) for j in range(args.pulses)])
+        batched = per_tick_ms(batch.step, args.reps)
+        separate = float("nan")
+        if S <= args.separate_max:
+            runners = [EngineRunner(n=args.n, K=args.K) for _ in range(S)]
+            for i, r in enumerate(runners):
+                r.apply([("pulse", (i + j) % args.K, 0.5, 0.999) for j in range(args.pulses)])
+            separate = per_tick_ms(lambda: [r.step() for r in runners], max(1, args.reps // 10))
+        print(f"{S:>8} {separate:>12.2f} {batched:>11.2f} {separate / batched:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# chebyshev.py
+# Chebyshev-polynomial spectral filters on a sparse graph Laplacian
+# Requires: numpy, scipy
+#
+# With L~ = (2 / lam_max) L - I (spectrum mapped into [-1, 1]) a spectral filter
+# h(L) is approximated by sum_j a_j T_j(L~). Applying it costs one sparse
+# matvec per order, and never needs an eigenbasis:
+#   apply()    h(L) v through the three-term recurrence
+#   moments()  mu_j = s . T_j(L~) s, so s . h(L) s = sum_j a_j mu_j (KPM);
+#              the doubling identities give 2M moments from M matvecs
+import math
+from typing import Callable
+
+import numpy as np
+import scipy.sparse as sp
+
+
+def spectral_bound(L: sp.spmatrix, normalized: bool) -> float:
+    """Upper bound on the Laplacian spectrum (2 if normalized, Gershgorin otherwise)."""
+    if normalized:
+        return 2.0
+    return max(2.0 * float(L.diagonal().max(initial=0.0)), 1e-12)
+
+
+def jackson_damping(M: int) -> np.ndarray:
+    """Jackson kernel weights g_0..g_M; suppress Gibbs ringing of truncated expansions."""
+    j = np.arange(M + 1)
+    q = math.pi / (M + 2)
+    return ((M + 2 - j) * np.cos(j * q) + np.sin(j * q) / math.tan(q)) / (M + 2)
+
+
+def band_coefficients(lo: np.ndarray, hi: np.ndarray, M: int, lam_max: float) -> np.ndarray:
+    """(bands, M + 1) Jackson-damped coefficients of the indicators of [lo_k, hi_k]."""
+    a = np.arccos(np.clip(2.0 * np.asarray(hi, dtype=np.float64) / lam_max - 1.0, -1.0, 1.0))[:, None]
+    b = np.arccos(np.clip(2.0 * np.asarray(lo, dtype=np.float64) / lam_max - 1.0, -1.0, 1.0))[:, None]
+    j = np.arange(1, M + 1)[None, :]
+    coef = np.empty((a.shape[0], M + 1))
+    coef[:, :1] = (b - a) / math.pi
+    coef[:, 1:] = 2.0 * (np.sin(j * b) - np.sin(j * a)) / (j * math.pi)
+    return coef * jackson_damping(M)[None, :]
+
+
+def function_coefficients(f: Callable[[np.ndarray], np.ndarray], M: int, lam_max: float) -> np.ndarray:
+    """Chebyshev interpolant coefficients of f(lambda) on [0, lam_max]."""
+    return np.polynomial.chebyshev.chebinterpolate(lambda x: f((x + 1.0) * 0.5 * lam_max), M)
+
+
+def scaled_operator(L: sp.spmatrix, lam_max: float) -> sp.csr_matrix:
+    """L~ = (2 / lam_max) L - I as CSR; build once and pass to apply()/moments()."""
+    return (L * (2.0 / lam_max) - sp.identity(L.shape[0], format="csr")).tocsr()
+
+
+def apply(Ls: sp.csr_matrix, coef: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """sum_j coef[j] T_j(L~) v for a prescaled operator Ls."""
+    t0 = v
+    out = coef[0] * t0
+    if len(coef) == 1:
+        return out
+    t1 = Ls @ v
+    out = out + coef[1] * t1
+    for a in coef[2:]:
+        t0, t1 = t1, 2.0 * (Ls @ t1) - t0
+        out += a * t1
+    return out
+
+
+def moments(Ls: sp.csr_matrix, s: np.ndarray, M: int) -> np.ndarray:
+    """mu_0..mu_M of s for a prescaled operator, using ceil(M / 2) matvecs."""
+    mu = np.empty(M + 1)
+    t0 = s
+    t1 = Ls @ s
+    mu[0] = s @ s
+    if M >= 1:
+        mu[1] = s @ t1
+    # T_{2j} = 2 T_j^2 - T_0 and T_{2j+1} = 2 T_{j+1} T_j - T_1
+    half = (M + 1) // 2
+    for j in range(1, half + 1):
+        if 2 * j <= M:
+            mu[2 * j] = 2.0 * (t1 @ t1) - mu[0]
+        if 2 * j + 1 <= M:
+            t2 = 2.0 * (Ls @ t1) - t0
+            mu[2 * j + 1] = 2.0 * (t2 @ t1) - mu[1]
+            t0, t1 = t1, t2
+        else:
+            break
+    return mu
@@ -4,31 +4,31 @@
 # Run:
 #   pip install fastapi uvicorn numpy scipy
 #   python collaborative_engine_server.py
-import asyncio, json, math, time, uuid
-from typing import Dict, Any, List, Set
-import numpy as np
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import asyncio, contextlib, json, time, uuid
+from typing import Any, Dict, List, Optional, Set, Union
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.responses import PlainTextResponse
 import uvicorn
 
 try:
-    from engine import GraphConfig, EngineConfig, SignalFormEngine
-except Exception:
-    # Minimal fallback engine if engine.py isn't present
-    GraphConfig = object
-    EngineConfig = object
-    class SignalFormEngine:
-        def __init__(self, *a, **k): self.K=32; self.modes=np.eye(32); self._t=0.0
-        def step(self, s, kx=1, ky=2):
-            self._t+=1/60
-            c = np.fft.rfft(s)[:self.K]
-            S = {"U":0.5,"F":0.5,"blend":0.5}
-            return {"S":S,"stokes":{"S0":1,"S1":0,"S2":0,"S3":0,"pair":[1,2]},
-                    "entropy":0.4,"R":float(np.random.rand()),
-                    "green":{"x0":0,"t":0.12,"summary":{"radius":12}},
-                    "lambdas":[0]*8}
-
-HOST="0.0.0.0"; PORT=7070; FPS=60.0
+    from engine_runner import FPS, EngineRunner, parse_control
+    from field_schedule import load_rates
+    from frame_clock import FrameClock
+    from frame_ring import FrameRing
+    from send_queue import ConnectionSender, SendQueueClosed
+    from telemetry_codec import EncodedFrame
+except ImportError:
+    from .engine_runner import FPS, EngineRunner, parse_control
+    from .field_schedule import load_rates
+    from .frame_clock import FrameClock
+    from .frame_ring import FrameRing
+    from .send_queue import ConnectionSender, SendQueueClosed
+    from .telemetry_codec import EncodedFrame
+
+HOST="0.0.0.0"; PORT=7070
+RING_CAPACITY = 120   # ~2 s of frames at 60 FPS
+# Per-field update rates in Hz ("telemetry_rates" in microfiche_config.json); unlisted fields run at FPS.
+FIELD_RATES = load_rates()
 
 # Collaborative Session Management
 class User:
@@ -42,6 +42,15 @@ class User:
         self.cursor_y = 0.5
         self.last_activity = time.time()
         self.connected_at = time.time()
+        # set by /telemetry; without one (e.g. tests) events go straight to the socket
+        self.outbox: Optional[ConnectionSender] = None
+
+    async def send(self, text: str):
+        """Deliver a control/presence event (lossless, never blocks on a slow link)."""
+        if self.outbox is not None:
+            self.outbox.put(text)
+        else:
+            await self.websocket.send_text(text)
 
     def _generate_color(self):
         """Generate a consistent color based on user_id"""
@@ -83,18 +92,20 @@ class CollaborativeSession:
 
     async def broadcast_to_others(self, sender_id: str, message: dict):
         """Broadcast message to all users in session except sender"""
-        for user_id, user in self.users.items():
+        text = json.dumps(message)
+        for user_id, user in list(self.users.items()):
             if user_id != sender_id:
                 try:
-                    await user.websocket.send_text(json.dumps(message))
+                    await user.send(text)
                 except Exception as e:
                     print(f"Failed to send to user {user_id}: {e}")
 
     async def broadcast_to_all(self, message: dict):
         """Broadcast message to all users in session"""
-        for user_id, user in self.users.items():
+        text = json.dumps(message)
+        for user_id, user in list(self.users.items()):
             try:
-                await user.websocket.send_text(json.dumps(message))
+                await user.send(text)
             except Exception as e:
                 print(f"Failed to broadcast to user {user_id}: {e}")
 
@@ -155,67 +166,60 @@ class CollaborationManager:
             return session.users.get(user_id)
         return None
 
-def ring_lattice(n: int, k: int = 2, w: float = 1.0):
-    edges = []
-    for i in range(n):
-        for d in range(1, k+1):
-            j1 = (i + d) % n
-            j2 = (i - d) % n
-            edges.append((i, j1, w))
-            edges.append((i, j2, w))
-    return edges
-
-class EngineRunner:
-    def __init__(self, n=256, K=32, x0=0, t_heat=0.12):
-        try:
-            gcfg = GraphConfig(nodes=n, edges=ring_lattice(n), normalized=True)
-            ecfg = EngineConfig(K=K, x0=x0, t_heat=t_heat, alpha_white=0.5, smooth=0.2)
-            self.eng = SignalFormEngine(gcfg, ecfg)
-            self.K = K
-        except Exception:
-            self.eng = SignalFormEngine()
-            self.K = getattr(self.eng, "K", 32)
-        self.dt = 1.0/FPS
-        self.omega = 2*math.pi*0.2
-        self.phi = 0.0
-        self.active_modes = [0,1,2,5,8,13]
-        self.amps = np.linspace(1.0, 0.2, num=len(self.active_modes))
-        self.t = 0.0
-        self.pmw = 0.5
-        self._pulses: List[Dict[str, Any]] = []
-
-    def add_pulse(self, k:int, amp:float, decay:float):
-        self._pulses.append({"k": max(0, min(int(k), self.K-1)), "amp": float(amp), "decay": float(decay), "ttl": 1.0})
-
-    def step(self):
-        # synthetic modal vector
-        c = np.zeros(self.K, dtype=np.complex128)
-        self.phi += self.omega*self.dt
-        for a_idx, k_idx in enumerate(self.active_modes):
-            mag = self.amps[a_idx] * (0.75 + 0.25*math.sin(self.phi + a_idx))
-            phase = self.phi*(1+a_idx*0.1)
-            c[k_idx] = mag * complex(math.cos(phase), math.sin(phase))
-        for p in list(self._pulses):
-            k=p["k"]; c[k] += p["amp"]*p["ttl"]; p["ttl"] *= p["decay"]
-            if p["ttl"]<1e-3: self._pulses.remove(p)
-        c[0] += 0.3*self.pmw
-        # project back to a node field to feed engine
-        s = np.real(np.fft.irfft(np.pad(c, (0, max(0, 64-len(c))), constant_values=0)))[:64]
-        tel = self.eng.step(s, kx=1, ky=2)
-        tel["pmw"] = self.pmw; tel["time"] = self.t
-        self.t += self.dt
-        return tel
-
 app = FastAPI()
-runner = EngineRunner()
+runner = EngineRunner(rates=FIELD_RATES)
+ring = FrameRing(RING_CAPACITY)
+clock = FrameClock(FPS)
 collaboration_manager = CollaborationManager()
 
+async def tick_loop():
+    # one simulation clock; each frame is encoded once and spliced per session
+    clock.reset()
+    while True:
+        try:
+            frame = EncodedFrame(runner.step(), ring.seq + 1, runner.held)
+            ring.publish(frame)
+            for on_applied in runner.applied:
+                on_applied(frame.seq, frame.tel["time"])
+        except Exception as e:
+            print(f"Engine tick error: {e}")
+        # absolute deadlines: step/encode time does not stretch the frame period
+        await clock.wait()
+
+def ensure_tick_task():
+    task = getattr(app.state, "tick_task", None)
+    if task is None or task.done():
+        app.state.tick_task = asyncio.create_task(tick_loop())
+
+@app.on_event("startup")
+async def start_tick():
+    ensure_tick_task()
+
+@app.on_event("shutdown")
+async def stop_tick():
+    task = getattr(app.state, "tick_task", None)
+    if task:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    app.state.tick_task = None
+
 @app.get("/", response_class=PlainTextResponse)
-def root(): return "Collaborative Engine Server OK. WS: /telemetry  POST /control"
+def root(): return "Collaborative Engine Server OK. WS: /telemetry  POST /control  GET /clock  GET /connections"
+
+@app.get("/clock")
+def clock_stats(): return clock.stats()
+
+@app.get("/connections")
+def connection_stats():
+    return [dict(u.outbox.stats(), user_id=u.user_id, session_id=sid)
+            for sid, s in list(collaboration_manager.sessions.items())
+            for u in list(s.users.values()) if u.outbox is not None]
 
 @app.websocket("/telemetry")
 async def telemetry(ws: WebSocket, session_id: str = None, user_id: str = None):
     await ws.accept()
+    ensure_tick_task()   # also covers servers started with lifespan="off"
 
     # Generate user ID if not provided
     if not user_id:
@@ -223,11 +227,12 @@ async def telemetry(ws: WebSocket, session_id: str = None, user_id: str = None):
 
     # Create user and add to session
     user = User(user_id, ws, session_id)
+    user.outbox = ConnectionSender(ws, name=user_id).start()
     actual_session_id = collaboration_manager.add_user_to_session(user, session_id)
     session = collaboration_manager.get_session(user_id)
 
     # Send initial connection confirmation
-    await ws.send_text(json.dumps({
+    await user.send(json.dumps({
         "type": "connection_established",
         "user_info": user.to_dict(),
         "session_id": actual_session_id,
@@ -255,20 +260,22 @@ async def telemetry(ws: WebSocket, session_id: str = None, user_id: str = None):
     try:
         # Start telemetry and message handling
         async def send_telemetry():
+            seq = 0
             while True:
-                tel = runner.step()
-                tel["type"] = "telemetry"
-                tel["session_id"] = actual_session_id
+                seq, frame = await ring.next_after(seq)
+                extras = {"type": "telemetry", "session_id": actual_session_id}
 
                 # Add collaborative info
+                users_count = len(session.users) if session else 0
                 if session:
-                    tel["collaboration"] = {
-                        "users_count": len(session.users),
+                    extras["collaboration"] = {
+                        "users_count": users_count,
                         "session_id": actual_session_id
                     }
 
-                await ws.send_text(json.dumps(tel))
-                await asyncio.sleep(1.0/FPS)
+                # encoded once per tick per (session, users_count), shared by its members;
+                # drop-oldest, so a slow member only loses its own frames
+                user.outbox.offer(frame.text_with((actual_session_id, users_count), extras))
 
         async def handle_messages():
             while True:
@@ -283,7 +290,7 @@ async def telemetry(ws: WebSocket, session_id: str = None, user_id: str = None):
         # Run both tasks concurrently
         await asyncio.gather(send_telemetry(), handle_messages())
 
-    except WebSocketDisconnect:
+    except (WebSocketDisconnect, SendQueueClosed):
         pass
     finally:
         # Clean up user on disconnect
@@ -309,6 +316,7 @@ async def telemetry(ws: WebSocket, session_id: str = None, user_id: str = None):
             })
 
         collaboration_manager.remove_user(user_id)
+        await user.outbox.close()
 
 async def handle_collaborative_message(user_id: str, message: dict):
     """Handle collaborative messages from clients"""
@@ -320,7 +328,21 @@ async def handle_collaborative_message(user_id: str, message: dict):
 
     message_type = message.get("type")
 
-    if message_type == "cursor_move":
+    if message_type == "control":
+        # engine control over the telemetry socket, acked with the tick it took effect on
+        msg_id = message.get("id")
+        try:
+            cmds, at = parse_control(message)
+        except (AttributeError, TypeError, ValueError) as e:
+            await user.send(json.dumps({"type": "ack", "id": msg_id, "error": str(e)}))
+            return
+        def on_applied(tick: int, t: float):
+            if user.outbox is not None:
+                with contextlib.suppress(SendQueueClosed):
+                    user.outbox.put(json.dumps({"type": "ack", "id": msg_id, "tick": tick, "time": t}))
+        runner.commands.push(cmds, at, on_applied)
+
+    elif message_type == "cursor_move":
         # Update user cursor position and broadcast to others
         user.cursor_x = max(0.0, min(1.0, float(message.get("x", 0.5))))
         user.cursor_y = max(0.0, min(1.0, float(message.get("y", 0.5))))
@@ -385,12 +407,14 @@ async def handle_collaborative_message(user_id: str, message: dict):
         })
 
 @app.post("/control")
-async def control(body: Dict[str, Any]):
-    setv = body.get("set", {})
-    if "pmw" in setv: runner.pmw = float(setv["pmw"])
-    p = body.get("pulse")
-    if p: runner.add_pulse(p.get("k",0), p.get("amp",0.5), p.get("decay",0.95))
-    return {"ok": True, "pmw": runner.pmw, "pulses": len(runner._pulses)}
+async def control(body: Union[Dict[str, Any], List[Dict[str, Any]]]):
+    # queued, not applied: the next step() (or the first one at/after "at") applies the batch whole
+    try:
+        cmds, at = parse_control(body)
+    except (AttributeError, TypeError, ValueError) as e:
+        raise HTTPException(400, str(e))
+    runner.commands.push(cmds, at)
+    return {"ok": True, "queued": len(cmds), "at": at, "pmw": runner.pmw, "pulses": len(runner.pulses)}
 
 if __name__ == "__main__":
     print("🤝 Starting Collaborative Engine Server...")
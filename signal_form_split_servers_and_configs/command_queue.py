@@ -0,0 +1,51 @@
+# command_queue.py
+# Control commands queued by request handlers and applied by EngineRunner.step()
+#
+# Producers (HTTP handlers, WebSocket readers, MIDI threads) only ever append to
+# a deque; append and popleft are atomic in CPython, so neither side takes a
+# lock. The tick drains the inbox once, parks future-dated entries in a heap
+# keyed on engine time, and returns everything due: scheduled entries in
+# (time, arrival) order first, then immediate entries in arrival order.
+import heapq
+import itertools
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+OnApplied = Optional[Callable[[int, float], None]]
+Entry = Tuple[Any, OnApplied]
+
+
+class CommandQueue:
+    def __init__(self):
+        self._inbox: Deque[Tuple[Optional[float], Any, OnApplied]] = deque()
+        self._scheduled: List[Tuple[float, int, Any, OnApplied]] = []
+        self._order = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._inbox) + len(self._scheduled)
+
+    def push(self, cmds: Any, at: Optional[float] = None, on_applied: OnApplied = None) -> None:
+        """Queue a validated command batch for the next tick, or for the first tick with time >= at."""
+        self._inbox.append((at, cmds, on_applied))
+
+    def drain(self, now: float) -> List[Entry]:
+        """Batches due at engine time `now`; call once per tick, from the tick only."""
+        immediate = []
+        inbox = self._inbox
+        for _ in range(len(inbox)):   # anything appended meanwhile waits for the next tick
+            at, cmds, on_applied = inbox.popleft()
+            if at is None or at <= now:
+                immediate.append((cmds, on_applied))
+            else:
+                heapq.heappush(self._scheduled, (at, next(self._order), cmds, on_applied))
+        due = []
+        sched = self._scheduled
+        while sched and sched[0][0] <= now:
+            _, _, cmds, on_applied = heapq.heappop(sched)
+            due.append((cmds, on_applied))
+        due.extend(immediate)
+        return due
+
+    def clear(self) -> None:
+        self._inbox.clear()
+        self._scheduled.clear()
@@ -0,0 +1,60 @@
+# engine_process.py
+# The one authoritative simulation, published on a shared-memory frame bus
+# Requires: numpy, scipy (fastapi and uvicorn for the workers)
+# Run:
+#   python engine_process.py --bus signalform &
+#   SIGNAL_FORM_BUS=signalform uvicorn engine_server:app --host 0.0.0.0 --port 7070 --workers 8
+#
+# This process runs engine_server's tick loop (FrameClock, quality governor,
+# recorder) but has no viewers: each frame is encoded once and written into
+# the bus (frame_bus.py). The uvicorn workers map the bus, forward frames to
+# their WebSocket viewers and send /control batches and field subscriptions
+# back over the bus's control socket, so viewer capacity grows with the worker
+# count while every viewer sees the same simulation.
+import argparse, asyncio, contextlib, os, signal
+
+try:
+    import engine_server as es
+    from frame_bus import BUS_SLOTS, ControlServer, FrameBusWriter, control_address
+    from telemetry_log import LogWriter
+except ImportError:
+    from . import engine_server as es
+    from .frame_bus import BUS_SLOTS, ControlServer, FrameBusWriter, control_address
+    from .telemetry_log import LogWriter
+
+BUS_NAME = os.environ.get("SIGNAL_FORM_BUS") or "signalform"
+
+
+async def run(name: str = BUS_NAME, slots: int = BUS_SLOTS):
+    if not isinstance(es.runner, es.EngineRunner):
+        es.runner = es.EngineRunner(rates=es.FIELD_RATES)   # SIGNAL_FORM_BUS was exported for us too
+    bus = es.app.state.bus = FrameBusWriter(name, slots)
+    control = ControlServer(control_address(name), es.runner, bus.authkey,
+                            stats=lambda: {"clock": es.clock.stats(), "quality": es.governor.stats()})
+    if es.RECORD_PATH:
+        es.app.state.recorder = LogWriter(os.path.expanduser(es.RECORD_PATH))
+        es.runner.subscriptions.set("recorder", None)
+    with contextlib.suppress(NotImplementedError):   # clean shutdown on SIGTERM too
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    try:
+        await es.tick_loop()
+    finally:
+        control.close()
+        es.app.state.bus = None
+        bus.close()
+        rec = getattr(es.app.state, "recorder", None)
+        if rec is not None:
+            rec.close()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--bus", default=BUS_NAME, help="shared-memory block name (SIGNAL_FORM_BUS for the workers)")
+    ap.add_argument("--slots", type=int, default=BUS_SLOTS)
+    args = ap.parse_args()
+    with contextlib.suppress(KeyboardInterrupt, asyncio.CancelledError):
+        asyncio.run(run(args.bus, args.slots))
+
+
+if __name__ == "__main__":
+    main()
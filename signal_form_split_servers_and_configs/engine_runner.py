@@ -0,0 +1,325 @@
+# engine_runner.py
+# EngineRunner: synthetic signal, control batches and engine tick, shared by
+# engine_server.py, collaborative_engine_server.py and the offline tools
+# Requires: numpy, scipy
+#
+# Importing this builds no app and no engine; each server creates its own
+# runner, and render_telemetry.py / session_batch.py use EngineRunner headless.
+import dataclasses, math, os
+from typing import Any, Dict, List, Optional, Tuple, Union
+import numpy as np
+
+try:
+    from command_queue import CommandQueue
+    from field_schedule import FieldSchedule, FieldSubscriptions
+    from pulse_bank import PulseBank
+except ImportError:
+    from .command_queue import CommandQueue
+    from .field_schedule import FieldSchedule, FieldSubscriptions
+    from .pulse_bank import PulseBank
+
+try:
+    try:
+        from engine import GraphConfig, EngineConfig, OUTPUT_FIELDS, SignalFormEngine, create_engine
+        from topology import BUILDER, build_graph, coarse_topology, parse_topology
+    except ImportError:
+        # imported as signal_form_split_servers_and_configs.engine_runner
+        from .engine import GraphConfig, EngineConfig, OUTPUT_FIELDS, SignalFormEngine, create_engine
+        from .topology import BUILDER, build_graph, coarse_topology, parse_topology
+except Exception:
+    # Minimal fallback engine if engine.py isn't present
+    GraphConfig = object
+    EngineConfig = object
+    OUTPUT_FIELDS = ("S", "stokes", "entropy", "R", "green", "lambdas")
+    class SignalFormEngine:
+        def __init__(self, *a, **k): self.K=32; self.modes=np.eye(32); self._t=0.0
+        def step(self, s, kx=1, ky=2, fields=None):
+            self._t+=1/60
+            c = np.fft.rfft(s)[:self.K]
+            S = {"U":0.5,"F":0.5,"blend":0.5}
+            return {"S":S,"stokes":{"S0":1,"S1":0,"S2":0,"S3":0,"pair":[1,2]},
+                    "entropy":0.4,"R":float(np.random.rand()),
+                    "green":{"x0":0,"t":0.12,"summary":{"radius":12}},
+                    "lambdas":[0]*8}
+    create_engine = SignalFormEngine
+    BUILDER = None
+    def parse_topology(spec): raise ValueError("topology changes need engine.py")
+
+FPS = 60.0
+ANALYTIC_FIELDS = frozenset(OUTPUT_FIELDS)   # frozen from quality level 2: the engine then computes only c
+TOPOLOGY_FADE = 30    # frames over which c crossfades from the old graph to a new one
+# Memory-mapped eigenbasis cache shared by all engine processes; set to "" to disable.
+BASIS_CACHE_DIR = os.environ.get("SIGNAL_FORM_BASIS_CACHE", "~/.cache/signal_form/basis")
+
+if np.lib.NumpyVersion(np.__version__) >= "2.0.0":
+    def irfft_into(spec, n, out): return np.fft.irfft(spec, n=n, out=out)
+else:
+    def irfft_into(spec, n, out): return np.fft.irfft(spec, n=n)
+
+class EngineRunner:
+    def __init__(self, n=256, K=32, x0=0, t_heat=0.12, backend="eigen", rates=None):
+        try:
+            self.topology = {"kind": "ring", "n": n, "k": 2}
+            gcfg = build_graph(self.topology)
+            ecfg = EngineConfig(K=K, x0=x0, t_heat=t_heat, alpha_white=0.5, smooth=0.2,
+                                cache_dir=BASIS_CACHE_DIR or None, backend=backend)
+            self.eng = create_engine(gcfg, ecfg)
+            self.K = self.eng.K
+        except Exception:
+            self.eng = SignalFormEngine()
+            self.K = getattr(self.eng, "K", 32)
+            self.topology = None
+        self.n = getattr(self.eng, "n", 64)
+        self.dt = 1.0/FPS
+        self.omega = 2*math.pi*0.2
+        self.phi = 0.0
+        self.active_modes = [0,1,2,5,8,13]
+        self.amps = np.linspace(1.0, 0.2, num=len(self.active_modes))
+        self.t = 0.0
+        self.frame = 0   # index of the next step(); t == frame*dt
+        self.pmw = 0.5
+        self.pulses = PulseBank()
+        # control batches from /control and the telemetry socket, applied at the top of step()
+        self.commands = CommandQueue()
+        self.applied = []   # on_applied callbacks of the batches the last step() applied
+        # slow fields are recomputed at their own rate and held in between
+        self.schedule = FieldSchedule(rates, FPS)
+        self.held = ()   # fields the last step() carried over at their rate (left out of the JSON text)
+        # fields connected viewers watch; outputs outside their union are not computed
+        self.subscriptions = FieldSubscriptions()
+        self._want = None
+        # quality_governor level and what it currently switches off
+        self.quality = 0
+        self.send_modes = self.K   # leading modes of c sent per frame
+        self.stride = 1            # frames of engine time per step()
+        self.coarse = None         # half-size graph engine, see build_coarse()
+        self._full = None          # the full engine while the coarse one is in use
+        # topology swaps: engines built on topology.BUILDER, switched in at a tick boundary
+        self._next_topology = None   # Future of (spec, engine, coarse engine or None)
+        self._fade = None            # (previous engine, frames left) while c crossfades
+        # preallocated tick buffers: step() reuses these instead of allocating per frame
+        self._active = np.asarray(self.active_modes, dtype=np.intp)
+        self._offsets = np.arange(len(self._active), dtype=np.float64)
+        self._phase_mul = 1.0 + 0.1*self._offsets
+        self._mag = np.empty(len(self._active)); self._ph = np.empty(len(self._active))
+        self._tmp = np.empty(len(self._active))
+        self._spec = np.zeros(max(self.n//2 + 1, self.K), dtype=np.complex128)
+        self._s = np.empty(self.n)
+
+    def add_pulse(self, k:int, amp:float, decay:float):
+        self.pulses.add(max(0, min(int(k), self.K-1)), float(amp), float(decay), born=self.frame)
+
+    # The synthetic field is closed-form in the frame index m: phi = omega*dt*(m+1)
+    # and every pulse is amp*decay**(m - born), so any frame can be evaluated directly.
+    def frame_of(self, t):
+        return np.rint(np.asarray(t, dtype=np.float64) / self.dt).astype(np.int64)
+
+    def modal_at(self, times):
+        """(T, K) synthetic modal vectors at engine times `times` (rounded to frames), at the current pmw."""
+        m = np.atleast_1d(self.frame_of(times))
+        phi = (self.omega*self.dt) * (m + 1.0)
+        mag = self.amps * (0.75 + 0.25*np.sin(phi[:, None] + self._offsets))
+        c = np.zeros((len(m), self.K), dtype=np.complex128)
+        c[:, self._active] = mag * np.exp(1j * phi[:, None] * self._phase_mul)
+        c.real += self.pulses.modal_at(m, self.K)
+        c[:, 0] += 0.3*self.pmw
+        return c
+
+    def render(self, times):
+        """Batch of frames at arbitrary times in one vectorized call: {"time", "c", "s"} with a leading T axis."""
+        c = self.modal_at(times)
+        return {"time": np.atleast_1d(self.frame_of(times)) * self.dt, "c": c,
+                "s": np.fft.irfft(c, n=self.n, axis=1)}
+
+    def state_at(self, t):
+        """Modal vector and node field at engine time t, without stepping."""
+        r = self.render([t])
+        return {"time": float(r["time"][0]), "c": r["c"][0], "s": r["s"][0]}
+
+    def seek(self, t):
+        """Jump to engine time t in O(K + pulses); the next step() renders that frame."""
+        self.frame = max(0, int(self.frame_of(t)))
+        self.t = self.frame*self.dt
+        self.phi = self.omega*self.dt*self.frame
+        self.pulses.seek(self.frame)
+        self.schedule.invalidate()
+        self._fade = None
+        if hasattr(self.eng, "reset"):
+            self.eng.reset()
+
+    def build_coarse(self):
+        """Build the half-size graph engine used from quality level 3; slow, so run it off the tick loop."""
+        if self.coarse is None:
+            spec = self.topology
+            coarse = self._build_coarse(spec, self._full or self.eng)
+            if self.topology is spec:   # a topology switch meanwhile settled the coarse engine itself
+                self.coarse = coarse
+        return self.coarse
+
+    def _build_coarse(self, spec, full):
+        spec = coarse_topology(spec) if spec is not None and hasattr(full, "cfg") else None
+        if spec is None:
+            return None
+        gcfg = build_graph(spec)
+        if gcfg.nodes <= self.K + 1:
+            return None
+        return create_engine(gcfg, dataclasses.replace(full.cfg, x0=full.cfg.x0 * gcfg.nodes // full.n))
+
+    def set_topology(self, spec):
+        """Start building engines for a parse_topology() spec in the background; step() switches
+        to them once ready. A newer request supersedes one still building."""
+        if BUILDER is None:
+            return
+        if self._next_topology is not None:
+            self._next_topology.cancel()
+        self._next_topology = BUILDER.submit(self._build_topology, spec, self.coarse is not None)
+
+    def _build_topology(self, spec, with_coarse):
+        # runs on topology.BUILDER while the current engine keeps ticking
+        base = self._full or self.eng
+        gcfg = build_graph(spec)
+        # runtime graphs are one-offs: keep them (and their coarse engine) out of the disk basis cache
+        eng = create_engine(gcfg, dataclasses.replace(base.cfg, x0=base.cfg.x0 * gcfg.nodes // base.n,
+                                                      cache_dir=None))
+        if eng.K != self.K:
+            raise ValueError(f"{gcfg.nodes}-node graph has only {eng.K} of the {self.K} modes")
+        eng._green_radius(eng.cfg.x0, eng.cfg.t_heat)   # hop distances too: nothing slow left for the tick
+        return spec, eng, self._build_coarse(spec, eng) if with_coarse else None
+
+    def _switch_topology(self):
+        fut, self._next_topology = self._next_topology, None
+        try:
+            spec, full, coarse = fut.result()
+        except Exception as e:
+            print(f"Topology build failed, keeping the current graph: {e}")
+            return
+        old = self.eng
+        new = coarse if self._full is not None and coarse is not None else full
+        if hasattr(old, "cfg"):
+            new.set_heat(x0=old.cfg.x0 * new.n // old.n, t=old.cfg.t_heat)
+        if hasattr(old, "_c"):
+            # continue the smoothing and whitening from the old modal state instead of a cold start
+            new._c, new._c_prev, new._power = old._c.copy(), old._c_prev.copy(), old._power.copy()
+            new._ticks = old._ticks
+        self._fade = (old, TOPOLOGY_FADE)
+        self.topology = spec
+        self._full = full if new is coarse else None
+        self.coarse = coarse
+        self.eng = new
+        self.n = new.n
+        self._s = np.empty(self.n)
+        self.schedule.invalidate()
+
+    def _use_engine(self, eng):
+        old = self.eng
+        if hasattr(eng, "set_heat") and hasattr(old, "cfg"):
+            eng.set_heat(x0=old.cfg.x0 * eng.n // old.n, t=old.cfg.t_heat)   # heat moves carry over
+        eng.reset()
+        self.eng = eng
+        self.n = eng.n
+        self._s = np.empty(self.n)
+        self.schedule.invalidate()
+
+    def set_quality(self, level):
+        """Run at a quality_governor level (0 = full quality); idempotent."""
+        self.quality = int(level)
+        self.send_modes = self.K if level < 1 else max(1, self.K // 2)
+        frozen = ANALYTIC_FIELDS if level >= 2 else frozenset()
+        if frozen != self.schedule.frozen:
+            self.schedule.frozen = frozen
+            self.schedule.invalidate()
+        if level >= 3 and self._full is None and self.coarse is not None:
+            self._full = self.eng
+            self._use_engine(self.coarse)
+        elif level < 3 and self._full is not None:
+            self._use_engine(self._full)
+            self._full = None
+        self.stride = 2 if level >= 4 else 1
+
+    def apply(self, cmds):
+        for cmd in cmds:
+            if cmd[0] == "pmw": self.pmw = cmd[1]
+            elif cmd[0] == "heat" and hasattr(self.eng, "set_heat"):
+                self.eng.set_heat(x0=cmd[1], t=cmd[2]); self.schedule.invalidate("green")
+            elif cmd[0] == "pulse": self.add_pulse(*cmd[1:])
+            elif cmd[0] == "seek": self.seek(cmd[1])
+            elif cmd[0] == "topology": self.set_topology(cmd[1])
+
+    def step(self):
+        # every batch due by this frame's time lands together, before anything is computed
+        self.applied.clear()
+        for cmds, on_applied in self.commands.drain(self.t):
+            self.apply(cmds)
+            if on_applied is not None:
+                self.applied.append(on_applied)
+        if self.stride > 1:
+            # reduced tick rate: this step stands for the last of `stride` frames
+            self.frame += self.stride - 1
+            self.t = self.frame*self.dt
+            self.pulses.seek(self.frame)
+        if self._next_topology is not None and self._next_topology.done():
+            self._switch_topology()
+        # synthetic modal vector: mag_a * exp(i*phase_a) on the active modes
+        c = self._spec[:self.K]
+        c[:] = 0
+        self.phi = self.omega*self.dt*(self.frame + 1)
+        mag, ph, tmp = self._mag, self._ph, self._tmp
+        np.add(self._offsets, self.phi, out=mag); np.sin(mag, out=mag)
+        mag *= 0.25; mag += 0.75; mag *= self.amps
+        np.multiply(self._phase_mul, self.phi, out=ph)
+        c.real[self._active] = np.multiply(mag, np.cos(ph, out=tmp), out=tmp)
+        c.imag[self._active] = np.multiply(mag, np.sin(ph, out=tmp), out=tmp)
+        self.pulses.accumulate(c)
+        c[0] += 0.3*self.pmw
+        # project back to a node field to feed engine
+        s = irfft_into(self._spec, self.n, self._s)
+        want = self.subscriptions.union()
+        if want != self._want:
+            self._want = want
+            self.schedule.invalidate()   # a newly watched field must not come from a stale cache
+        held = self.schedule.held(self.frame)
+        if want is not None:
+            held &= want
+        if held or want is not None:
+            tel = self.eng.step(s, kx=1, ky=2, fields=[f for f in OUTPUT_FIELDS
+                                                      if f not in held and (want is None or f in want)])
+        else:
+            tel = self.eng.step(s, kx=1, ky=2)
+        self.held = self.schedule.fill(tel, held)
+        if self._fade is not None:
+            # the previous graph keeps stepping (c only) while its share fades out
+            old, left = self._fade
+            c_old = old.step(np.fft.irfft(self._spec, n=old.n), kx=1, ky=2, fields=())["c"]
+            w = left / (TOPOLOGY_FADE + 1)
+            tel["c"] = (1.0 - w) * tel["c"] + w * c_old
+            self._fade = (old, left - 1) if left > 1 else None
+        if self.send_modes < self.K:
+            tel["c"] = tel["c"][:self.send_modes]
+        tel["quality"] = self.quality
+        tel["pmw"] = self.pmw; tel["time"] = self.t
+        self.frame += 1
+        self.t = self.frame*self.dt
+        return tel
+
+def parse_control(body: Union[Dict[str, Any], List[Dict[str, Any]]]) -> Tuple[List[Tuple], Optional[float]]:
+    """Validate a control body into (commands, at).
+
+    The body is one command ({"seek": t, "set": {...}, "pulse": {...} or [...]}), a list of them, or
+    {"batch": [...], "at": t}; `at` schedules the batch for engine time t instead of the
+    next tick. Nothing is applied here, so a malformed batch is rejected as a whole."""
+    if isinstance(body, list):
+        body = {"batch": body}
+    cmds = []
+    for b in body.get("batch") or [body]:
+        if "seek" in b: cmds.append(("seek", float(b["seek"])))
+        setv = b.get("set") or {}
+        if "pmw" in setv: cmds.append(("pmw", float(setv["pmw"])))
+        if "t_heat" in setv or "x0" in setv:
+            x0 = setv.get("x0"); t = setv.get("t_heat")
+            cmds.append(("heat", None if x0 is None else int(x0), None if t is None else float(t)))
+        if "topology" in b: cmds.append(("topology", parse_topology(b["topology"])))
+        p = b.get("pulse") or ()
+        for q in ([p] if isinstance(p, dict) else p):
+            cmds.append(("pulse", int(q.get("k",0)), float(q.get("amp",0.5)), float(q.get("decay",0.95))))
+    at = body.get("at")
+    return cmds, None if at is None else float(at)
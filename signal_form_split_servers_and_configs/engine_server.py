@@ -4,107 +4,280 @@
 # Run:
 #   pip install fastapi uvicorn numpy scipy
 #   python engine_server.py
-import asyncio, json, math
-from typing import Dict, Any, List
-import numpy as np
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import asyncio, contextlib, itertools, json, os, time
+from typing import Any, Dict, List, Union
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.responses import PlainTextResponse
 import uvicorn
 
 try:
-    from engine import GraphConfig, EngineConfig, SignalFormEngine
-except Exception:
-    # Minimal fallback engine if engine.py isn't present
-    GraphConfig = object
-    EngineConfig = object
-    class SignalFormEngine:
-        def __init__(self, *a, **k): self.K=32; self.modes=np.eye(32); self._t=0.0
-        def step(self, s, kx=1, ky=2):
-            self._t+=1/60
-            c = np.fft.rfft(s)[:self.K]
-            S = {"U":0.5,"F":0.5,"blend":0.5}
-            return {"S":S,"stokes":{"S0":1,"S1":0,"S2":0,"S3":0,"pair":[1,2]},
-                    "entropy":0.4,"R":float(np.random.rand()),
-                    "green":{"x0":0,"t":0.12,"summary":{"radius":12}},
-                    "lambdas":[0]*8}
-
-HOST="0.0.0.0"; PORT=7070; FPS=60.0
-
-def ring_lattice(n: int, k: int = 2, w: float = 1.0):
-    edges = []
-    for i in range(n):
-        for d in range(1, k+1):
-            j1 = (i + d) % n
-            j2 = (i - d) % n
-            edges.append((i, j1, w))
-            edges.append((i, j2, w))
-    return edges
-
-class EngineRunner:
-    def __init__(self, n=256, K=32, x0=0, t_heat=0.12):
-        try:
-            gcfg = GraphConfig(nodes=n, edges=ring_lattice(n), normalized=True)
-            ecfg = EngineConfig(K=K, x0=x0, t_heat=t_heat, alpha_white=0.5, smooth=0.2)
-            self.eng = SignalFormEngine(gcfg, ecfg)
-            self.K = K
-        except Exception:
-            self.eng = SignalFormEngine()
-            self.K = getattr(self.eng, "K", 32)
-        self.dt = 1.0/FPS
-        self.omega = 2*math.pi*0.2
-        self.phi = 0.0
-        self.active_modes = [0,1,2,5,8,13]
-        self.amps = np.linspace(1.0, 0.2, num=len(self.active_modes))
-        self.t = 0.0
-        self.pmw = 0.5
-        self._pulses: List[Dict[str, Any]] = []
-
-    def add_pulse(self, k:int, amp:float, decay:float):
-        self._pulses.append({"k": max(0, min(int(k), self.K-1)), "amp": float(amp), "decay": float(decay), "ttl": 1.0})
-
-    def step(self):
-        # synthetic modal vector
-        c = np.zeros(self.K, dtype=np.complex128)
-        self.phi += self.omega*self.dt
-        for a_idx, k_idx in enumerate(self.active_modes):
-            mag = self.amps[a_idx] * (0.75 + 0.25*math.sin(self.phi + a_idx))
-            phase = self.phi*(1+a_idx*0.1)
-            c[k_idx] = mag * complex(math.cos(phase), math.sin(phase))
-        for p in list(self._pulses):
-            k=p["k"]; c[k] += p["amp"]*p["ttl"]; p["ttl"] *= p["decay"]
-            if p["ttl"]<1e-3: self._pulses.remove(p)
-        c[0] += 0.3*self.pmw
-        # project back to a node field to feed engine
-        s = np.real(np.fft.irfft(np.pad(c, (0, max(0, 64-len(c))), constant_values=0)))[:64]
-        tel = self.eng.step(s, kx=1, ky=2)
-        tel["pmw"] = self.pmw; tel["time"] = self.t
-        self.t += self.dt
-        return tel
+    from engine_runner import FPS, EngineRunner, parse_control
+    from field_schedule import load_rates, parse_fields
+    from frame_bus import FrameBusReader, RemoteRunner
+    from frame_clock import FrameClock
+    from frame_ring import FrameRing
+    from quality_governor import QualityGovernor
+    from send_queue import ConnectionSender, SendQueueClosed
+    from telemetry_codec import EncodedFrame, negotiate
+    from telemetry_delta import DeltaEncoder
+    from telemetry_log import LogWriter
+except ImportError:
+    from .engine_runner import FPS, EngineRunner, parse_control
+    from .field_schedule import load_rates, parse_fields
+    from .frame_bus import FrameBusReader, RemoteRunner
+    from .frame_clock import FrameClock
+    from .frame_ring import FrameRing
+    from .quality_governor import QualityGovernor
+    from .send_queue import ConnectionSender, SendQueueClosed
+    from .telemetry_codec import EncodedFrame, negotiate
+    from .telemetry_delta import DeltaEncoder
+    from .telemetry_log import LogWriter
+
+HOST="0.0.0.0"; PORT=7070
+RING_CAPACITY = 120   # ~2 s of frames at 60 FPS
+# Per-field update rates in Hz ("telemetry_rates" in microfiche_config.json); unlisted fields run at FPS.
+FIELD_RATES = load_rates()
+# Tee every frame into this append-only log (replay it with replay_server.py); "" = off.
+RECORD_PATH = os.environ.get("SIGNAL_FORM_RECORD", "")
+# Serve frames from engine_process.py's shared-memory bus of this name instead of running
+# a simulation here, so uvicorn --workers N all show the same one; "" = standalone.
+BUS_NAME = os.environ.get("SIGNAL_FORM_BUS", "")
+BUS_POLL = 0.25 / FPS   # worker polling interval for new bus frames
+BUS_STALE = 1.0         # s without a new bus frame before a worker checks for a restarted engine
 
 app = FastAPI()
-runner = EngineRunner()
+runner = RemoteRunner(BUS_NAME) if BUS_NAME else EngineRunner(rates=FIELD_RATES)
+ring = FrameRing(RING_CAPACITY)
+clock = FrameClock(FPS)
+governor = QualityGovernor(1.0/FPS)
+senders: Dict[int, ConnectionSender] = {}   # live /telemetry connections, for GET /connections
+_conn_ids = itertools.count(1)
+delta_encoder = DeltaEncoder()
+
+async def tick_loop():
+    # the only caller of runner.step(): one simulation clock for every viewer
+    clock.reset()
+    skipped = 0
+    while True:
+        t0 = time.perf_counter()
+        try:
+            frame = EncodedFrame(runner.step(), ring.seq + 1, runner.held)
+            frame.encode_delta(delta_encoder)
+            ring.publish(frame)
+            rec = getattr(app.state, "recorder", None)
+            if rec is not None:
+                rec.append(frame.seq, frame.tel["time"], frame.text.encode())
+            bus = getattr(app.state, "bus", None)
+            if bus is not None:
+                bus.write(frame, len(runner.pulses))
+            for on_applied in runner.applied:
+                on_applied(frame.seq, frame.tel["time"])
+        except Exception as e:
+            print(f"Engine tick error: {e}")
+        level = governor.observe(time.perf_counter() - t0, skipped)
+        if level != runner.quality or getattr(app.state, "coarse_for", None) is not runner.topology:
+            set_quality(level)
+        # absolute deadlines: step/encode time does not stretch the frame period
+        skipped = await clock.wait()
+
+def set_quality(level: int):
+    # the coarse graph is built in a worker thread as soon as it might be needed;
+    # until it is ready, level 3 runs on the full graph. A topology switch replaces
+    # (or drops) the runner's coarse engine, so a build for the old graph no longer counts
+    if getattr(app.state, "coarse_for", None) is not runner.topology:
+        app.state.coarse_for, app.state.coarse_build = runner.topology, None
+    if level >= 2 and runner.coarse is None and getattr(app.state, "coarse_build", None) is None:
+        app.state.coarse_build = asyncio.get_running_loop().run_in_executor(None, runner.build_coarse)
+        app.state.coarse_build.add_done_callback(lambda _: runner.set_quality(runner.quality))
+    runner.set_quality(level)
+    clock.set_fps(FPS / runner.stride)
+
+async def bus_pump():
+    # worker mode: republish the engine process's frames, keeping its sequence numbers
+    # (acks name them, and delta viewers detect gaps by them)
+    loop = asyncio.get_running_loop()
+    reader = FrameBusReader(BUS_NAME)
+    runner.connect(loop, reader.authkey)
+    last = reader.head
+    seen = time.monotonic()
+    try:
+        while True:
+            if not runner.connected:   # retried until the restarted engine listens again
+                with contextlib.suppress(OSError):
+                    runner.connect(loop, reader.authkey)
+            head = reader.head
+            if head == last:
+                if time.monotonic() - seen > BUS_STALE:
+                    # no frames for a while: the engine may have restarted on a new block
+                    seen = time.monotonic()
+                    fresh = reader.reopen()
+                    if fresh is not None:
+                        reader.close()
+                        reader, last = fresh, 0
+                        ring.reset()
+                        runner.close()   # its control socket went away with the old engine
+                await asyncio.sleep(BUS_POLL)
+                continue
+            if head < last:   # numbering restarted on the same block
+                ring.reset()
+                last = 0
+            seen = time.monotonic()
+            for seq in range(max(last + 1, head - reader.slots + 1), head + 1):
+                frame = reader.read(seq)
+                if frame is not None:
+                    runner.observe(reader.pmw, reader.pulses)
+                    ring.publish(frame, seq)
+            last = head
+    finally:
+        reader.close()
+
+def ensure_tick_task():
+    task = getattr(app.state, "tick_task", None)
+    if task is None or task.done():
+        app.state.tick_task = asyncio.create_task(bus_pump() if BUS_NAME else tick_loop())
+
+@app.on_event("startup")
+async def start_tick():
+    if RECORD_PATH and not BUS_NAME and getattr(app.state, "recorder", None) is None:
+        app.state.recorder = LogWriter(os.path.expanduser(RECORD_PATH))
+        runner.subscriptions.set("recorder", None)   # recordings keep every field
+    ensure_tick_task()
+
+@app.on_event("shutdown")
+async def stop_tick():
+    task = getattr(app.state, "tick_task", None)
+    if task:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    app.state.tick_task = None
+    rec = getattr(app.state, "recorder", None)
+    if rec is not None:
+        rec.close()
+        app.state.recorder = None
+        runner.subscriptions.discard("recorder")
 
 @app.get("/", response_class=PlainTextResponse)
-def root(): return "Engine Server OK. WS: /telemetry  POST /control"
+def root(): return "Engine Server OK. WS: /telemetry  POST /control  GET /clock  GET /connections  GET /quality"
+
+async def engine_stats(key: str):
+    # worker mode: this process's clock and governor sit idle, the engine process has the real ones
+    stats = await runner.stats()
+    if stats is None:
+        raise HTTPException(503, "engine process did not answer")
+    return stats[key]
+
+@app.get("/clock")
+async def clock_stats(): return await engine_stats("clock") if BUS_NAME else clock.stats()
+
+@app.get("/quality")
+async def quality_stats(): return await engine_stats("quality") if BUS_NAME else governor.stats()
+
+@app.get("/connections")
+def connection_stats(): return [s.stats() for s in senders.values()]
+
+async def send_delta_frames(sender: ConnectionSender, want_key: asyncio.Event):
+    # deltas must arrive in order; after a gap (or on request) the viewer gets a keyframe
+    last = 0
+    while True:
+        seq, frame = await ring.next_after(last)
+        if frame.delta is None:
+            last = seq
+            continue
+        backlog = ring.since(last) if last else []
+        if want_key.is_set() or not backlog or backlog[0][0] != last + 1:
+            want_key.clear()
+            sender.offer(frame.delta_keyframe)
+        else:
+            for _, f in backlog:
+                if not sender.offer(f.delta):
+                    want_key.set()   # evicted a queued delta: resync on the next tick
+        last = seq
+
+async def send_frames(sender: ConnectionSender, mode: str, conn_id: int):
+    seq = 0
+    while True:
+        seq, frame = await ring.next_after(seq)
+        # encoded once per tick (and per distinct field subscription), shared by all viewers
+        sender.offer(frame.binary if mode == "f32" else frame.text_for(runner.subscriptions.get(conn_id)))
+
+def ack_sender(sender: ConnectionSender, msg_id):
+    def on_applied(tick: int, t: float):
+        # tick is the seq of the first frame computed with the change applied
+        with contextlib.suppress(SendQueueClosed):
+            sender.put(json.dumps({"type": "ack", "id": msg_id, "tick": tick, "time": t}))
+    return on_applied
+
+async def read_client_messages(ws: WebSocket, sender: ConnectionSender, want_key: asyncio.Event,
+                               conn_id: int, mode: str = "json"):
+    while True:
+        try:
+            msg = json.loads(await ws.receive_text())
+        except ValueError:
+            continue
+        if not isinstance(msg, dict):
+            continue
+        if msg.get("type") == "keyframe":
+            want_key.set()
+        elif msg.get("type") == "subscribe" and mode == "json":
+            try:
+                runner.subscriptions.set(conn_id, parse_fields(msg.get("fields")))
+            except TypeError:
+                continue
+        elif msg.get("type") == "control":
+            try:
+                cmds, at = parse_control(msg)
+            except (AttributeError, TypeError, ValueError) as e:
+                sender.put(json.dumps({"type": "ack", "id": msg.get("id"), "error": str(e)}))
+                continue
+            runner.commands.push(cmds, at, ack_sender(sender, msg.get("id")))
 
 @app.websocket("/telemetry")
-async def telemetry(ws: WebSocket):
-    await ws.accept()
+async def telemetry(ws: WebSocket, format: str = None, fields: str = None):
+    # JSON by default; binary float32 (signalform.f32.v1 / ?format=f32) or
+    # quantized delta frames (signalform.delta.v1 / ?format=delta) on request.
+    # JSON viewers may watch a subset (?fields=c,pmw or {"type": "subscribe", "fields": [...]});
+    # binary and delta layouts are fixed, so those viewers subscribe to everything.
+    mode, subprotocol = negotiate(ws.scope.get("subprotocols", []), format)
+    await ws.accept(subprotocol=subprotocol)
+    ensure_tick_task()   # also covers servers started with lifespan="off"
+    # frames go through a bounded drop-oldest queue with its own writer task,
+    # so a slow viewer loses frames instead of holding up this handler
+    conn_id = next(_conn_ids)
+    client = ws.client
+    sender = senders[conn_id] = ConnectionSender(
+        ws, name=f"{client.host}:{client.port}" if client else str(conn_id)).start()
+    runner.subscriptions.set(conn_id, parse_fields(fields) if mode == "json" else None)
+    # the same socket carries {"type": "control", "id": .., "set"/"pulse"/"batch": ..}
+    # messages, acked with the tick they took effect on, and delta keyframe requests
+    want_key = asyncio.Event()
+    frames = send_delta_frames(sender, want_key) if mode == "delta" else send_frames(sender, mode, conn_id)
+    tasks = [asyncio.create_task(frames),
+             asyncio.create_task(read_client_messages(ws, sender, want_key, conn_id, mode))]
     try:
-        while True:
-            tel = runner.step()
-            await ws.send_text(json.dumps(tel))
-            await asyncio.sleep(1.0/FPS)
-    except WebSocketDisconnect:
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for t in done:
+                t.result()
+        finally:
+            for t in tasks:
+                t.cancel()
+    except (WebSocketDisconnect, SendQueueClosed):
         pass
+    finally:
+        senders.pop(conn_id, None)
+        runner.subscriptions.discard(conn_id)
+        await sender.close()
 
 @app.post("/control")
-async def control(body: Dict[str, Any]):
-    setv = body.get("set", {})
-    if "pmw" in setv: runner.pmw = float(setv["pmw"])
-    p = body.get("pulse")
-    if p: runner.add_pulse(p.get("k",0), p.get("amp",0.5), p.get("decay",0.95))
-    return {"ok": True, "pmw": runner.pmw, "pulses": len(runner._pulses)}
+async def control(body: Union[Dict[str, Any], List[Dict[str, Any]]]):
+    # queued, not applied: the next step() (or the first one at/after "at") applies the batch whole
+    try:
+        cmds, at = parse_control(body)
+    except (AttributeError, TypeError, ValueError) as e:
+        raise HTTPException(400, str(e))
+    runner.commands.push(cmds, at)
+    return {"ok": True, "queued": len(cmds), "at": at, "pmw": runner.pmw, "pulses": len(runner.pulses)}
 
 if __name__ == "__main__":
     uvicorn.run(app, host=HOST, port=PORT)
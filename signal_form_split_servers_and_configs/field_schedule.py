@@ -0,0 +1,115 @@
+# field_schedule.py
+# Per-field update rates for EngineRunner telemetry
+#
+# The modal vector c changes every tick, but the analytic fields (lambdas, the
+# Green's function summary, entropy, ...) are watched at a few Hz. A field with
+# a rate of r Hz is recomputed on the first frame the runner renders in each
+# period of round(fps / r) frames, i.e. whenever frame // period moves past the
+# frame it was last computed on (a runner stepping 2 frames at a time may skip
+# frame % period == 0 altogether), and held in between; held values are still in the telemetry dict (binary and
+# delta viewers need a complete frame) but are left out of the JSON text, so
+# JSON viewers receive a slow field only on the frames that recomputed it.
+# Frozen fields (the quality governor's analytics level) are held indefinitely but
+# stay in the JSON text, so a viewer that connects while they are frozen still
+# gets their last values. Schedules are keyed on the frame index, not wall time, so a seek or a
+# replay recomputes the same frames.
+#
+# Rates come from "telemetry_rates" in microfiche_config.json:
+#   "telemetry_rates": {"lambdas": 2, "green": 5, "entropy": 10}
+# Fields that are not listed (and c, pmw, time) go out at the full frame rate.
+#
+# Viewers can also subscribe to a subset of fields (FieldSubscriptions): the
+# engine computes only the union of what connected viewers watch, and each
+# viewer is sent its own subset.
+import json
+import os
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "microfiche_config.json")
+
+
+def load_rates(path: str = CONFIG_PATH) -> Dict[str, float]:
+    """The "telemetry_rates" table of a microfiche config; {} if the file or the key is missing."""
+    try:
+        with open(path) as fh:
+            rates = json.load(fh).get("telemetry_rates") or {}
+    except (OSError, ValueError):
+        return {}
+    return {str(k): float(v) for k, v in rates.items()}
+
+
+class FieldSchedule:
+    def __init__(self, rates: Optional[Dict[str, float]] = None, fps: float = 60.0):
+        # period in frames per slow field; rates at or above fps are simply every frame
+        self.periods = {k: max(1, int(round(fps / r))) for k, r in (rates or {}).items() if r > 0}
+        self.periods = {k: p for k, p in self.periods.items() if p > 1}
+        self.frozen: FrozenSet[str] = frozenset()   # held indefinitely once computed (quality governor)
+        self._last: Dict[str, Any] = {}
+        self._at: Dict[str, int] = {}   # frame each cached field was computed on
+        self._frame = 0
+
+    def held(self, frame: int) -> FrozenSet[str]:
+        """Slow fields that frame `frame` reuses instead of recomputing."""
+        if not self.periods and not self.frozen:
+            return frozenset()
+        last, at = self._last, self._at
+        self._frame = frame
+        held = {k for k, p in self.periods.items() if k in last and frame // p == at[k] // p}
+        held.update(k for k in self.frozen if k in last)
+        return frozenset(held)
+
+    def fill(self, tel: Dict[str, Any], held: FrozenSet[str]) -> Tuple[str, ...]:
+        """Cache the slow fields computed into `tel` and copy in the held ones; returns the held names
+        to leave out of the JSON text (frozen fields are always sent)."""
+        last = self._last
+        for k in (self.periods.keys() | self.frozen if self.frozen else self.periods):
+            if k in held:
+                tel[k] = last[k]
+            elif k in tel:
+                last[k] = tel[k]
+                self._at[k] = self._frame
+        return tuple(k for k in held if k not in self.frozen) if self.frozen else tuple(held)
+
+    def invalidate(self, *fields: str) -> None:
+        """Recompute these fields (all of them if none given) on the next frame."""
+        if fields:
+            for k in fields:
+                self._last.pop(k, None)
+        else:
+            self._last.clear()
+
+
+def parse_fields(value) -> Optional[FrozenSet[str]]:
+    """A subscription from "c,pmw,stokes" or ["c", "pmw"]; None (everything) for "", "*" or "all"."""
+    if value is None:
+        return None
+    names = value.split(",") if isinstance(value, str) else list(value)
+    names = frozenset(str(n).strip() for n in names) - {""}
+    return None if not names or names & {"*", "all"} else names
+
+
+class FieldSubscriptions:
+    """Field sets declared by connected viewers; the engine computes their union."""
+
+    def __init__(self):
+        self._subs: Dict[Any, Optional[FrozenSet[str]]] = {}
+        self._union: Optional[FrozenSet[str]] = None
+
+    def get(self, key: Any) -> Optional[FrozenSet[str]]:
+        return self._subs.get(key)
+
+    def set(self, key: Any, fields: Optional[FrozenSet[str]]) -> None:
+        self._subs[key] = fields
+        self._update()
+
+    def discard(self, key: Any) -> None:
+        self._subs.pop(key, None)
+        self._update()
+
+    def union(self) -> Optional[FrozenSet[str]]:
+        """Fields anyone watches; None means everything (a full subscriber, or no declared subscriptions)."""
+        return self._union
+
+    def _update(self) -> None:
+        subs = list(self._subs.values())
+        self._union = None if not subs or any(f is None for f in subs) else frozenset().union(*subs)
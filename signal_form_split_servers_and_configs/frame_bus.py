@@ -0,0 +1,373 @@
+# frame_bus.py
+# Shared-memory frame ring and control link between one engine process and
+# any number of stateless WebSocket worker processes
+# Requires: numpy (through telemetry_codec)
+#
+# The engine process (engine_process.py) owns the simulation and writes every
+# encoded frame into a multiprocessing.shared_memory ring; workers
+# (engine_server.py with SIGNAL_FORM_BUS set, e.g. under uvicorn --workers N)
+# map the same block and forward the already encoded payloads, so every
+# viewer on every core sees the one authoritative simulation.
+#
+# Layout, little-endian:
+#   header  64 bytes   magic b"SFB1", u32 version, u32 slots, u32 slot size, u64 head
+#                      (seq of the newest complete frame), u64 epoch (creation time, ns),
+#                      32-byte control link authkey
+#   slot    48 bytes   u64 generation, u32 seq, u32 len(JSON), u32 len(f32),
+#                      u32 len(delta), u32 len(delta keyframe), u32 pulses, f64 time, f64 pmw,
+#           payloads   JSON text, f32 frame, delta frame, delta keyframe, back to back
+#
+# Workers forward the payloads as they are: a frame's telemetry dict is only
+# parsed from its JSON text if a field-subset viewer needs it, and the pulse
+# count and pmw the /control reply reports come from the slot header.
+#
+# Each slot is guarded by a seqlock: the writer makes the generation odd,
+# writes the slot, then makes it even again; a reader copies the slot out and
+# keeps the copy only if it saw the same even generation before and after.
+# The single writer never waits for readers, and a reader that falls more than
+# `slots` frames behind simply finds newer frames in the old slots.
+#
+# A restarted engine creates a new block under the same name and counts seq
+# from 1 again; a worker whose head stops moving re-attaches by name and
+# compares epochs (FrameBusReader.reopen) to tell a new block from a stall.
+#
+# Control goes the other way over a multiprocessing.connection socket in a
+# private (0700) runtime directory, authenticated with the random authkey from
+# the block's header: only processes that can map the block (its owner; shared
+# memory is created 0600) can connect, and nothing is unpickled before the
+# handshake. Messages: ("control", token, cmds, at), answered by ("ack", token, tick,
+# time) once applied, ("subscribe", key, fields) / ("discard", key) for
+# field subscriptions (the engine computes the union over every worker), and
+# ("stats", token), answered by ("stats", token, {...}) with the engine's
+# clock and quality governor stats.
+# A worker's subscriptions are dropped when its link closes.
+import asyncio
+import contextlib
+import itertools
+import os
+import secrets
+import stat
+import struct
+import tempfile
+import threading
+import time
+from multiprocessing import AuthenticationError, resource_tracker, shared_memory
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from telemetry_codec import EncodedFrame
+except ImportError:
+    from .telemetry_codec import EncodedFrame
+
+BUS_MAGIC = b"SFB1"
+BUS_VERSION = 4
+BUS_HEADER = struct.Struct("<4sIIIQQ32s")
+HEAD_OFFSET = 16
+SLOT_HEADER = struct.Struct("<QIIIIIIdd")
+GEN = struct.Struct("<Q")
+BUS_SLOTS = 120            # ~2 s of frames at 60 FPS, like the in-process FrameRing
+SLOT_SIZE = 64 * 1024
+READ_RETRIES = 16
+
+
+def runtime_dir() -> str:
+    """$XDG_RUNTIME_DIR, else a 0700 directory of our own under the temp dir."""
+    path = os.environ.get("XDG_RUNTIME_DIR") or os.path.join(tempfile.gettempdir(), f"signal_form-{os.getuid()}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"{path} must be a directory owned by this user with mode 0700")
+    return path
+
+
+def control_address(name: str) -> str:
+    return os.path.join(runtime_dir(), f"{name}.ctl")
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # attaching must not register the block with this process's resource tracker,
+    # or the block would be unlinked when the first worker exits
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:   # Python < 3.13
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class FrameBusWriter:
+    """Engine side: publish EncodedFrames into the shared ring (single writer)."""
+
+    def __init__(self, name: str, slots: int = BUS_SLOTS, slot_size: int = SLOT_SIZE):
+        self.slots = max(2, int(slots))
+        self.slot_size = int(slot_size)
+        self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                              size=BUS_HEADER.size + self.slots * self.slot_size)
+        self.name = self.shm.name
+        self.buf = self.shm.buf   # a new block is zero-filled: every slot starts at generation 0
+        self.epoch = time.time_ns()
+        self.authkey = secrets.token_bytes(32)
+        BUS_HEADER.pack_into(self.buf, 0, BUS_MAGIC, BUS_VERSION, self.slots, self.slot_size, 0,
+                             self.epoch, self.authkey)
+
+    def _offset(self, seq: int) -> int:
+        return BUS_HEADER.size + (seq % self.slots) * self.slot_size
+
+    def write(self, frame: EncodedFrame, pulses: int = 0) -> None:
+        payloads = [frame.text.encode(), frame.binary,
+                    frame.delta or b"", frame.delta_keyframe if frame.delta else b""]
+        size = sum(len(p) for p in payloads)
+        if SLOT_HEADER.size + size > self.slot_size:
+            raise ValueError(f"frame of {size} bytes does not fit a {self.slot_size}-byte bus slot")
+        buf, off = self.buf, self._offset(frame.seq)
+        gen = GEN.unpack_from(buf, off)[0]
+        GEN.pack_into(buf, off, gen + 1)   # odd: slot is being written
+        SLOT_HEADER.pack_into(buf, off, gen + 1, frame.seq & 0xFFFFFFFF, *(len(p) for p in payloads),
+                              pulses, float(frame.tel.get("time", 0.0)), float(frame.tel.get("pmw", 0.0)))
+        pos = off + SLOT_HEADER.size
+        for p in payloads:
+            buf[pos:pos + len(p)] = p
+            pos += len(p)
+        GEN.pack_into(buf, off, gen + 2)
+        struct.pack_into("<Q", buf, HEAD_OFFSET, frame.seq)
+
+    def close(self) -> None:
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+class FrameBusReader:
+    """Worker side: read frames straight out of the shared block."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.shm = _attach(name)
+        self.buf = self.shm.buf
+        (magic, version, self.slots, self.slot_size, _,
+         self.epoch, self.authkey) = BUS_HEADER.unpack_from(self.buf, 0)
+        if magic != BUS_MAGIC or version != BUS_VERSION:
+            self.close()
+            raise ValueError(f"{name}: not a v{BUS_VERSION} frame bus")
+        self.pulses = 0   # pulse count and pmw of the last frame read
+        self.pmw = 0.0
+
+    def reopen(self) -> Optional["FrameBusReader"]:
+        """A reader on the block now published under this name if the engine was restarted
+        (a different epoch), else None; this reader stays open either way."""
+        try:
+            fresh = FrameBusReader(self.name)
+        except (OSError, ValueError):
+            return None   # the engine is down (block unlinked) or still setting up
+        if fresh.epoch == self.epoch:
+            fresh.close()
+            return None
+        return fresh
+
+    @property
+    def head(self) -> int:
+        return struct.unpack_from("<Q", self.buf, HEAD_OFFSET)[0]
+
+    def read(self, seq: int) -> Optional[EncodedFrame]:
+        """Frame `seq`, or None if its slot has moved on (or a write kept racing the read)."""
+        buf = self.buf
+        off = BUS_HEADER.size + (seq % self.slots) * self.slot_size
+        for _ in range(READ_RETRIES):
+            gen, fseq, n_text, n_bin, n_delta, n_key, pulses, _t, pmw = SLOT_HEADER.unpack_from(buf, off)
+            if gen & 1:
+                continue
+            if fseq != seq & 0xFFFFFFFF:
+                return None
+            pos = off + SLOT_HEADER.size
+            raw = bytes(buf[pos:pos + n_text + n_bin + n_delta + n_key])
+            if GEN.unpack_from(buf, off)[0] != gen:
+                continue   # torn: the writer lapped us mid-copy
+            frame = EncodedFrame.from_text(raw[:n_text].decode(), seq)   # tel stays unparsed
+            frame._binary = raw[n_text:n_text + n_bin]
+            if n_delta:
+                frame.delta = raw[n_text + n_bin:n_text + n_bin + n_delta]
+                frame._delta_key = raw[n_text + n_bin + n_delta:]
+            self.pulses = pulses; self.pmw = pmw
+            return frame
+        return None
+
+    def close(self) -> None:
+        self.buf = None
+        self.shm.close()
+
+
+class ControlServer:
+    """Engine side: apply control batches and subscriptions sent by workers."""
+
+    def __init__(self, address: str, runner, authkey: bytes,
+                 stats: Optional[Callable[[], Dict[str, Any]]] = None):
+        if os.path.exists(address):
+            os.unlink(address)   # left over from an engine that did not shut down cleanly
+        self.address = address
+        self.runner = runner
+        self.stats = stats
+        self.listener = Listener(address, family="AF_UNIX", authkey=authkey)
+        self._ids = itertools.count(1)
+        threading.Thread(target=self._accept, name="bus-control", daemon=True).start()
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                conn = self.listener.accept()
+            except (AuthenticationError, EOFError, ConnectionError):
+                continue   # wrong authkey or a client gone mid-handshake: dropped before any recv()
+            except OSError:
+                return   # listener closed
+            threading.Thread(target=self._serve, args=(conn, next(self._ids)), daemon=True).start()
+
+    def _serve(self, conn, worker: int) -> None:
+        lock = threading.Lock()
+        subs = self.runner.subscriptions
+        keys = set()
+
+        def ack(token):
+            def on_applied(tick: int, t: float):
+                # called from the tick loop while this thread may be blocked in recv()
+                with lock:
+                    try:
+                        conn.send(("ack", token, tick, t))
+                    except OSError:
+                        pass
+            return on_applied
+
+        try:
+            while True:
+                msg = conn.recv()
+                if msg[0] == "control":
+                    _, token, cmds, at = msg
+                    self.runner.commands.push(cmds, at, None if token is None else ack(token))
+                elif msg[0] == "subscribe":
+                    keys.add(msg[1])
+                    subs.set((worker, msg[1]), msg[2])
+                elif msg[0] == "discard":
+                    keys.discard(msg[1])
+                    subs.discard((worker, msg[1]))
+                elif msg[0] == "stats":
+                    with lock:
+                        conn.send(("stats", msg[1], self.stats() if self.stats else {}))
+                elif msg[0] == "close":
+                    break
+        except (EOFError, OSError):
+            pass
+        finally:
+            for key in keys:   # a worker that went away stops counting towards the union
+                subs.discard((worker, key))
+            conn.close()
+
+    def close(self) -> None:
+        self.listener.close()
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+class _RemoteCommands:
+    def __init__(self, link: "RemoteRunner"):
+        self._link = link
+
+    def push(self, cmds, at=None, on_applied=None) -> None:
+        self._link.send_control(cmds, at, on_applied)
+
+
+class _RemoteSubscriptions:
+    def __init__(self, link: "RemoteRunner"):
+        self._link = link
+        self._subs: Dict[Any, Any] = {}
+
+    def get(self, key):
+        return self._subs.get(key)
+
+    def set(self, key, fields) -> None:
+        self._subs[key] = fields
+        self._link.send(("subscribe", key, fields))
+
+    def discard(self, key) -> None:
+        self._subs.pop(key, None)
+        self._link.send(("discard", key))
+
+
+class RemoteRunner:
+    """Worker side stand-in for EngineRunner: the parts the request handlers use, forwarded to the engine."""
+
+    def __init__(self, name: str):
+        self.address = control_address(name)
+        self.commands = _RemoteCommands(self)
+        self.subscriptions = _RemoteSubscriptions(self)
+        self.pmw = 0.5
+        self.n_pulses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Any] = {}
+        self._tokens = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def pulses(self):
+        return range(self.n_pulses)   # only len() is used
+
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None
+
+    def connect(self, loop: asyncio.AbstractEventLoop, authkey: bytes) -> None:
+        """Open the control link (authkey from the bus header); acks are delivered on `loop`."""
+        self.close()
+        self._loop = loop
+        self._conn = Client(self.address, family="AF_UNIX", authkey=authkey)
+        threading.Thread(target=self._read_acks, name="bus-acks", daemon=True).start()
+        for key, fields in list(self.subscriptions._subs.items()):   # viewers that arrived first
+            self.send(("subscribe", key, fields))
+
+    def observe(self, pmw: float, pulses: int) -> None:
+        self.pmw = pmw
+        self.n_pulses = pulses
+
+    def send(self, msg) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.send(msg)
+
+    def send_control(self, cmds, at, on_applied) -> None:
+        token = None
+        if on_applied is not None:
+            token = next(self._tokens)
+            self._pending[token] = on_applied
+        self.send(("control", token, cmds, at))
+
+    async def stats(self, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        """The engine process's {"clock": ..., "quality": ...} stats; None if it does not answer."""
+        fut = asyncio.get_running_loop().create_future()
+        token = next(self._tokens)
+        self._pending[token] = lambda stats: fut.done() or fut.set_result(stats)
+        try:
+            self.send(("stats", token))
+            return await asyncio.wait_for(fut, timeout)
+        except (OSError, asyncio.TimeoutError):
+            return None
+        finally:
+            self._pending.pop(token, None)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                with contextlib.suppress(OSError):
+                    self._conn.send(("close",))
+                self._conn.close()
+                self._conn = None
+
+    def _read_acks(self) -> None:
+        # ("ack", token, tick, time) and ("stats", token, stats) replies
+        conn = self._conn
+        try:
+            while True:
+                _, token, *reply = conn.recv()
+                on_reply = self._pending.pop(token, None)
+                if on_reply is not None:
+                    self._loop.call_soon_threadsafe(on_reply, *reply)
+        except (EOFError, OSError):
+            pass
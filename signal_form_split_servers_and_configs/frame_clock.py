@@ -0,0 +1,84 @@
+# frame_clock.py
+# Drift-compensated frame scheduler for the telemetry loops
+#
+# Frame k is due at start + k * period on the monotonic clock, so time spent
+# stepping, encoding and sending is absorbed into the sleep instead of being
+# added to it. A tick that overruns one or more whole periods does not try to
+# catch up: the missed deadlines are skipped and counted, and the loop resumes
+# on the next deadline still in the future. Jitter is the lateness of each
+# wake-up against its deadline.
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+JITTER_WINDOW = 600   # wake-ups kept for the percentile stats (~10 s at 60 FPS)
+
+
+class FrameClock:
+    def __init__(self, fps: float = 60.0, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], "asyncio.Future"] = asyncio.sleep,
+                 window: int = JITTER_WINDOW):
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        self.fps = float(fps)
+        self.period = 1.0 / self.fps
+        self._clock = clock
+        self._sleep = sleep
+        self._jitter: Deque[float] = deque(maxlen=max(1, int(window)))
+        self.reset()
+
+    def reset(self) -> None:
+        """Restart the schedule at the next wait(); counters start from zero."""
+        self._start: Optional[float] = None
+        self.frame = 0
+        self.skipped = 0
+        self.jitter_max = 0.0
+        self._jitter.clear()
+
+    def set_fps(self, fps: float) -> None:
+        """Change the frame rate from the current frame on, keeping its deadline and the counters."""
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        if self._start is not None:
+            self._start = self.deadline(self.frame) - self.frame / fps
+        self.fps = float(fps)
+        self.period = 1.0 / self.fps
+
+    def deadline(self, frame: int) -> float:
+        return self._start + frame * self.period
+
+    async def wait(self) -> int:
+        """Sleep until the next frame deadline; returns how many deadlines were skipped."""
+        now = self._clock()
+        if self._start is None:
+            self._start = now
+            return 0
+        nxt = self.frame + 1
+        missed = 0
+        if now > self.deadline(nxt):
+            # overran at least one whole period: drop those frames, keep the phase
+            missed = math.floor((now - self._start) / self.period) + 1 - nxt
+            nxt += missed
+            self.skipped += missed
+        target = self.deadline(nxt)
+        if target > now:
+            await self._sleep(target - now)
+        late = max(0.0, self._clock() - target)
+        self._jitter.append(late)
+        if late > self.jitter_max:
+            self.jitter_max = late
+        self.frame = nxt
+        return missed
+
+    def stats(self) -> Dict[str, float]:
+        """Frame counters plus wake-up lateness (ms) over the recent window."""
+        j = sorted(self._jitter)
+        pct = lambda q: 1e3 * j[min(len(j) - 1, int(q * len(j)))] if j else 0.0
+        return {
+            "fps": self.fps, "frame": self.frame, "skipped": self.skipped,
+            "jitter_mean_ms": 1e3 * sum(j) / len(j) if j else 0.0,
+            "jitter_p50_ms": pct(0.50), "jitter_p99_ms": pct(0.99),
+            "jitter_max_ms": 1e3 * self.jitter_max,
+        }
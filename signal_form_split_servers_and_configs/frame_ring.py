@@ -0,0 +1,64 @@
+# frame_ring.py
+# Bounded in-memory ring of telemetry frames published by a single tick task
+#
+# One producer (the engine tick) calls publish(); any number of WebSocket
+# handlers await next_after(seq) and forward whatever is newest, so the
+# simulation advances once per frame no matter how many viewers are attached.
+import asyncio
+from collections import deque
+from typing import Any, Deque, List, Optional, Tuple
+
+Frame = Tuple[int, Any]
+
+
+class FrameRing:
+    def __init__(self, capacity: int = 120):
+        self._frames: Deque[Frame] = deque(maxlen=max(1, int(capacity)))
+        self._seq = 0
+        self._resets = 0
+        self._new = asyncio.Event()
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the newest frame (0 before the first publish)."""
+        return self._seq
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def publish(self, frame: Any, seq: Optional[int] = None) -> int:
+        """Append a frame; `seq` keeps an upstream numbering (it must increase), gaps included."""
+        self._seq = self._seq + 1 if seq is None else seq
+        self._frames.append((self._seq, frame))
+        # wake every waiter of the previous generation, then arm a fresh event
+        ev, self._new = self._new, asyncio.Event()
+        ev.set()
+        return self._seq
+
+    def reset(self) -> None:
+        """Drop every frame and count from 0 again (the upstream numbering restarted);
+        waiting next_after() calls then return the first frame published after it."""
+        self._frames.clear()
+        self._seq = 0
+        self._resets += 1
+        ev, self._new = self._new, asyncio.Event()
+        ev.set()
+
+    def latest(self) -> Optional[Frame]:
+        return self._frames[-1] if self._frames else None
+
+    def since(self, seq: int) -> List[Frame]:
+        """Frames still in the ring that are newer than seq, oldest first."""
+        return [f for f in self._frames if f[0] > seq]
+
+    async def next_after(self, seq: int) -> Frame:
+        """Newest frame with sequence > seq, waiting for the next publish if needed;
+        a seq from before a reset() counts as 0."""
+        resets = self._resets
+        if seq > self._seq:
+            seq = 0
+        while self._seq <= seq:
+            await self._new.wait()
+            if self._resets != resets:
+                resets, seq = self._resets, 0
+        return self._frames[-1]
@@ -0,0 +1,123 @@
+# pulse_bank.py
+# Vectorized store of decaying modal pulses for EngineRunner
+# Requires: numpy
+#
+# Pulses live in parallel preallocated arrays (mode index, amplitude, decay,
+# ttl). Each tick adds amp * ttl into the modal vector with np.add.at, decays
+# every ttl at once, and compacts expired pulses in one masked copy, so the
+# cost is O(P) in NumPy rather than O(P^2) in Python. Scratch buffers grow with
+# the bank, so a steady-state tick allocates nothing.
+#
+# Each pulse also records the frame it was born on and its initial ttl, so its
+# weight at any frame m is amp * ttl0 * decay**(m - born) (zero before birth and
+# once it falls under TTL_FLOOR): modal_at() evaluates that for a batch of
+# frames and seek() rewrites every ttl for a jump in time, both in O(P).
+import numpy as np
+
+TTL_FLOOR = 1e-3
+
+
+class PulseBank:
+    def __init__(self, capacity: int = 256):
+        capacity = max(1, int(capacity))
+        self.k = np.zeros(capacity, dtype=np.intp)
+        self.amp = np.zeros(capacity)
+        self.decay = np.zeros(capacity)
+        self.ttl = np.zeros(capacity)
+        self.ttl0 = np.zeros(capacity)
+        self.born = np.zeros(capacity, dtype=np.int64)
+        self._scratch = np.zeros(capacity)
+        self._keep = np.zeros(capacity, dtype=bool)
+        self._n = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _grow(self, need: int) -> None:
+        cap = len(self.ttl)
+        while cap < need:
+            cap *= 2
+        for name in ("k", "amp", "decay", "ttl", "ttl0", "born", "_scratch", "_keep"):
+            old = getattr(self, name)
+            new = np.zeros(cap, dtype=old.dtype)
+            new[:self._n] = old[:self._n]
+            setattr(self, name, new)
+
+    def add(self, k: int, amp: float, decay: float, ttl: float = 1.0, born: int = 0) -> None:
+        i = self._n
+        if i == len(self.ttl):
+            self._grow(i + 1)
+        self.k[i] = k; self.amp[i] = amp; self.decay[i] = decay; self.ttl[i] = ttl
+        self.ttl0[i] = ttl; self.born[i] = born
+        self._n = i + 1
+
+    def add_many(self, k, amp, decay, ttl=1.0, born=0) -> None:
+        k = np.atleast_1d(np.asarray(k, dtype=np.intp))
+        m = len(k)
+        if self._n + m > len(self.ttl):
+            self._grow(self._n + m)
+        sl = slice(self._n, self._n + m)
+        self.k[sl] = k; self.amp[sl] = amp; self.decay[sl] = decay; self.ttl[sl] = ttl
+        self.ttl0[sl] = ttl; self.born[sl] = born
+        self._n += m
+
+    def clear(self) -> None:
+        self._n = 0
+
+    def accumulate(self, c: np.ndarray) -> None:
+        """c[k] += amp * ttl for every live pulse, then decay and drop expired pulses."""
+        n = self._n
+        if not n:
+            return
+        ttl = self.ttl[:n]
+        contrib = np.multiply(self.amp[:n], ttl, out=self._scratch[:n])
+        np.add.at(c, self.k[:n], contrib)
+        ttl *= self.decay[:n]
+        keep = np.greater_equal(ttl, TTL_FLOOR, out=self._keep[:n])
+        live = int(np.count_nonzero(keep))
+        if live != n:
+            self._compact(keep, live)
+
+    def _compact(self, keep: np.ndarray, live: int) -> None:
+        n = self._n
+        for arr in (self.k, self.amp, self.decay, self.ttl, self.ttl0, self.born):
+            arr[:live] = arr[:n][keep]
+        self._n = live
+
+    def _ttl_at(self, frames: np.ndarray) -> np.ndarray:
+        # (T, P) ttl each pulse has (or would have) at each frame, 0 where not live
+        n = self._n
+        age = np.asarray(frames, dtype=np.int64)[:, None] - self.born[None, :n]
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            ttl = self.ttl0[:n] * np.power(self.decay[:n], np.maximum(age, 0))
+        # a pulse always contributes on its birth frame, then lives while ttl >= TTL_FLOOR
+        return np.where((age == 0) | ((age > 0) & (ttl >= TTL_FLOOR)), ttl, 0.0)
+
+    def modal_at(self, frames, K: int) -> np.ndarray:
+        """(T, K) pulse contribution to the modal vector at each frame, without stepping."""
+        frames = np.atleast_1d(frames)
+        out = np.zeros((len(frames), K))
+        if self._n:
+            np.add.at(out.T, self.k[:self._n], (self.amp[:self._n] * self._ttl_at(frames)).T)
+        return out
+
+    def seek(self, frame: int, where=None) -> None:
+        """Put every pulse in its state at `frame`; pulses born later or already expired are dropped.
+
+        Pulses that expired before the seek are gone, so rewinding only restores live ones.
+        `where` (bool mask over the live pulses) limits the seek to those pulses."""
+        n = self._n
+        if not n:
+            return
+        ttl = self._ttl_at(np.array([frame]))[0]
+        if where is not None:
+            ttl = np.where(where, ttl, self.ttl[:n])
+        self.ttl[:n] = ttl
+        keep = ttl > 0.0
+        self._compact(keep, int(np.count_nonzero(keep)))
+
+    def discard(self, where) -> None:
+        """Drop the live pulses selected by a bool mask."""
+        if self._n:
+            keep = ~np.asarray(where, dtype=bool)
+            self._compact(keep, int(np.count_nonzero(keep)))
@@ -0,0 +1,67 @@
+# quality_governor.py
+# Tick-cost governor: trade telemetry quality for meeting the frame deadline
+#
+# The tick loop reports how long each tick's work took (step + encode + publish)
+# and how many deadlines the FrameClock skipped. Cost is always compared with
+# the full-rate frame budget, so the same numbers decide both directions:
+#   - DEGRADE_AFTER consecutive ticks over HIGH of the budget (a skipped deadline
+#     counts as over) step one level down;
+#   - RESTORE_AFTER consecutive ticks under LOW of the budget step one level up.
+# The gap between HIGH and LOW and the much longer restore dwell are the
+# hysteresis: a level that only just fits is kept rather than flapping.
+#
+# Levels, each including the ones before it:
+#   0 full      everything
+#   1 modes     only the lowest half of the modal vector c is sent
+#   2 analytics every analytic field (S, stokes, entropy, R, green, lambdas) is
+#               frozen, so the engine projects c and skips the whitening pass
+#   3 coarse    the engine runs on a graph with half the nodes
+#   4 rate      the tick rate halves; each tick advances two frames of engine time
+from typing import Dict
+
+LEVELS = ("full", "modes", "analytics", "coarse", "rate")
+HIGH = 0.9
+LOW = 0.5
+DEGRADE_AFTER = 30     # ~0.5 s of overruns at 60 FPS
+RESTORE_AFTER = 300    # ~5 s of headroom
+
+
+class QualityGovernor:
+    def __init__(self, budget: float, high: float = HIGH, low: float = LOW,
+                 degrade_after: int = DEGRADE_AFTER, restore_after: int = RESTORE_AFTER,
+                 max_level: int = len(LEVELS) - 1):
+        if budget <= 0:
+            raise ValueError("budget must be positive")
+        self.budget = float(budget)
+        self.high = high; self.low = low
+        self.degrade_after = max(1, int(degrade_after))
+        self.restore_after = max(1, int(restore_after))
+        self.max_level = min(int(max_level), len(LEVELS) - 1)
+        self.level = 0
+        self.changes = 0
+        self._over = self._under = 0
+        self.load = 0.0
+
+    def observe(self, cost: float, skipped: int = 0) -> int:
+        """Record one tick's work time (seconds) and skipped deadlines; returns the level to run at."""
+        self.load = cost / self.budget
+        if skipped or self.load > self.high:
+            self._over += 1; self._under = 0
+        elif self.load < self.low:
+            self._under += 1; self._over = 0
+        else:
+            self._over = self._under = 0
+        if self._over >= self.degrade_after and self.level < self.max_level:
+            self._set(self.level + 1)
+        elif self._under >= self.restore_after and self.level > 0:
+            self._set(self.level - 1)
+        return self.level
+
+    def _set(self, level: int) -> None:
+        self.level = level
+        self.changes += 1
+        self._over = self._under = 0   # every level gets a full dwell before the next move
+
+    def stats(self) -> Dict[str, object]:
+        return {"level": self.level, "name": LEVELS[self.level], "load": self.load,
+                "changes": self.changes, "budget_ms": 1e3 * self.budget}
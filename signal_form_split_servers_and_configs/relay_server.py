@@ -0,0 +1,268 @@
+# relay_server.py
+# Fan-out relay: one upstream /telemetry subscription re-served to many viewers
+# Requires: fastapi, uvicorn, websockets
+# Run:
+#   python relay_server.py --upstream ws://engine-host:7070/telemetry --port 7080
+#   python relay_server.py --upstream ws://relay-host:7080/telemetry --port 7081   # relays chain
+#   python relay_server.py --measure 3       # local engine + 3 chained relays, latency per hop
+#
+# The relay subscribes once (float32 frames by default, --format json for JSON)
+# and hands every upstream payload to its viewers byte for byte: nothing is
+# decoded or re-encoded, so a chain of relays multiplies fan-out at the cost of
+# one socket hop each. Viewers must ask for the relay's format. Each viewer
+# has its own drop-oldest ConnectionSender, so a slow screen loses frames
+# without holding up the upstream read or the other screens.
+#
+# Upstream lag: a relay cannot see the engine's clock, so it tracks
+# wall time minus frame time per frame; the smallest value over the recent
+# window is the best-case path, and lag is how far the newest frame is behind
+# it (queueing anywhere upstream, or a stalled link). GET /relay reports it,
+# with the upstream frame age and reconnect count. Control messages are not
+# relayed: send /control to the engine.
+import argparse, asyncio, contextlib, itertools, statistics, time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Union
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
+import uvicorn
+import websockets
+
+try:
+    from frame_ring import FrameRing
+    from send_queue import ConnectionSender, SendQueueClosed
+    from telemetry_codec import BINARY_HEADER, BINARY_SUBPROTOCOL, negotiate
+except ImportError:
+    from .frame_ring import FrameRing
+    from .send_queue import ConnectionSender, SendQueueClosed
+    from .telemetry_codec import BINARY_HEADER, BINARY_SUBPROTOCOL, negotiate
+
+HOST="0.0.0.0"; PORT=7080
+UPSTREAM = "ws://localhost:7070/telemetry"
+RING_CAPACITY = 120
+LAG_WINDOW = 600        # frames in the best-case path estimate (~10 s at 60 FPS)
+RETRY_MIN = 0.25; RETRY_MAX = 5.0
+
+Payload = Union[str, bytes]
+
+
+def frame_time(payload: Payload) -> Optional[float]:
+    """Engine time of an encoded frame without decoding it; None for non-frame messages (acks)."""
+    if isinstance(payload, bytes):
+        return BINARY_HEADER.unpack_from(payload, 0)[7] if len(payload) >= BINARY_HEADER.size else None
+    i = payload.rfind('"time":')
+    if i < 0 or payload.startswith('{"type"'):
+        return None
+    j = i + 7
+    k = j
+    while k < len(payload) and payload[k] not in ",}":
+        k += 1
+    try:
+        return float(payload[j:k])
+    except ValueError:
+        return None
+
+
+class Relay:
+    def __init__(self, upstream: str = UPSTREAM, fmt: str = "f32"):
+        self.upstream = upstream
+        self.mode = "json" if fmt == "json" else "f32"
+        self.ring = FrameRing(RING_CAPACITY)
+        self.senders: Dict[int, ConnectionSender] = {}
+        self.ids = itertools.count(1)
+        self.connected = False
+        self.frames = 0
+        self.reconnects = 0
+        self.lag = 0.0
+        self._offsets: Deque[float] = deque(maxlen=LAG_WINDOW)
+        self._last_t: Optional[float] = None
+        self._last_wall: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    async def _run(self) -> None:
+        delay = RETRY_MIN
+        subprotocols = [BINARY_SUBPROTOCOL] if self.mode == "f32" else None
+        while True:
+            try:
+                async with websockets.connect(self.upstream, subprotocols=subprotocols,
+                                              compression=None, max_size=None) as ws:
+                    self.connected = True
+                    delay = RETRY_MIN
+                    async for payload in ws:
+                        if self._observe(payload):
+                            self.ring.publish(payload)
+            except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+                print(f"Relay upstream {self.upstream}: {e!r}")
+            self.connected = False
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(2 * delay, RETRY_MAX)
+
+    def _observe(self, payload: Payload) -> bool:
+        t = frame_time(payload)
+        if t is None:
+            return False
+        wall = time.monotonic()
+        if self._last_t is not None and abs(t - self._last_t) > 1.0:
+            self._offsets.clear()   # seek or reconnect: engine time jumped, start a new baseline
+        self._offsets.append(wall - t)
+        self.lag = self._offsets[-1] - min(self._offsets)
+        self._last_t = t; self._last_wall = wall
+        self.frames += 1
+        return True
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "upstream": self.upstream, "format": self.mode, "connected": self.connected,
+            "frames": self.frames, "reconnects": self.reconnects, "lag_ms": 1e3 * self.lag,
+            "age_ms": 1e3 * (time.monotonic() - self._last_wall) if self._last_wall else None,
+            "viewers": len(self.senders), "dropped": sum(s.dropped for s in self.senders.values()),
+        }
+
+
+async def send_frames(relay: Relay, sender: ConnectionSender):
+    seq = 0
+    while True:
+        seq, payload = await relay.ring.next_after(seq)
+        sender.offer(payload)
+
+async def drain_messages(ws: WebSocket):
+    while True:   # only to notice the viewer leaving
+        await ws.receive_text()
+
+def make_app(relay: Relay) -> FastAPI:
+    app = FastAPI()
+    app.state.relay = relay
+
+    @app.on_event("shutdown")
+    async def stop_relay():
+        await relay.stop()
+
+    @app.get("/", response_class=PlainTextResponse)
+    def root(): return f"Relay OK ({relay.mode} from {relay.upstream}). WS: /telemetry  GET /relay  GET /connections"
+
+    @app.get("/relay")
+    def relay_stats(): return relay.stats()
+
+    @app.get("/connections")
+    def connection_stats(): return [s.stats() for s in relay.senders.values()]
+
+    @app.websocket("/telemetry")
+    async def telemetry(ws: WebSocket, format: str = None):
+        mode, subprotocol = negotiate(ws.scope.get("subprotocols", []), format)
+        if mode != relay.mode:
+            await ws.close(code=1003)   # frames are passed through, never transcoded
+            return
+        await ws.accept(subprotocol=subprotocol)
+        relay.start()
+        conn_id = next(relay.ids)
+        client = ws.client
+        sender = relay.senders[conn_id] = ConnectionSender(
+            ws, name=f"{client.host}:{client.port}" if client else str(conn_id)).start()
+        tasks = [asyncio.create_task(send_frames(relay, sender)), asyncio.create_task(drain_messages(ws))]
+        try:
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+                for t in done:
+                    t.result()
+            finally:
+                for t in tasks:
+                    t.cancel()
+        except (WebSocketDisconnect, SendQueueClosed):
+            pass
+        finally:
+            relay.senders.pop(conn_id, None)
+            await sender.close()
+
+    return app
+
+app = make_app(Relay())
+
+
+async def serve(app: FastAPI, host: str = "127.0.0.1", port: int = 0) -> uvicorn.Server:
+    """Start app on an in-process uvicorn server (port 0 = any free port); returns once it listens."""
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="off"))
+    server.task = asyncio.create_task(server.serve())
+    while not server.started:
+        if server.task.done():
+            server.task.result()
+            raise RuntimeError("server exited during startup")
+        await asyncio.sleep(0.01)
+    server.url = f"ws://{host}:{server.servers[0].sockets[0].getsockname()[1]}/telemetry"
+    return server
+
+
+async def measure_hops(urls: List[str], frames: int = 120) -> List[float]:
+    """Median extra delay (s) of each url after the first, matching frames by their binary seq."""
+    arrivals: List[Dict[int, float]] = [{} for _ in urls]
+
+    async def listen(i, url):
+        async with websockets.connect(url, subprotocols=[BINARY_SUBPROTOCOL], compression=None) as ws:
+            while len(arrivals[-1]) < frames:
+                payload = await ws.recv()
+                if isinstance(payload, bytes):
+                    arrivals[i].setdefault(BINARY_HEADER.unpack_from(payload, 0)[6], time.perf_counter())
+
+    tasks = [asyncio.create_task(listen(i, u)) for i, u in enumerate(urls)]
+    try:
+        await tasks[-1]
+    finally:
+        for t in tasks:
+            t.cancel()
+    hops = []
+    for up, down in zip(arrivals, arrivals[1:]):
+        common = up.keys() & down.keys()
+        hops.append(statistics.median(down[s] - up[s] for s in common) if common else float("nan"))
+    return hops
+
+
+async def measure_chain(relays: int, frames: int = 300) -> List[float]:
+    try:
+        import engine_server as es
+    except ImportError:
+        from . import engine_server as es
+    servers = [await serve(es.app)]
+    chain = []
+    for _ in range(relays):
+        chain.append(Relay(servers[-1].url))
+        servers.append(await serve(make_app(chain[-1])))
+    try:
+        return await measure_hops([s.url for s in servers], frames)
+    finally:
+        for r in chain:
+            await r.stop()
+        for s in reversed(servers):
+            s.should_exit = True
+            await s.task
+        await es.stop_tick()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--upstream", default=UPSTREAM)
+    ap.add_argument("--format", default="f32", choices=["f32", "json"])
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--measure", type=int, metavar="N", help="run a local engine + N chained relays and report latency per hop")
+    args = ap.parse_args()
+    if args.measure:
+        hops = asyncio.run(measure_chain(args.measure))
+        for i, h in enumerate(hops):
+            print(f"hop {i}: {'engine' if i == 0 else f'relay {i}'} -> relay {i + 1}  +{1e3 * h:.2f} ms (median)")
+        return
+    global app
+    app = make_app(Relay(args.upstream, args.format))
+    uvicorn.run(app, host=HOST, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
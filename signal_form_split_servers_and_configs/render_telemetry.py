@@ -0,0 +1,173 @@
+# render_telemetry.py
+# Headless, faster-than-real-time render of EngineRunner telemetry to columnar chunks
+# Requires: numpy, scipy
+# Run:
+#   python render_telemetry.py --out renders/show --duration 3600            # an hour at 60 FPS
+#   python render_telemetry.py --out renders/show --duration 3600 --workers 8 --n 4096 --K 64
+#
+# Output directory:
+#   manifest.json        fps, dt, sizes, field list and the time index: one entry
+#                        per chunk with its first frame, frame count, t0 and t1
+#   chunk_000000.npz ... np.savez_compressed, one array per telemetry field with a
+#                        leading time axis ("time", "frame", "c", "lambdas", "pmw",
+#                        "S.U", "stokes.S0", "green.radius", ... as in telemetry_codec)
+#
+# There is no asyncio and no sleeping: each block of frames is synthesized in
+# closed form (EngineRunner.render) and pushed through the engine in one
+# vectorized step_block call. Chunks are independent — every chunk seeks to its
+# start minus WARMUP_FRAMES and discards those frames so the engine's smoothing
+# and running power have converged — so chunks render in parallel across a
+# process pool, and the output does not depend on the number of workers.
+import argparse, json, math, os, tempfile, time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    from engine_runner import EngineRunner, FPS
+    from telemetry_codec import BINARY_SCALARS
+except ImportError:
+    from .engine_runner import EngineRunner, FPS
+    from .telemetry_codec import BINARY_SCALARS
+
+MANIFEST = "manifest.json"
+RENDER_VERSION = 1
+WARMUP_FRAMES = 300      # 0.2**300 smoothing and 0.95**300 power memory: negligible
+BLOCK_FRAMES = 600       # frames synthesized and stepped per vectorized call
+CHUNK_FRAMES = 3600      # frames per chunk file (one minute at 60 FPS)
+
+
+def chunk_name(i: int) -> str:
+    return f"chunk_{i:06d}.npz"
+
+
+def render_chunk(out: str, index: int, frame0: int, frames: int, opts: Dict[str, Any]) -> Dict[str, Any]:
+    """Render frames [frame0, frame0 + frames) into chunk `index`; returns its manifest entry."""
+    runner = EngineRunner(n=opts["n"], K=opts["K"], backend=opts["backend"])
+    runner.pmw = opts["pmw"]
+    dt = runner.dt
+    block = max(1, int(opts.get("block", BLOCK_FRAMES)))
+    cols: Dict[str, List[np.ndarray]] = {}
+    start = max(0, frame0 - WARMUP_FRAMES)
+    runner.seek(start * dt)
+    for f in range(start, frame0 + frames, block):
+        m = np.arange(f, min(f + block, frame0 + frames))
+        tel = runner.eng.step_block(runner.render(m * dt)["s"])
+        keep = m >= frame0
+        if not keep.any():
+            continue
+        tel["time"] = m * dt; tel["frame"] = m; tel["pmw"] = np.full(len(m), runner.pmw)
+        for k, v in tel.items():
+            cols.setdefault(k, []).append(np.asarray(v)[keep])
+    arrays = {k: np.concatenate(v) for k, v in cols.items()}
+    # atomic write: readers never see a half-written chunk
+    fd, tmp = tempfile.mkstemp(dir=out, suffix=".npz.tmp")
+    with os.fdopen(fd, "wb") as fh:
+        np.savez_compressed(fh, **arrays)
+    os.replace(tmp, os.path.join(out, chunk_name(index)))
+    return {"file": chunk_name(index), "frame0": int(frame0), "frames": int(frames),
+            "t0": float(arrays["time"][0]), "t1": float(arrays["time"][-1])}
+
+
+def render(out: str, duration: float, n: int = 256, K: int = 32, backend: str = "eigen",
+           pmw: float = 0.5, start: float = 0.0, chunk_frames: int = CHUNK_FRAMES,
+           block: int = BLOCK_FRAMES, workers: int = 1) -> Dict[str, Any]:
+    """Render `duration` seconds from engine time `start`; writes chunks and manifest.json."""
+    os.makedirs(out, exist_ok=True)
+    dt = 1.0 / FPS
+    first = int(round(start / dt)); total = int(round(duration / dt))
+    spans = [(i, first + off, min(chunk_frames, total - off))
+             for i, off in enumerate(range(0, total, chunk_frames))]
+    opts = {"n": n, "K": K, "backend": backend, "pmw": pmw, "block": block}
+    if workers > 1 and len(spans) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futs = [pool.submit(render_chunk, out, i, f0, nf, opts) for i, f0, nf in spans]
+            chunks = [f.result() for f in futs]
+    else:
+        chunks = [render_chunk(out, i, f0, nf, opts) for i, f0, nf in spans]
+    with np.load(os.path.join(out, chunks[0]["file"])) as z:
+        fields = {k: list(z[k].shape[1:]) for k in z.files}
+    manifest = {"version": RENDER_VERSION, "fps": FPS, "dt": dt, "n": n, "K": K,
+                "backend": backend, "frames": total, "fields": fields, "chunks": chunks}
+    with open(os.path.join(out, MANIFEST), "w") as fh:
+        json.dump(manifest, fh, indent=1)
+    return manifest
+
+
+class RenderReader:
+    """Read a render directory: time-range column loads for notebooks, telemetry dicts for replay."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as fh:
+            self.manifest = json.load(fh)
+        self.chunks = self.manifest["chunks"]
+        self._t0 = np.array([c["t0"] for c in self.chunks])
+
+    @property
+    def duration(self) -> float:
+        return self.chunks[-1]["t1"] - self.chunks[0]["t0"] if self.chunks else 0.0
+
+    def _chunk_index(self, t: float) -> int:
+        return max(0, int(np.searchsorted(self._t0, t, side="right")) - 1)
+
+    def load(self, t0: Optional[float] = None, t1: Optional[float] = None, fields=None) -> Dict[str, np.ndarray]:
+        """Columns for frames with t0 <= time <= t1, touching only the chunks that overlap."""
+        lo = -math.inf if t0 is None else t0; hi = math.inf if t1 is None else t1
+        parts: Dict[str, List[np.ndarray]] = {}
+        for c in self.chunks[self._chunk_index(lo):]:
+            if c["t0"] > hi:
+                break
+            with np.load(os.path.join(self.path, c["file"])) as z:
+                t = z["time"]
+                sel = (t >= lo) & (t <= hi)
+                for k in (fields or z.files):
+                    parts.setdefault(k, []).append(z[k][sel])
+        return {k: np.concatenate(v) for k, v in parts.items()}
+
+    def frames(self, t0: float = 0.0) -> Iterator[Dict[str, Any]]:
+        """Telemetry dicts (the EngineRunner.step() schema) from engine time t0 on, one chunk in memory at a time."""
+        for c in self.chunks[self._chunk_index(t0):]:
+            cols = self.load(max(t0, c["t0"]), c["t1"])
+            for i in range(len(cols["time"])):
+                yield columns_to_telemetry(cols, i)
+
+
+def columns_to_telemetry(cols: Dict[str, np.ndarray], i: int) -> Dict[str, Any]:
+    v = {k: float(cols[k][i]) for k in BINARY_SCALARS}
+    return {
+        "c": cols["c"][i], "lambdas": cols["lambdas"][i],
+        "S": {"U": v["S.U"], "F": v["S.F"], "blend": v["S.blend"]},
+        "stokes": {"S0": v["stokes.S0"], "S1": v["stokes.S1"], "S2": v["stokes.S2"], "S3": v["stokes.S3"],
+                   "pair": [int(v["stokes.pair0"]), int(v["stokes.pair1"])]},
+        "entropy": v["entropy"], "R": v["R"],
+        "green": {"x0": int(v["green.x0"]), "t": v["green.t"], "summary": {"radius": v["green.radius"]}},
+        "quality": 0, "pmw": v["pmw"], "time": float(cols["time"][i]),   # renders are always full quality
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--duration", type=float, required=True, help="seconds of engine time")
+    ap.add_argument("--start", type=float, default=0.0)
+    ap.add_argument("--n", type=int, default=256)
+    ap.add_argument("--K", type=int, default=32)
+    ap.add_argument("--backend", default="eigen", choices=["eigen", "chebyshev"])
+    ap.add_argument("--pmw", type=float, default=0.5)
+    ap.add_argument("--chunk", type=int, default=CHUNK_FRAMES, help="frames per chunk file")
+    ap.add_argument("--block", type=int, default=BLOCK_FRAMES, help="frames per vectorized step")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    m = render(args.out, args.duration, n=args.n, K=args.K, backend=args.backend, pmw=args.pmw,
+               start=args.start, chunk_frames=args.chunk, block=args.block, workers=args.workers)
+    wall = time.perf_counter() - t0
+    print(f"{m['frames']} frames in {len(m['chunks'])} chunks -> {args.out} "
+          f"({wall:.1f} s, {args.duration / max(wall, 1e-9):.0f}x real time)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# replay_server.py
+# Serve a recorded show over the engine's /telemetry protocol
+# Requires: fastapi, uvicorn, numpy
+# Run:
+#   SIGNAL_FORM_RECORD=show.sflog python engine_server.py     # record a live show
+#   python replay_server.py show.sflog                        # replay it on :7072
+#   python replay_server.py renders/show --port 7073          # or a render_telemetry.py directory
+#
+# Clients connect exactly as to engine_server (JSON, "signalform.f32.v1" or
+# "signalform.delta.v1"). Each connection has its own playhead:
+#   ws://host:7072/telemetry?speed=2&t=120&loop=1
+# and can steer it with {"type": "replay", "speed": 0.5, "seek": 30.0, "loop": true};
+# the server answers with {"type": "replay_state", "time", "speed", "loop"}.
+# Log playheads run on the log's record clock (engine time, minus any seeks made
+# during the live show), so a recorded seek plays on at the frame rate.
+# Logs are read through mmap and renders one chunk at a time, so memory use
+# does not grow with the length of the recording.
+import argparse, asyncio, json, os, time
+from typing import Iterator, Optional, Tuple
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
+import uvicorn
+
+try:
+    from render_telemetry import MANIFEST, RenderReader
+    from send_queue import ConnectionSender, SendQueueClosed
+    from telemetry_codec import EncodedFrame, negotiate
+    from telemetry_delta import DeltaEncoder
+    from telemetry_log import LogReader
+except ImportError:
+    from .render_telemetry import MANIFEST, RenderReader
+    from .send_queue import ConnectionSender, SendQueueClosed
+    from .telemetry_codec import EncodedFrame, negotiate
+    from .telemetry_delta import DeltaEncoder
+    from .telemetry_log import LogReader
+
+HOST="0.0.0.0"; PORT=7072
+MIN_SPEED = 0.25; MAX_SPEED = 8.0
+SOURCE_PATH = os.environ.get("SIGNAL_FORM_REPLAY", "")
+
+
+class ReplaySource:
+    """A recording (telemetry_log) or a render directory (render_telemetry) as a frame stream."""
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.isfile(os.path.join(path, MANIFEST)):
+            self._render = RenderReader(path); self._log = None
+            self.start = self._render.chunks[0]["t0"] if self._render.chunks else 0.0
+        else:
+            self._log = LogReader(path); self._render = None
+            self.start = self._log.start
+
+    def frames(self, t0: Optional[float] = None) -> Iterator[Tuple[float, EncodedFrame]]:
+        if self._log is not None:
+            last = {}
+            for _, clock, payload in self._log.frames(t0):
+                frame = EncodedFrame.from_text(bytes(payload).decode())
+                # slow fields are recorded only when recomputed: carry them forward
+                # for binary/delta viewers; JSON viewers get the recorded text as is
+                for k, v in last.items():
+                    frame.tel.setdefault(k, v)
+                last = frame.tel
+                yield clock, frame
+        else:
+            for tel in self._render.frames(self.start if t0 is None else t0):
+                yield tel["time"], EncodedFrame(tel)
+
+
+class Playhead:
+    """Per-connection replay position; time maps to wall clock as t = t_anchor + speed * (now - w_anchor)."""
+
+    def __init__(self, source: ReplaySource, speed: float = 1.0, t: Optional[float] = None, loop: bool = False):
+        self.source = source
+        self.loop = loop
+        self.speed = min(max(float(speed), MIN_SPEED), MAX_SPEED)
+        self.changed = asyncio.Event()
+        self._anchor(source.start if t is None else t)
+
+    def _anchor(self, t: float):
+        self.t_anchor = t; self.w_anchor = time.monotonic()
+
+    def now(self) -> float:
+        return self.t_anchor + self.speed * (time.monotonic() - self.w_anchor)
+
+    def set_speed(self, speed: float):
+        self._anchor(self.now())
+        self.speed = min(max(float(speed), MIN_SPEED), MAX_SPEED)
+
+    def seek(self, t: float):
+        self._anchor(float(t))
+        self.changed.set()   # the frame loop restarts from the new position
+
+    def state(self) -> dict:
+        return {"type": "replay_state", "time": self.now(), "speed": self.speed, "loop": self.loop}
+
+
+app = FastAPI()
+source: Optional[ReplaySource] = None
+
+def get_source() -> ReplaySource:
+    global source
+    if source is None:
+        if not SOURCE_PATH:
+            raise RuntimeError("no recording configured (SIGNAL_FORM_REPLAY or command line)")
+        source = ReplaySource(os.path.expanduser(SOURCE_PATH))
+    return source
+
+@app.get("/", response_class=PlainTextResponse)
+def root(): return "Replay Server OK. WS: /telemetry?speed=&t=&loop="
+
+async def play(head: Playhead, sender: ConnectionSender, mode: str, want_key: asyncio.Event):
+    seq = 0
+    delta = DeltaEncoder()
+    while True:
+        head.changed.clear()
+        delta.reset()   # a jump in time starts delta viewers from a keyframe
+        for t, frame in head.source.frames(head.t_anchor):
+            wait = (t - head.now()) / head.speed
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(head.changed.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            if head.changed.is_set():
+                break
+            seq += 1
+            frame.seq = seq
+            if mode == "delta":
+                if want_key.is_set():
+                    want_key.clear(); delta.reset()
+                frame.encode_delta(delta)
+                if frame.delta is not None and not sender.offer(frame.delta):
+                    want_key.set()
+            else:
+                sender.offer(frame.binary if mode == "f32" else frame.text)
+        else:
+            if not head.loop:
+                sender.put(json.dumps(dict(head.state(), ended=True)))
+                await head.changed.wait()   # parked at the end until a seek
+                continue
+            head.seek(head.source.start)
+
+async def read_replay_messages(ws: WebSocket, head: Playhead, sender: ConnectionSender, want_key: asyncio.Event):
+    while True:
+        try:
+            msg = json.loads(await ws.receive_text())
+        except ValueError:
+            continue
+        if not isinstance(msg, dict):
+            continue
+        if msg.get("type") == "keyframe":
+            want_key.set()
+        elif msg.get("type") == "replay":
+            try:
+                if "loop" in msg: head.loop = bool(msg["loop"])
+                if "speed" in msg: head.set_speed(msg["speed"])
+                if "seek" in msg: head.seek(msg["seek"])
+            except (TypeError, ValueError) as e:
+                sender.put(json.dumps({"type": "replay_state", "error": str(e)}))
+                continue
+            sender.put(json.dumps(head.state()))
+
+@app.websocket("/telemetry")
+async def telemetry(ws: WebSocket, format: str = None, speed: float = 1.0, t: float = None, loop: bool = False):
+    mode, subprotocol = negotiate(ws.scope.get("subprotocols", []), format)
+    await ws.accept(subprotocol=subprotocol)
+    head = Playhead(get_source(), speed=speed, t=t, loop=loop)
+    sender = ConnectionSender(ws).start()
+    want_key = asyncio.Event()
+    tasks = [asyncio.create_task(play(head, sender, mode, want_key)),
+             asyncio.create_task(read_replay_messages(ws, head, sender, want_key))]
+    try:
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+    except (WebSocketDisconnect, SendQueueClosed):
+        pass
+    finally:
+        await sender.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("recording", nargs="?", default=SOURCE_PATH, help="telemetry log or render directory")
+    ap.add_argument("--port", type=int, default=PORT)
+    args = ap.parse_args()
+    SOURCE_PATH = args.recording
+    uvicorn.run(app, host=HOST, port=args.port)
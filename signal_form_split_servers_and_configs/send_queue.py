@@ -0,0 +1,97 @@
+# send_queue.py
+# Per-connection outbound queues drained by a dedicated writer task
+#
+# Producers never await the socket: telemetry frames go into a small bounded
+# deque that drops its oldest entry when full (a slow viewer just sees fewer,
+# newer frames), while control and presence events go into a separate
+# lossless queue that the writer always drains first. A viewer so far behind
+# that even the lossless queue hits its limit is treated as a dead link and
+# closed. Counters per connection identify bad links.
+import asyncio
+import contextlib
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Union
+
+Payload = Union[str, bytes]
+
+FRAME_QUEUE = 4        # telemetry frames buffered per viewer (~67 ms at 60 FPS)
+EVENT_QUEUE = 1024     # undelivered control/presence events before the link is dropped
+
+
+class SendQueueClosed(ConnectionError):
+    """The connection's writer has stopped; nothing more can be queued."""
+
+
+class ConnectionSender:
+    def __init__(self, ws, frames: int = FRAME_QUEUE, events: int = EVENT_QUEUE, name: str = ""):
+        self.ws = ws
+        self.name = name
+        self._frames: Deque[Payload] = deque(maxlen=max(1, int(frames)))
+        self._events: Deque[Payload] = deque()
+        self._event_limit = max(1, int(events))
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+        self.sent = 0
+        self.dropped = 0
+
+    def start(self) -> "ConnectionSender":
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    @property
+    def closed(self) -> bool:
+        return self._task is not None and self._task.done()
+
+    def _check(self) -> None:
+        if self.closed:
+            raise SendQueueClosed(f"writer for {self.name or 'connection'} stopped: {self._error!r}")
+
+    def offer(self, payload: Payload) -> bool:
+        """Queue a telemetry frame, evicting the oldest queued frame if full. False if one was dropped."""
+        self._check()
+        full = len(self._frames) == self._frames.maxlen
+        if full:
+            self.dropped += 1
+        self._frames.append(payload)
+        self._ready.set()
+        return not full
+
+    def put(self, payload: Payload) -> None:
+        """Queue a control/presence event; these are never dropped."""
+        self._check()
+        if len(self._events) >= self._event_limit:
+            self._error = SendQueueClosed("event queue overflow")
+            if self._task is not None:
+                self._task.cancel()
+            raise self._error
+        self._events.append(payload)
+        self._ready.set()
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                while not self._events and not self._frames:
+                    self._ready.clear()
+                    await self._ready.wait()
+                payload = self._events.popleft() if self._events else self._frames.popleft()
+                if isinstance(payload, bytes):
+                    await self.ws.send_bytes(payload)
+                else:
+                    await self.ws.send_text(payload)
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:   # disconnects surface to producers as SendQueueClosed
+            self._error = e
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "sent": self.sent, "dropped": self.dropped,
+                "queued_frames": len(self._frames), "queued_events": len(self._events)}
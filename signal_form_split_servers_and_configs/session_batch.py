@@ -0,0 +1,187 @@
+# session_batch.py
+# Many independent sessions on one graph, stepped as one batch per tick
+# Requires: numpy, scipy
+#
+# Every session has its own synthetic field (frame index, pmw, pulses, heat
+# source) and its own smoothing/whitening state, exactly as if it had its own
+# EngineRunner, but the state lives in (S, K) arrays over the one shared
+# eigenbasis. A tick is then one vectorized synthesis of the (S, K) modal
+# vectors, one np.add.at for every session's pulses (a single PulseBank whose
+# index is row * spectrum length + mode), one batched irfft to (S, n) node
+# fields, one (S, n) @ (n, K) projection and the telemetry math with a leading
+# session axis: the Python cost per tick does not grow with S.
+#
+# Rows stay dense: removing a session moves the last row into its slot (and
+# re-indexes that row's pulses), so a tick never touches dead rows.
+# Only the "eigen" backend batches; the Chebyshev channels are not a linear
+# projection. step() returns columns like SignalFormEngine.step_block with the
+# session axis first; render_telemetry.columns_to_telemetry(cols, i) gives
+# session i's telemetry dict in the EngineRunner.step() schema.
+import math
+from typing import Any, Dict, Hashable, List
+
+import numpy as np
+
+try:
+    from engine import EPS
+    from engine_runner import EngineRunner
+    from pulse_bank import PulseBank
+except ImportError:
+    from .engine import EPS
+    from .engine_runner import EngineRunner
+    from .pulse_bank import PulseBank
+
+KX, KY = 1, 2   # Stokes mode pair, as in EngineRunner.step
+
+
+class SessionBatch:
+    def __init__(self, n=256, K=32, x0=0, t_heat=0.12, capacity: int = 64):
+        # one EngineRunner supplies the graph, the eigenbasis and the synthesis constants
+        self.proto = EngineRunner(n=n, K=K, x0=x0, t_heat=t_heat)
+        eng = self.proto.eng
+        if not hasattr(eng, "modes"):
+            raise ValueError("SessionBatch needs the eigenbasis engine backend")
+        self.eng = eng
+        self.n, self.K, self.dt = eng.n, eng.K, self.proto.dt
+        self.x0, self.t_heat = int(eng.cfg.x0), float(eng.cfg.t_heat)
+        self._nspec = max(self.n//2 + 1, self.K)
+        self.ids: List[Hashable] = []          # session id of each row
+        self.rows: Dict[Hashable, int] = {}
+        self.pulses = PulseBank()
+        self._alloc(max(1, int(capacity)))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _alloc(self, cap: int) -> None:
+        old = getattr(self, "_frame", None)
+        size = len(self.ids)
+        arrays = {"_frame": ((cap,), np.int64), "_pmw": ((cap,), np.float64),
+                  "_x0": ((cap,), np.intp), "_t_heat": ((cap,), np.float64),
+                  "_ticks": ((cap,), np.int64), "_c": ((cap, self.K), np.float64),
+                  "_c_prev": ((cap, self.K), np.float64), "_power": ((cap, self.K), np.float64),
+                  "_spec": ((cap, self._nspec), np.complex128)}
+        for name, (shape, dtype) in arrays.items():
+            new = np.zeros(shape, dtype=dtype)
+            if old is not None:
+                new[:size] = getattr(self, name)[:size]
+            setattr(self, name, new)
+
+    def add(self, sid: Hashable, pmw: float = 0.5) -> int:
+        """Start a session at engine time 0; returns its row."""
+        if sid in self.rows:
+            raise ValueError(f"session {sid!r} already exists")
+        row = len(self.ids)
+        if row == len(self._frame):
+            self._alloc(2 * row)
+        self.ids.append(sid); self.rows[sid] = row
+        self._frame[row] = 0; self._pmw[row] = pmw
+        self._x0[row] = self.x0; self._t_heat[row] = self.t_heat
+        self._reset(row)
+        return row
+
+    def remove(self, sid: Hashable) -> None:
+        row = self.rows.pop(sid)
+        last = len(self.ids) - 1
+        owner = self._pulse_rows()
+        self.pulses.discard(owner == row)
+        if row != last:
+            for name in ("_frame", "_pmw", "_x0", "_t_heat", "_ticks", "_c", "_c_prev", "_power"):
+                arr = getattr(self, name)
+                arr[row] = arr[last]
+            moved = self._pulse_rows() == last
+            self.pulses.k[:len(self.pulses)][moved] -= (last - row) * self._nspec
+            self.ids[row] = self.ids[last]; self.rows[self.ids[row]] = row
+        self.ids.pop()
+
+    def _pulse_rows(self) -> np.ndarray:
+        return self.pulses.k[:len(self.pulses)] // self._nspec
+
+    def _reset(self, row: int) -> None:
+        # SignalFormEngine.reset() for one session
+        self._ticks[row] = 0
+        self._c[row] = 0.0; self._c_prev[row] = 0.0; self._power[row] = EPS
+
+    def frame_of(self, sid: Hashable) -> int:
+        return int(self._frame[self.rows[sid]])
+
+    def time_of(self, sid: Hashable) -> float:
+        return self.frame_of(sid) * self.dt
+
+    def apply(self, sid: Hashable, cmds) -> None:
+        """EngineRunner.apply for one session: ("pmw", v), ("heat", x0, t), ("pulse", k, amp, decay), ("seek", t)."""
+        row = self.rows[sid]
+        for cmd in cmds:
+            if cmd[0] == "pmw": self._pmw[row] = cmd[1]
+            elif cmd[0] == "heat":
+                if cmd[1] is not None: self._x0[row] = min(max(int(cmd[1]), 0), self.n - 1)
+                if cmd[2] is not None: self._t_heat[row] = max(float(cmd[2]), 0.0)
+            elif cmd[0] == "pulse":
+                k = max(0, min(int(cmd[1]), self.K - 1))
+                self.pulses.add(row*self._nspec + k, float(cmd[2]), float(cmd[3]), born=int(self._frame[row]))
+            elif cmd[0] == "seek":
+                self._frame[row] = max(0, int(np.rint(float(cmd[1]) / self.dt)))
+                self.pulses.seek(int(self._frame[row]), where=self._pulse_rows() == row)
+                self._reset(row)
+
+    def step(self) -> Dict[str, Any]:
+        """Advance every session one frame; columns with a leading session axis (ids in self.ids)."""
+        S = len(self.ids)
+        p = self.proto
+        frame, pmw = self._frame[:S], self._pmw[:S]
+        spec = self._spec[:S]
+        spec[:] = 0
+        # synthetic modal vectors, EngineRunner.step with a session axis
+        phi = (p.omega*self.dt) * (frame + 1.0)
+        mag = p.amps * (0.75 + 0.25*np.sin(phi[:, None] + p._offsets))
+        spec[:, p._active] = mag * np.exp(1j * phi[:, None] * p._phase_mul)
+        self.pulses.accumulate(self._spec.reshape(-1))
+        spec[:, 0] += 0.3*pmw
+        s = np.fft.irfft(spec, n=self.n, axis=1)
+        raw = s @ self.eng.modes
+
+        # SignalFormEngine.step per row: smoothing (none on a session's first tick) and running power
+        cfg = self.eng.cfg
+        first = self._ticks[:S] == 0
+        a = np.where(first, 0.0, float(cfg.smooth))[:, None]
+        prev = self._c[:S].copy()
+        c = self._c[:S] = a * prev + (1.0 - a) * raw
+        self._c_prev[:S] = prev
+        energy = c * c
+        power = self._power[:S] = np.where(first[:, None], energy + EPS,
+                                           self._power[:S] + 0.05 * (energy - self._power[:S]))
+        white = energy / np.power(power + EPS, cfg.alpha_white)
+        total = white.sum(axis=1)
+        ok = total > EPS
+        pr = np.where(ok[:, None], white / np.where(ok, total, 1.0)[:, None], 1.0 / self.K)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            plogp = np.where(pr > EPS, pr * np.log(np.where(pr > EPS, pr, 1.0)), 0.0)
+        entropy = -plogp.sum(axis=1) / math.log(self.K) if self.K > 1 else np.zeros(S)
+        U = pr[:, :self.eng._low].sum(axis=1)
+        F = (pr * self.eng.lambdas).sum(axis=1) / self.eng._lam_max
+        kx = min(KX, self.K - 1); ky = min(KY, self.K - 1)
+        ax, ay, px, py = c[:, kx], c[:, ky], prev[:, kx], prev[:, ky]
+        n_now = np.linalg.norm(c, axis=1); n_prev = np.linalg.norm(prev, axis=1)
+        live = (n_now > EPS) & (n_prev > EPS)
+        R = np.where(live, (c * prev).sum(axis=1) / np.where(live, n_now * n_prev, 1.0), 0.0)
+        x0, t_heat = self._x0[:S].copy(), self._t_heat[:S].copy()
+        radius = np.empty(S)
+        # a handful of distinct heat settings at most: one cached filter each
+        pairs, inverse = np.unique(np.stack([x0.astype(np.float64), t_heat], axis=1), axis=0, return_inverse=True)
+        for j, (px0, pt) in enumerate(pairs):
+            radius[inverse.reshape(-1) == j] = self.eng.heat_filter(int(px0), float(pt))[1]
+
+        time = frame * self.dt
+        self._ticks[:S] += 1
+        self._frame[:S] += 1
+        lam = np.asarray(self.eng.lambdas[:8], dtype=np.float64)
+        return {
+            "c": c.copy(), "lambdas": np.broadcast_to(lam, (S, len(lam))),
+            "S.U": U, "S.F": F, "S.blend": 0.5 * (U + F),
+            "stokes.S0": ax * ax + ay * ay, "stokes.S1": ax * ax - ay * ay,
+            "stokes.S2": 2.0 * ax * ay, "stokes.S3": 2.0 * (ax * py - ay * px),
+            "stokes.pair0": np.full(S, kx), "stokes.pair1": np.full(S, ky),
+            "entropy": entropy, "R": np.clip(R, 0.0, 1.0),
+            "green.x0": x0, "green.t": t_heat, "green.radius": radius,
+            "pmw": pmw.copy(), "time": time,
+        }
@@ -0,0 +1,234 @@
+# telemetry_codec.py
+# Telemetry frame encoding shared by the engine servers
+# Requires: numpy
+#
+# Frames are encoded once per tick and the same payload is handed to every
+# connection. encode_json() has a fast path for the fixed EngineRunner schema
+# (c, S, stokes, entropy, R, green, lambdas, pmw, time): one precompiled
+# %-template per (len(c), len(lambdas)), numbers at float32 precision (%.7g)
+# except `time`, which keeps sub-millisecond resolution over multi-hour runs.
+# Anything outside that schema goes through json.dumps.
+#
+# Opt-in binary layout (subprotocol "signalform.f32.v1" or ?format=f32),
+# all little-endian:
+#   header  24 bytes  magic b"SFT1", u8 version, u8 flags (bits 4-6 = quality level),
+#                     u16 K, u16 nlambdas, u16 nscalars, u32 seq, f64 time
+#   body    float32   scalars (BINARY_SCALARS order), c[K], lambdas[nlambdas]
+import json
+import math
+import struct
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+import numpy as np
+
+try:
+    from telemetry_delta import (DELTA_SUBPROTOCOL, FLAG_KEYFRAME, QUALITY_MASK, QUALITY_SHIFT,
+                                 keyframe_from_snapshot, quality_flags)
+except ImportError:
+    from .telemetry_delta import (DELTA_SUBPROTOCOL, FLAG_KEYFRAME, QUALITY_MASK, QUALITY_SHIFT,
+                                  keyframe_from_snapshot, quality_flags)
+
+SCHEMA_KEYS = ("c", "S", "stokes", "entropy", "R", "green", "lambdas", "pmw", "time")
+_SCHEMA = frozenset(SCHEMA_KEYS)
+_TEMPLATES: Dict[Tuple[int, int], str] = {}
+_ALWAYS = frozenset(("time", "quality"))   # kept in every field subset
+
+BINARY_SUBPROTOCOL = "signalform.f32.v1"
+BINARY_MAGIC = b"SFT1"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sBBHHHId")
+BINARY_SCALARS = ("pmw", "entropy", "R", "S.U", "S.F", "S.blend",
+                  "stokes.S0", "stokes.S1", "stokes.S2", "stokes.S3",
+                  "stokes.pair0", "stokes.pair1", "green.x0", "green.t", "green.radius")
+
+
+def _np_default(o):
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, np.generic):
+        return o.item()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> str:
+    """Compact json.dumps that also accepts numpy scalars and arrays."""
+    return json.dumps(obj, separators=(",", ":"), default=_np_default)
+
+
+def _template(nc: int, nl: int) -> str:
+    tpl = _TEMPLATES.get((nc, nl))
+    if tpl is None:
+        g = "%.7g"
+        tpl = ('{"c":[' + ",".join([g] * nc) + '],'
+               '"S":{"U":%.7g,"F":%.7g,"blend":%.7g},'
+               '"stokes":{"S0":%.7g,"S1":%.7g,"S2":%.7g,"S3":%.7g,"pair":[%d,%d]},'
+               '"entropy":%.7g,"R":%.7g,'
+               '"green":{"x0":%d,"t":%.7g,"summary":{"radius":%.7g}},'
+               '"lambdas":[' + ",".join([g] * nl) + '],'
+               '"pmw":%.7g,"time":%.12g}')
+        _TEMPLATES[(nc, nl)] = tpl
+    return tpl
+
+
+def _encode_fast(tel: Dict[str, Any]) -> Optional[str]:
+    try:
+        S = tel["S"]; st = tel["stokes"]; g = tel["green"]
+        c = tel["c"]; lam = tel["lambdas"]
+        if isinstance(c, np.ndarray): c = c.tolist()
+        if isinstance(lam, np.ndarray): lam = lam.tolist()
+        head = (S["U"], S["F"], S["blend"], st["S0"], st["S1"], st["S2"], st["S3"])
+        mid = (tel["entropy"], tel["R"])
+        tail = (tel["pmw"], tel["time"])
+        floats = (*c, *head, *mid, g["t"], g["summary"]["radius"], *lam, *tail)
+        # %.7g would print nan/inf, which is not JSON; leave those to json.dumps
+        if not math.isfinite(math.fsum(floats)):
+            return None
+        vals = (*c, *head, int(st["pair"][0]), int(st["pair"][1]), *mid,
+                int(g["x0"]), g["t"], g["summary"]["radius"], *lam, *tail)
+        return _template(len(c), len(lam)) % vals
+    except (KeyError, TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def encode_json(tel: Dict[str, Any]) -> str:
+    """Encode one telemetry dict as compact JSON text."""
+    if _SCHEMA.issubset(tel):
+        body = _encode_fast(tel)
+        if body is not None:
+            return splice_json(body, {k: v for k, v in tel.items() if k not in _SCHEMA})
+    return dumps(tel)
+
+
+def splice_json(text: str, extras: Dict[str, Any]) -> str:
+    """Append extra top-level keys to an already encoded JSON object."""
+    return text if not extras else text[:-1] + "," + dumps(extras)[1:]
+
+
+def encode_binary(tel: Dict[str, Any], seq: int = 0) -> bytes:
+    """Pack a telemetry dict into the float32 layout; arrays are cast straight into the buffer."""
+    c = tel.get("c", ()); lam = tel.get("lambdas", ())
+    K = len(c); nl = len(lam); ns = len(BINARY_SCALARS)
+    buf = bytearray(BINARY_HEADER.size + 4 * (ns + K + nl))
+    BINARY_HEADER.pack_into(buf, 0, BINARY_MAGIC, BINARY_VERSION, quality_flags(tel.get("quality", 0)),
+                            K, nl, ns, int(seq) & 0xFFFFFFFF, float(tel.get("time", 0.0)))
+    body = np.frombuffer(buf, dtype="<f4", offset=BINARY_HEADER.size)
+    S = tel.get("S", {}); st = tel.get("stokes", {}); g = tel.get("green", {})
+    pair = st.get("pair", (0, 0))
+    body[:ns] = (tel.get("pmw", 0.0), tel.get("entropy", 0.0), tel.get("R", 0.0),
+                 S.get("U", 0.0), S.get("F", 0.0), S.get("blend", 0.0),
+                 st.get("S0", 0.0), st.get("S1", 0.0), st.get("S2", 0.0), st.get("S3", 0.0),
+                 pair[0], pair[1], g.get("x0", 0), g.get("t", 0.0), g.get("summary", {}).get("radius", 0.0))
+    body[ns:ns + K] = c
+    body[ns + K:] = lam
+    return bytes(buf)
+
+
+def decode_binary(data: bytes) -> Dict[str, Any]:
+    """Inverse of encode_binary, for tests and recording tools. Arrays come back as float32."""
+    magic, version, flags, K, nl, ns, seq, t = BINARY_HEADER.unpack_from(data, 0)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError(f"not a v{BINARY_VERSION} telemetry frame")
+    body = np.frombuffer(data, dtype="<f4", count=ns + K + nl, offset=BINARY_HEADER.size)
+    v = dict(zip(BINARY_SCALARS, body[:ns].tolist()))
+    return {
+        "seq": seq, "time": t, "quality": (flags & QUALITY_MASK) >> QUALITY_SHIFT,
+        "c": body[ns:ns + K], "lambdas": body[ns + K:],
+        "pmw": v["pmw"], "entropy": v["entropy"], "R": v["R"],
+        "S": {"U": v["S.U"], "F": v["S.F"], "blend": v["S.blend"]},
+        "stokes": {"S0": v["stokes.S0"], "S1": v["stokes.S1"], "S2": v["stokes.S2"], "S3": v["stokes.S3"],
+                   "pair": [int(v["stokes.pair0"]), int(v["stokes.pair1"])]},
+        "green": {"x0": int(v["green.x0"]), "t": v["green.t"], "summary": {"radius": v["green.radius"]}},
+    }
+
+
+def negotiate(offered_subprotocols, query_format: Optional[str]) -> Tuple[str, Optional[str]]:
+    """(mode, subprotocol to accept) for a /telemetry client; mode is "json", "f32" or "delta"."""
+    offered = offered_subprotocols or ()
+    if DELTA_SUBPROTOCOL in offered:
+        return "delta", DELTA_SUBPROTOCOL
+    if BINARY_SUBPROTOCOL in offered:
+        return "f32", BINARY_SUBPROTOCOL
+    if query_format == "delta":
+        return "delta", None
+    if query_format in ("f32", "bin", "binary"):
+        return "f32", None
+    return "json", None
+
+
+class EncodedFrame:
+    """A telemetry dict plus its encodings, each computed at most once."""
+    __slots__ = ("_tel", "seq", "held", "delta", "_text", "_binary", "_variants", "_delta_ref", "_delta_key")
+
+    def __init__(self, tel: Optional[Dict[str, Any]], seq: int = 0, held=()):
+        self._tel = tel
+        self.seq = seq
+        self.held = held   # fields carried over from an earlier tick: omitted from the JSON text
+        self.delta: Optional[bytes] = None
+        self._text: Optional[str] = None
+        self._binary: Optional[bytes] = None
+        self._variants: Dict[Any, str] = {}
+        self._delta_ref = None
+        self._delta_key: Optional[bytes] = None
+
+    @classmethod
+    def from_text(cls, text: str, seq: int = 0) -> "EncodedFrame":
+        """Frame for JSON that is already encoded (e.g. read back from a recording or the
+        frame bus); the text is only parsed if something reads .tel."""
+        frame = cls(None, seq)
+        frame._text = text
+        return frame
+
+    @property
+    def tel(self) -> Dict[str, Any]:
+        if self._tel is None:
+            self._tel = json.loads(self._text)
+        return self._tel
+
+    def encode_delta(self, encoder) -> None:
+        """Run the shared DeltaEncoder on this frame; must be called once per tick, in order."""
+        try:
+            self.delta, self._delta_ref = encoder.encode(self.tel, self.seq)
+        except (KeyError, TypeError, ValueError):
+            encoder.reset()   # frame outside the schema (fallback engine): no delta encoding
+
+    @property
+    def delta_keyframe(self) -> bytes:
+        """Full quantized state at this frame, for viewers that joined late or hit a gap."""
+        if self._delta_key is None:
+            if self.delta[5] & FLAG_KEYFRAME:
+                self._delta_key = self.delta
+            else:
+                self._delta_key = keyframe_from_snapshot(self._delta_ref, self.seq, float(self.tel.get("time", 0.0)),
+                                                         int(self.tel.get("quality", 0)))
+        return self._delta_key
+
+    @property
+    def binary(self) -> bytes:
+        if self._binary is None:
+            self._binary = encode_binary(self.tel, self.seq)
+        return self._binary
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            tel = self.tel
+            self._text = encode_json({k: v for k, v in tel.items() if k not in self.held} if self.held else tel)
+        return self._text
+
+    def text_for(self, fields: Optional[FrozenSet[str]]) -> str:
+        """JSON text restricted to `fields` (time and quality are always kept), encoded once per distinct field set."""
+        if fields is None:
+            return self.text
+        out = self._variants.get(fields)
+        if out is None:
+            held = self.held
+            out = self._variants[fields] = encode_json(
+                {k: v for k, v in self.tel.items() if (k in fields or k in _ALWAYS) and k not in held})
+        return out
+
+    def text_with(self, key: Any, extras: Dict[str, Any]) -> str:
+        """Encoding with extra keys spliced in, cached under `key` (e.g. a session id)."""
+        out = self._variants.get(key)
+        if out is None:
+            out = self._variants[key] = splice_json(self.text, extras)
+        return out
@@ -0,0 +1,215 @@
+# telemetry_delta.py
+# Delta + 16-bit quantized telemetry with periodic keyframes
+# Requires: numpy
+#
+# Negotiated like the float32 mode: subprotocol "signalform.delta.v1" or ?format=delta.
+# Every float field is quantized to int16 fixed point against a full-scale
+# value taken from the data: each keyframe carries one f32 scale per float
+# field, HEADROOM times the largest magnitude the field reached since the
+# previous keyframe, and a value that would clip forces an early keyframe with
+# a wider scale. Engine fields span very different ranges (|c| ~ 0.1, Stokes S3
+# ~ 1e-3, small lambdas ~ 1e-3), so a fixed range would leave most of them as
+# quantization noise. The encoder keeps the last transmitted (reference) value
+# of each field and a delta frame carries only fields whose quantized value
+# moved by more than that field's epsilon, a fraction of its scale; a keyframe
+# carries all of them. Because the client applies exactly the same quantized
+# values and scales, its state always equals the encoder's reference, and
+# drift never exceeds one epsilon.
+#
+# Frame layout, little-endian:
+#   header  24 bytes  magic b"SFD1", u8 version, u8 flags (bit0 = keyframe,
+#                     bits 4-6 = quality level, see quality_governor.py),
+#                     u16 K, u16 nlambdas, u16 nfields, u32 seq, f64 time
+#   scales  keyframes only: f32 full-scale value of each float field, in FIELDS order
+#   fields  nfields x (u8 field id, int16[field length])
+# Clients track seq: a delta whose seq is not last+1 means a gap, after which
+# they ignore deltas and send {"type": "keyframe"} until a keyframe arrives.
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DELTA_SUBPROTOCOL = "signalform.delta.v1"
+DELTA_MAGIC = b"SFD1"
+DELTA_VERSION = 2
+DELTA_HEADER = struct.Struct("<4sBBHHHId")
+FLAG_KEYFRAME = 0x01
+QUALITY_SHIFT = 4
+QUALITY_MASK = 0x70
+KEYFRAME_INTERVAL = 60
+Q = 32767
+HEADROOM = 2.0       # full scale = HEADROOM x the field's peak magnitude over the last keyframe interval
+MIN_SCALE = 1e-12    # scale of a field that has only been zero
+
+# (name, epsilon as a fraction of the field's scale). Integer fields use None (sent as-is).
+# Scalars that can differ by orders of magnitude (Stokes S0 vs S3) are separate fields.
+FIELDS: Tuple[Tuple[str, Optional[float]], ...] = (
+    ("c", 1e-4),
+    ("lambdas", 1e-5),
+    ("S.U", 1e-4),
+    ("S.F", 1e-4),
+    ("S.blend", 1e-4),
+    ("stokes.S0", 1e-4),
+    ("stokes.S1", 1e-4),
+    ("stokes.S2", 1e-4),
+    ("stokes.S3", 1e-4),
+    ("pair", None),
+    ("entropy", 1e-4),
+    ("R", 1e-4),
+    ("green_x0", None),   # x0 split into two 15-bit halves
+    ("green_t", 1e-5),
+    ("green_radius", 1e-4),
+    ("pmw", 1e-5),
+)
+FIELD_IDS = {name: i for i, (name, _) in enumerate(FIELDS)}
+FLOAT_FIELDS = [i for i, (_, eps) in enumerate(FIELDS) if eps is not None]
+SCALES = struct.Struct(f"<{len(FLOAT_FIELDS)}f")
+
+
+def _field_lengths(K: int, nl: int) -> List[int]:
+    return [K, nl, 1, 1, 1, 1, 1, 1, 1, 2, 1, 1, 2, 1, 1, 1]
+
+
+def _values(tel: Dict[str, Any]) -> List[Any]:
+    S = tel["S"]; st = tel["stokes"]; g = tel["green"]; x0 = int(g["x0"])
+    return [tel["c"], tel["lambdas"], (S["U"],), (S["F"],), (S["blend"],),
+            (st["S0"],), (st["S1"],), (st["S2"],), (st["S3"],), st["pair"],
+            (tel["entropy"],), (tel["R"],), (x0 >> 15, x0 & 0x7FFF),
+            (g["t"],), (g["summary"]["radius"],), (tel["pmw"],)]
+
+
+class DeltaEncoder:
+    """Stateful encoder shared by all delta viewers; call encode() once per tick, in order."""
+
+    def __init__(self, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self._layout: Optional[Tuple[int, int]] = None
+        self._ref: List[np.ndarray] = []
+        self._scales = np.zeros(len(FIELDS), dtype=np.float32)
+        self._peak = np.zeros(len(FIELDS))   # largest magnitude per field since the last keyframe
+        self._since_key = 0
+
+    def reset(self) -> None:
+        self._layout = None
+
+    def _quantize(self, values: List[np.ndarray]) -> List[np.ndarray]:
+        out = []
+        for (_, eps), a, scale in zip(FIELDS, values, self._scales):
+            if eps is not None:
+                a = np.rint(np.clip(a / float(scale), -1.0, 1.0) * Q)
+            out.append(a.astype(np.int16))
+        return out
+
+    def encode(self, tel: Dict[str, Any], seq: int) -> Tuple[bytes, Tuple[np.ndarray, List[np.ndarray]]]:
+        """Delta (or keyframe) payload plus a snapshot of the reference state and scales."""
+        values = [np.asarray(v, dtype=np.float64) for v in _values(tel)]
+        mag = np.array([float(np.abs(a).max()) if a.size else 0.0 for a in values])
+        np.maximum(self._peak, mag, out=self._peak)
+        layout = (len(values[0]), len(values[1]))
+        # a value past its field's full scale would clip: rescale with an early keyframe
+        key = (layout != self._layout or self._since_key >= self.keyframe_interval
+               or bool((mag[FLOAT_FIELDS] > self._scales[FLOAT_FIELDS]).any()))
+        if key:
+            self._scales[FLOAT_FIELDS] = np.maximum(HEADROOM * self._peak[FLOAT_FIELDS], MIN_SCALE)
+            self._peak[:] = mag
+        q = self._quantize(values)
+        if key:
+            self._layout = layout
+            self._ref = [a.copy() for a in q]
+            self._since_key = 0
+            changed = list(range(len(FIELDS)))
+        else:
+            changed = []
+            for i, ((_, eps), a) in enumerate(zip(FIELDS, q)):
+                tol = eps * Q if eps is not None else 0.0
+                if a.size and np.abs(a.astype(np.int32) - self._ref[i]).max() > tol:
+                    self._ref[i] = a.copy()
+                    changed.append(i)
+        self._since_key += 1
+        # field arrays are replaced, never mutated, and scales only change on a keyframe
+        snapshot = (self._scales.copy(), list(self._ref))
+        t = float(tel.get("time", 0.0))
+        return pack(snapshot, changed, layout, seq, t, key, int(tel.get("quality", 0))), snapshot
+
+
+def quality_flags(quality: int) -> int:
+    return (int(quality) << QUALITY_SHIFT) & QUALITY_MASK
+
+
+def pack(snapshot: Tuple[np.ndarray, List[np.ndarray]], fields: List[int], layout: Tuple[int, int],
+         seq: int, t: float, keyframe: bool, quality: int = 0) -> bytes:
+    scales, ref = snapshot
+    flags = (FLAG_KEYFRAME if keyframe else 0) | quality_flags(quality)
+    parts = [DELTA_HEADER.pack(DELTA_MAGIC, DELTA_VERSION, flags,
+                               layout[0], layout[1], len(fields), int(seq) & 0xFFFFFFFF, t)]
+    if keyframe:
+        parts.append(SCALES.pack(*scales[FLOAT_FIELDS]))
+    for i in fields:
+        parts.append(bytes((i,)))
+        parts.append(ref[i].astype("<i2").tobytes())
+    return b"".join(parts)
+
+
+def keyframe_from_snapshot(snapshot: Tuple[np.ndarray, List[np.ndarray]], seq: int, t: float,
+                           quality: int = 0) -> bytes:
+    ref = snapshot[1]
+    return pack(snapshot, list(range(len(FIELDS))), (len(ref[0]), len(ref[1])), seq, t, True, quality)
+
+
+class DeltaDecoder:
+    """Client-side state machine (Python reference, used by tests and recording tools)."""
+
+    def __init__(self):
+        self.seq: Optional[int] = None
+        self.needs_keyframe = True
+        self._q: List[Optional[np.ndarray]] = [None] * len(FIELDS)
+        self._scales = np.zeros(len(FIELDS), dtype=np.float32)
+        self.time = 0.0
+        self.quality = 0
+
+    def apply(self, data: bytes) -> Optional[Dict[str, Any]]:
+        """Apply one frame; returns the reconstructed telemetry, or None while waiting for a keyframe."""
+        magic, version, flags, K, nl, nfields, seq, t = DELTA_HEADER.unpack_from(data, 0)
+        if magic != DELTA_MAGIC or version != DELTA_VERSION:
+            raise ValueError(f"not a v{DELTA_VERSION} delta telemetry frame")
+        keyframe = bool(flags & FLAG_KEYFRAME)
+        if not keyframe and (self.needs_keyframe or self.seq is None or seq != (self.seq + 1) & 0xFFFFFFFF):
+            self.needs_keyframe = True
+            return None
+        lengths = _field_lengths(K, nl)
+        off = DELTA_HEADER.size
+        if keyframe:
+            self._scales[FLOAT_FIELDS] = SCALES.unpack_from(data, off)
+            off += SCALES.size
+        for _ in range(nfields):
+            fid = data[off]; off += 1
+            n = lengths[fid]
+            self._q[fid] = np.frombuffer(data, dtype="<i2", count=n, offset=off).copy()
+            off += 2 * n
+        self.seq = seq; self.time = t
+        self.quality = (flags & QUALITY_MASK) >> QUALITY_SHIFT
+        self.needs_keyframe = False
+        return self.state()
+
+    def _f(self, name: str) -> np.ndarray:
+        i = FIELD_IDS[name]
+        q = self._q[i]
+        return q.astype(np.float64) * (float(self._scales[i]) / Q) if FIELDS[i][1] is not None else q.astype(np.int64)
+
+    def _scalar(self, name: str) -> float:
+        return float(self._f(name)[0])
+
+    def state(self) -> Dict[str, Any]:
+        f = self._scalar
+        pair = self._f("pair"); x0 = self._f("green_x0")
+        return {
+            "seq": self.seq, "time": self.time, "quality": self.quality,
+            "c": self._f("c"), "lambdas": self._f("lambdas"),
+            "S": {k: f(f"S.{k}") for k in ("U", "F", "blend")},
+            "stokes": dict({k: f(f"stokes.{k}") for k in ("S0", "S1", "S2", "S3")},
+                           pair=[int(pair[0]), int(pair[1])]),
+            "entropy": f("entropy"), "R": f("R"),
+            "green": {"x0": int(x0[0]) << 15 | int(x0[1]), "t": f("green_t"),
+                      "summary": {"radius": f("green_radius")}},
+            "pmw": f("pmw"),
+        }
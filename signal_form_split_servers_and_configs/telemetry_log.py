@@ -0,0 +1,161 @@
+# telemetry_log.py
+# Append-only telemetry recording with a sparse record clock -> offset index
+#
+# <name>            header b"SFL1" u8 version + 3 reserved bytes, then records:
+#                   u32 payload length, u32 seq, f64 time, f64 clock, payload
+#                   (the frame's JSON text, exactly as sent to JSON viewers)
+# <name>.idx        (f64 clock, u64 offset) pairs, one every INDEX_EVERY records
+#
+# time is the engine time of the frame; clock is the record clock, which never
+# runs backwards: it follows engine time from the first frame on, but a seek
+# (engine time going backwards or jumping more than MAX_STEP) only advances it
+# by one frame. The index and replay pacing use the clock, so a show with
+# seeks in it is still one seekable timeline. A writer never appends to an old
+# recording: an existing non-empty <name> (a restarted server) is first rotated
+# to <stem>.1<ext>, <stem>.2<ext>, ... together with its index.
+#
+# Both files are only ever appended to, so a recording that is cut off (crash,
+# power loss) stays readable up to its last complete record; a missing or
+# short index is rebuilt by walking the record headers. Readers mmap the log
+# and seek with the index, so a multi-hour log is never loaded into memory.
+import bisect
+import mmap
+import os
+import struct
+from typing import Iterator, List, Optional, Tuple
+
+LOG_MAGIC = b"SFL1"
+LOG_VERSION = 2
+LOG_HEADER = struct.Struct("<4sB3x")
+RECORD = struct.Struct("<IIdd")
+INDEX_ENTRY = struct.Struct("<dQ")
+INDEX_EVERY = 60          # one index entry per second of frames at 60 FPS
+FLUSH_EVERY = 60
+MAX_STEP = 0.25           # s of engine time between frames beyond which a step counts as a seek
+FRAME_STEP = 1.0 / 60.0   # record clock advance across a seek until a normal step is seen
+
+
+def rotate(path: str) -> Optional[str]:
+    """Move a non-empty recording at path (and its index) to the first free <stem>.<n><ext>."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    stem, ext = os.path.splitext(path)
+    n = 1
+    while os.path.exists(f"{stem}.{n}{ext}"):
+        n += 1
+    moved = f"{stem}.{n}{ext}"
+    os.replace(path, moved)
+    if os.path.exists(path + ".idx"):
+        os.replace(path + ".idx", moved + ".idx")
+    return moved
+
+
+class LogWriter:
+    def __init__(self, path: str, index_every: int = INDEX_EVERY):
+        self.path = path
+        self.rotated = rotate(path)
+        self._fh = open(path, "wb")
+        self._fh.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION))
+        self._idx = open(path + ".idx", "wb")
+        self.index_every = max(1, int(index_every))
+        self.records = 0
+        self.clock = 0.0
+        self._last_t: Optional[float] = None
+        self._step = FRAME_STEP
+
+    def _advance(self, t: float) -> float:
+        if self._last_t is None:
+            self.clock = t
+        else:
+            step = t - self._last_t
+            if 0.0 < step <= MAX_STEP:
+                self._step = step
+            else:
+                step = self._step   # seek: keep the record clock moving at the frame rate
+            self.clock += step
+        self._last_t = t
+        return self.clock
+
+    def append(self, seq: int, t: float, payload: bytes) -> None:
+        offset = self._fh.tell()
+        clock = self._advance(float(t))
+        if self.records % self.index_every == 0:
+            self._idx.write(INDEX_ENTRY.pack(clock, offset))
+        self._fh.write(RECORD.pack(len(payload), int(seq) & 0xFFFFFFFF, float(t), clock))
+        self._fh.write(payload)
+        self.records += 1
+        if self.records % FLUSH_EVERY == 0:
+            self.flush()
+
+    def flush(self) -> None:
+        self._fh.flush(); self._idx.flush()
+
+    def close(self) -> None:
+        if not self._fh.closed:
+            self.flush()
+            self._fh.close(); self._idx.close()
+
+
+class LogReader:
+    """Memory-mapped reader; frames() yields (seq, clock, payload bytes) from any record clock on."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = open(path, "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = LOG_HEADER.unpack_from(self._mm, 0)
+        if magic != LOG_MAGIC or version != LOG_VERSION:
+            raise ValueError(f"{path}: not a v{LOG_VERSION} telemetry log")
+        self._times, self._offsets = self._load_index()
+
+    def _load_index(self) -> Tuple[List[float], List[int]]:
+        times, offsets = [], []
+        try:
+            with open(self.path + ".idx", "rb") as fh:
+                data = fh.read()
+            for t, off in INDEX_ENTRY.iter_unpack(data[:len(data) - len(data) % INDEX_ENTRY.size]):
+                if off >= len(self._mm):
+                    break
+                times.append(t); offsets.append(off)
+        except OSError:
+            pass
+        if not offsets:
+            times, offsets = self._scan_index()
+        return times, offsets
+
+    def _scan_index(self) -> Tuple[List[float], List[int]]:
+        times, offsets = [], []
+        for i, (off, _, clock, _) in enumerate(self._records(LOG_HEADER.size)):
+            if i % INDEX_EVERY == 0:
+                times.append(clock); offsets.append(off)
+        return times, offsets
+
+    def _records(self, off: int) -> Iterator[Tuple[int, int, float, int]]:
+        # (offset, seq, clock, payload length); stops at a truncated tail
+        mm, end = self._mm, len(self._mm)
+        while off + RECORD.size <= end:
+            n, seq, _, clock = RECORD.unpack_from(mm, off)
+            if off + RECORD.size + n > end:
+                return
+            yield off, seq, clock, n
+            off += RECORD.size + n
+
+    @property
+    def start(self) -> float:
+        return self._times[0] if self._times else 0.0
+
+    def offset_for(self, t: float) -> int:
+        """Offset of the last indexed record at or before record clock t (the log start if t is earlier)."""
+        i = bisect.bisect_right(self._times, t) - 1
+        return self._offsets[i] if i >= 0 else LOG_HEADER.size
+
+    def frames(self, t0: Optional[float] = None) -> Iterator[Tuple[int, float, bytes]]:
+        off = LOG_HEADER.size if t0 is None else self.offset_for(t0)
+        for off, seq, clock, n in self._records(off):
+            if t0 is not None and clock < t0:
+                continue
+            start = off + RECORD.size
+            yield seq, clock, self._mm[start:start + n]
+
+    def close(self) -> None:
+        self._mm.close(); self._fh.close()
@@ -0,0 +1,130 @@
+# topology.py
+# Graph topologies for EngineRunner, switchable at runtime through /control
+# Requires: numpy, scipy
+#
+# A topology is a small JSON spec, e.g. {"topology": {...}} in a /control body:
+#   {"kind": "ring", "n": 256, "k": 2}                   ring lattice, k neighbours per side
+#   {"kind": "grid", "rows": 16, "cols": 16}            open 2D lattice
+#   {"kind": "torus", "rows": 16, "cols": 16}           periodic 2D lattice
+#   {"kind": "sphere", "subdivisions": 3}               geodesic icosphere, 10*4**s + 2 nodes
+#   {"kind": "small_world", "n": 256, "k": 2, "p": 0.1, "seed": 0}
+#                                                       Watts–Strogatz: ring edges rewired with prob. p
+#   {"kind": "knn", "points": [[x, y, z], ...], "k": 6, "weighted": false}
+#                                                       k nearest neighbours of a point cloud
+#   {"kind": "edges", "n": 100, "edges": [[i, j], [i, j, w], ...]}
+# parse_topology() validates a spec and fills its defaults, so a bad command is
+# rejected when /control receives it; build_graph() turns a spec into a
+# GraphConfig holding a graph_builder sparse adjacency; coarse_topology() is
+# the roughly half-size spec behind quality level 3.
+#
+# Engines for a new topology are built on BUILDER, a single background thread,
+# while the current engine keeps ticking; EngineRunner switches on a tick
+# boundary once the build is done.
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+try:
+    import graph_builder as gb
+    from engine import GraphConfig
+except ImportError:
+    from . import graph_builder as gb
+    from .engine import GraphConfig
+
+KINDS = ("ring", "grid", "torus", "sphere", "small_world", "knn", "edges")
+MAX_NODES = 200_000     # largest graph /control may ask for
+MAX_SUBDIVISIONS = 7    # 163842-node sphere
+BUILDER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="topology")
+
+
+def _int(spec: Dict[str, Any], key: str, default: int, lo: int, hi: int = MAX_NODES) -> int:
+    v = int(spec.get(key, default))
+    if not lo <= v <= hi:
+        raise ValueError(f"topology {key}={v} out of range [{lo}, {hi}]")
+    return v
+
+
+def parse_topology(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Validated copy of a topology spec with defaults filled in; ValueError if it is unusable."""
+    kind = spec.get("kind")
+    if kind not in KINDS:
+        raise ValueError(f"unknown topology kind {kind!r}; expected one of {', '.join(KINDS)}")
+    if kind == "ring":
+        n = _int(spec, "n", 256, 3)
+        return {"kind": kind, "n": n, "k": _int(spec, "k", 2, 1, (n - 1) // 2)}
+    if kind in ("grid", "torus"):
+        lo = 3 if kind == "torus" else 1   # smaller periodic sides would double edges
+        rows = _int(spec, "rows", 16, lo); cols = _int(spec, "cols", 16, lo)
+        if rows * cols > MAX_NODES or rows * cols < 2:
+            raise ValueError(f"{rows}x{cols} {kind} has an unusable node count")
+        return {"kind": kind, "rows": rows, "cols": cols}
+    if kind == "sphere":
+        return {"kind": kind, "subdivisions": _int(spec, "subdivisions", 3, 0, MAX_SUBDIVISIONS)}
+    if kind == "small_world":
+        n = _int(spec, "n", 256, 3)
+        p = float(spec.get("p", 0.1))
+        if not 0.0 <= p <= 1.0:
+            raise ValueError(f"rewiring probability p={p} out of range [0, 1]")
+        return {"kind": kind, "n": n, "k": _int(spec, "k", 2, 1, (n - 1) // 2), "p": p,
+                "seed": int(spec.get("seed", 0))}
+    if kind == "knn":
+        X = np.asarray(spec.get("points", ()), dtype=np.float64)
+        if X.ndim != 2 or not 3 <= len(X) <= MAX_NODES or not np.isfinite(X).all():
+            raise ValueError(f"points must be a list of 3 to {MAX_NODES} finite coordinate rows")
+        return {"kind": kind, "points": X.tolist(), "k": _int(spec, "k", 6, 1, len(X) - 1),
+                "weighted": bool(spec.get("weighted", False))}
+    n = _int(spec, "n", 0, 2)
+    e = np.asarray([list(r) + [1.0] if len(r) == 2 else r for r in spec.get("edges", ())], dtype=np.float64)
+    if e.ndim != 2 or e.shape[1] != 3:
+        raise ValueError("edges must be a non-empty list of [i, j] or [i, j, w]")
+    if (e[:, :2] < 0).any() or (e[:, :2] >= n).any() or (e[:, :2] % 1).any():
+        raise ValueError(f"edge endpoints must be node indices in [0, {n})")
+    if not (np.isfinite(e[:, 2]).all() and (e[:, 2] > 0).all()):
+        raise ValueError("edge weights must be positive")
+    return {"kind": kind, "n": n, "edges": e.tolist()}
+
+
+def node_count(spec: Dict[str, Any]) -> int:
+    kind = spec["kind"]
+    if kind in ("grid", "torus"):
+        return spec["rows"] * spec["cols"]
+    if kind == "sphere":
+        return 10 * 4 ** spec["subdivisions"] + 2
+    if kind == "knn":
+        return len(spec["points"])
+    return spec["n"]
+
+
+def build_graph(spec: Dict[str, Any]) -> GraphConfig:
+    """GraphConfig for a parse_topology() spec."""
+    kind = spec["kind"]
+    if kind == "ring":
+        A = gb.ring_lattice(spec["n"], spec["k"])
+    elif kind in ("grid", "torus"):
+        A = (gb.torus if kind == "torus" else gb.grid)(spec["rows"], spec["cols"])
+    elif kind == "sphere":
+        A = gb.geodesic_sphere(spec["subdivisions"])
+    elif kind == "small_world":
+        A = gb.watts_strogatz(spec["n"], spec["k"], spec["p"], spec["seed"])
+    elif kind == "knn":
+        A = gb.knn_graph(spec["points"], spec["k"], spec["weighted"])
+    else:
+        A = gb.from_edges(spec["n"], spec["edges"])
+    return GraphConfig(nodes=node_count(spec), edges=A, normalized=True)
+
+
+def coarse_topology(spec: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The same kind of graph with about half the nodes (a quarter for spheres), or None."""
+    kind = spec["kind"]
+    if kind in ("ring", "small_world"):
+        n = spec["n"] // 2
+        return dict(spec, n=n, k=min(spec["k"], (n - 1) // 2)) if n >= 3 else None
+    if kind in ("grid", "torus"):
+        cols = spec["cols"] // 2
+        return dict(spec, cols=cols) if cols >= (3 if kind == "torus" else 1) else None
+    if kind == "knn" and len(spec["points"]) // 2 > spec["k"]:
+        return dict(spec, points=spec["points"][::2])
+    if kind == "sphere" and spec["subdivisions"] > 0:
+        return dict(spec, subdivisions=spec["subdivisions"] - 1)
+    return None
@@ -0,0 +1,13 @@
+import pytest
+
+from signal_form_split_servers_and_configs import engine_runner as er
+
+
+@pytest.fixture(autouse=True)
+def basis_cache(tmp_path, monkeypatch):
+    """Keep the disk basis cache out of the real home directory, for this process
+    (BASIS_CACHE_DIR is read at import) and for any server it starts."""
+    path = str(tmp_path / "basis")
+    monkeypatch.setenv("SIGNAL_FORM_BASIS_CACHE", path)
+    monkeypatch.setattr(er, "BASIS_CACHE_DIR", path)
+    return path
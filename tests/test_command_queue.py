@@ -0,0 +1,73 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from signal_form_split_servers_and_configs import collaborative_engine_server as ces
+from signal_form_split_servers_and_configs import engine_runner as er
+from signal_form_split_servers_and_configs import engine_server as es
+from signal_form_split_servers_and_configs.command_queue import CommandQueue
+
+
+def test_drain_orders_scheduled_then_immediate():
+    q = CommandQueue()
+    q.push("late", at=0.5)
+    q.push("now-1")
+    q.push("early", at=0.2)
+    q.push("now-2")
+    assert [c for c, _ in q.drain(0.0)] == ["now-1", "now-2"]
+    assert len(q) == 2
+    q.push("now-3")
+    assert [c for c, _ in q.drain(1.0)] == ["early", "late", "now-3"]
+    assert len(q) == 0
+
+
+def test_batch_lands_whole_at_next_step():
+    runner = er.EngineRunner(n=128, K=16)
+    cmds, at = er.parse_control([{"set": {"pmw": 0.1}},
+                                 {"pulse": [{"k": 2, "amp": 1.0}, {"k": 4, "amp": 0.5}]}])
+    runner.commands.push(cmds, at, lambda tick, t: None)
+    assert runner.pmw == 0.5 and len(runner.pulses) == 0
+    tel = runner.step()
+    assert tel["pmw"] == 0.1 and len(runner.pulses) == 2 and len(runner.applied) == 1
+    runner.step()
+    assert runner.applied == []
+
+
+def test_scheduled_batch_waits_for_engine_time():
+    runner = er.EngineRunner(n=128, K=16)
+    cmds, at = er.parse_control({"batch": [{"set": {"pmw": 0.9}}], "at": 5 * runner.dt})
+    runner.commands.push(cmds, at)
+    pmws = [runner.step()["pmw"] for _ in range(8)]
+    assert pmws == [0.5] * 5 + [0.9] * 3
+
+
+def test_malformed_batch_is_rejected_whole():
+    with pytest.raises(ValueError):
+        er.parse_control([{"set": {"pmw": 0.2}}, {"pulse": {"k": "x"}}])
+
+
+@pytest.mark.parametrize("server", [es, ces])
+@pytest.mark.parametrize("body", [{"set": {"pmw": "abc"}}, {"pulse": [1, 2]}, {"at": "soon"}, {"set": 5},
+                                  {"topology": {"kind": "ring", "n": 10**9}}, {"topology": "ring"}])
+def test_control_rejects_malformed_bodies_with_400(server, body, monkeypatch):
+    runner = er.EngineRunner(n=128, K=16)
+    monkeypatch.setattr(server, "runner", runner)
+    response = TestClient(server.app).post("/control", json=body)
+    assert response.status_code == 400 and response.json()["detail"]
+    assert len(runner.commands) == 0
+
+
+def test_ten_thousand_commands_per_second():
+    # one second of traffic at 10k commands/s, arriving between 60 ticks; throughput itself
+    # is measured by bench_control_queue.py, not asserted here
+    runner = er.EngineRunner(n=128, K=16)
+    per_tick = 10_000 // 60 + 1
+    applied = []
+    for _ in range(60):
+        for i in range(per_tick):
+            cmds, at = er.parse_control({"pulse": {"k": i % 16, "amp": 0.01, "decay": 0.5}})
+            runner.commands.push(cmds, at, applied.append)
+        runner.step()
+        assert len(runner.commands) == 0 and len(runner.applied) == per_tick   # all of them, on this tick
+        for on_applied in runner.applied:
+            on_applied(runner.frame)
+    assert len(applied) == 60 * per_tick
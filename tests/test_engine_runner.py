@@ -0,0 +1,151 @@
+import math
+import os
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from signal_form_split_servers_and_configs import engine_runner as er
+from signal_form_split_servers_and_configs.telemetry_codec import EncodedFrame
+
+
+def reference_field(runner: er.EngineRunner, phi: float) -> np.ndarray:
+    # the original per-mode Python loop
+    c = np.zeros(runner.K, dtype=np.complex128)
+    for a_idx, k_idx in enumerate(runner.active_modes):
+        mag = runner.amps[a_idx] * (0.75 + 0.25 * math.sin(phi + a_idx))
+        phase = phi * (1 + a_idx * 0.1)
+        c[k_idx] = mag * complex(math.cos(phase), math.sin(phase))
+    c[0] += 0.3 * runner.pmw
+    return np.fft.irfft(c, n=runner.n)
+
+
+def test_vectorized_synthesis_matches_reference(monkeypatch):
+    runner = er.EngineRunner(n=128, K=16)
+    seen = []
+    monkeypatch.setattr(runner.eng, "step", lambda s, kx=1, ky=2: seen.append(s.copy()) or {})
+    for _ in range(5):
+        runner.step()
+        assert seen[-1] == pytest.approx(reference_field(runner, runner.phi), abs=1e-12)
+
+
+def test_tick_reuses_node_buffers():
+    runner = er.EngineRunner(n=16384, K=16)
+    runner.add_pulse(3, 0.5, 0.999)
+    runner.step()
+    tracemalloc.start()
+    try:
+        runner.step()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < runner.n * 8 // 2       # no n-sized array was allocated
+
+
+def test_memory_does_not_grow_over_ten_thousand_ticks():
+    runner = er.EngineRunner(n=256, K=32)
+    runner.add_pulse(2, 0.5, 0.9999)
+    for _ in range(200):
+        runner.step()
+    tracemalloc.start()
+    try:
+        for _ in range(200):
+            runner.step()
+        baseline, _ = tracemalloc.get_traced_memory()
+        for _ in range(10_000):
+            runner.step()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert current - baseline < 16 * 1024
+
+
+def capture_fields(runner, monkeypatch):
+    seen = []
+    monkeypatch.setattr(runner.eng, "step", lambda s, kx=1, ky=2: seen.append(s.copy()) or {})
+    return seen
+
+
+def test_render_matches_stepping(monkeypatch):
+    runner = er.EngineRunner(n=128, K=16)
+    seen = capture_fields(runner, monkeypatch)
+    for i in range(60):
+        if i in (3, 40, 41):
+            runner.add_pulse(i % 7, 0.6, 0.999)
+        runner.step()
+    runner.add_pulse(1, 0.6, 0.93)   # expires about 95 frames from now
+    # past frames (pulses still live), and future frames predicted before stepping
+    times = np.arange(200) * runner.dt
+    frames = runner.render(times[::-1])
+    for _ in range(140):
+        runner.step()
+    assert frames["s"].shape == (200, 128)
+    assert frames["s"][::-1] == pytest.approx(np.array(seen), abs=1e-9)
+    assert frames["time"][0] == pytest.approx(199 * runner.dt)
+    assert runner.state_at(times[50])["s"] == pytest.approx(seen[50], abs=1e-9)
+
+
+def test_seek_jumps_without_iterating(monkeypatch):
+    runner = er.EngineRunner(n=128, K=16)
+    seen = capture_fields(runner, monkeypatch)
+    runner.add_pulse(5, 1.0, 0.999)
+    runner.step()
+    target = 3600.0   # an hour ahead
+    expected = runner.state_at(target)
+    runner.apply(er.parse_control({"seek": target})[0])
+    assert runner.frame == round(target / runner.dt) and len(runner.pulses) == 0
+    runner.step()
+    assert seen[-1] == pytest.approx(expected["s"], abs=1e-9)
+
+    runner.add_pulse(2, 1.0, 0.99)
+    born = runner.frame
+    runner.seek((born + 10) * runner.dt)
+    assert runner.pulses.ttl[0] == pytest.approx(0.99 ** 10)
+    runner.seek((born - 1) * runner.dt)   # rewinding past its birth removes it
+    assert len(runner.pulses) == 0
+
+
+def test_slow_fields_are_held_between_recomputes(monkeypatch):
+    runner = er.EngineRunner(n=128, K=16, rates={"entropy": 10, "lambdas": 2})   # every 6 and 30 frames
+    computed = []
+    step = runner.eng.step
+    monkeypatch.setattr(runner.eng, "step", lambda s, kx=1, ky=2, fields=None: computed.append(fields) or step(s, kx, ky, fields))
+    frames = [EncodedFrame(runner.step(), i, runner.held) for i in range(31)]
+    assert computed[0] is None and computed[30] is None
+    assert "entropy" not in computed[1] and "lambdas" not in computed[1] and "green" in computed[1]
+    assert "entropy" in computed[6] and "lambdas" not in computed[6]
+    # the dict stays complete; the JSON text carries a slow field only when it was recomputed
+    assert all("entropy" in f.tel for f in frames)
+    assert frames[1].tel["entropy"] == frames[0].tel["entropy"]
+    assert '"entropy"' not in frames[1].text and '"lambdas"' not in frames[1].text
+    assert '"entropy"' in frames[6].text and '"c"' in frames[1].text and '"green"' in frames[1].text
+
+    runner.seek(runner.t + 0.5 * runner.dt)   # a seek recomputes everything on the next frame
+    runner.step()
+    assert computed[-1] is None and runner.held == ()
+
+
+def test_slow_fields_keep_their_rate_when_stepping_two_frames(monkeypatch):
+    runner = er.EngineRunner(n=128, K=16, rates={"entropy": 10})   # every 6 frames, i.e. every 3 steps
+    runner.stride = 2   # quality level 4: only odd frames are rendered, never a multiple of 6
+    computed = []
+    step = runner.eng.step
+    monkeypatch.setattr(runner.eng, "step", lambda s, kx=1, ky=2, fields=None: computed.append(fields) or step(s, kx, ky, fields))
+    for _ in range(30):
+        runner.step()
+    recomputed = [i for i, fields in enumerate(computed) if fields is None or "entropy" in fields]
+    assert len(recomputed) == 10 and all(b - a == 3 for a, b in zip(recomputed, recomputed[1:]))
+
+
+def test_field_rates_come_from_microfiche_config(tmp_path):
+    from signal_form_split_servers_and_configs.field_schedule import load_rates
+    cfg = tmp_path / "microfiche_config.json"
+    cfg.write_text('{"framerate_target": 60, "telemetry_rates": {"green": 5}}')
+    assert load_rates(str(cfg)) == {"green": 5.0}
+    assert load_rates(str(tmp_path / "missing.json")) == {}
+    assert set(load_rates()) <= set(er.OUTPUT_FIELDS)
+
+
+def test_runner_caches_its_basis_outside_the_home_directory(basis_cache):
+    er.EngineRunner(n=96, K=8)
+    assert os.listdir(basis_cache)   # the conftest fixture redirected the cache here
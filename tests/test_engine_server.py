@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from signal_form_split_servers_and_configs import engine_server as es
+from signal_form_split_servers_and_configs import telemetry_codec as codec
+from signal_form_split_servers_and_configs.frame_ring import FrameRing
+
+
+@pytest.fixture
+def fresh_server(monkeypatch):
+    runner = es.EngineRunner(n=128, K=16)
+    monkeypatch.setattr(es, "runner", runner)
+    monkeypatch.setattr(es, "ring", FrameRing(es.RING_CAPACITY))
+    return runner
+
+
+def test_frame_ring_is_bounded_and_wakes_waiters():
+    async def scenario():
+        ring = FrameRing(capacity=3)
+        waiter = asyncio.create_task(ring.next_after(0))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        ring.publish("a")
+        assert await waiter == (1, "a")
+        for frame in "bcde":
+            ring.publish(frame)
+        assert len(ring) == 3
+        assert ring.since(2) == [(3, "c"), (4, "d"), (5, "e")]
+        assert await ring.next_after(1) == (5, "e")
+
+    asyncio.run(scenario())
+
+
+def test_viewers_share_one_simulation_clock(fresh_server):
+    with TestClient(es.app) as client:
+        with client.websocket_connect("/telemetry") as a, client.websocket_connect("/telemetry") as b:
+            frames_a = [a.receive_json() for _ in range(5)]
+            frames_b = [b.receive_json() for _ in range(5)]
+
+    times_a = [f["time"] for f in frames_a]
+    assert times_a == sorted(times_a)
+    # each published frame advances time by exactly one tick, regardless of viewer count
+    steps = {round((t1 - t0) / fresh_server.dt, 6) for t0, t1 in zip(times_a, times_a[1:])}
+    assert all(s >= 1.0 and s.is_integer() for s in steps)
+    # two viewers, yet runner.step() ran exactly once per published frame
+    assert fresh_server.t == pytest.approx(es.ring.seq * fresh_server.dt)
+    # viewers receiving the same tick receive the same frame
+    by_time = {f["time"]: f for f in frames_a}
+    assert all(by_time[f["time"]] == f for f in frames_b if f["time"] in by_time)
+
+
+def test_binary_telemetry_is_opt_in(fresh_server):
+    with TestClient(es.app) as client:
+        with client.websocket_connect("/telemetry", subprotocols=[codec.BINARY_SUBPROTOCOL]) as ws:
+            assert ws.accepted_subprotocol == codec.BINARY_SUBPROTOCOL
+            frame = codec.decode_binary(ws.receive_bytes())
+        with client.websocket_connect("/telemetry?format=f32") as ws:
+            by_query = codec.decode_binary(ws.receive_bytes())
+        with client.websocket_connect("/telemetry") as ws:
+            default = ws.receive_json()
+
+    assert len(frame["c"]) == fresh_server.K
+    assert by_query["seq"] >= frame["seq"] >= 1
+    assert "stokes" in default and len(default["c"]) == fresh_server.K
+
+
+def test_websocket_control_is_acked_with_its_tick(fresh_server):
+    with TestClient(es.app) as client:
+        with client.websocket_connect("/telemetry") as ws:
+            ws.send_json({"type": "control", "id": 7, "batch": [
+                {"set": {"pmw": 0.9}}, {"pulse": {"k": 3, "amp": 0.4, "decay": 0.99}}]})
+            ws.send_json({"type": "control", "id": 8, "set": {"pmw": "loud"}})
+            msgs = []
+            while sum(m.get("type") == "ack" for m in msgs) < 2:
+                msgs.append(ws.receive_json())
+            ack = next(m for m in msgs if m.get("id") == 7)
+            same_tick = lambda m: "c" in m and m["time"] == pytest.approx(ack["time"])
+            frame = next((m for m in msgs if same_tick(m)), None)
+            while frame is None:
+                m = ws.receive_json()
+                frame = m if same_tick(m) else None
+
+    assert "could not convert" in next(m for m in msgs if m.get("id") == 8)["error"]
+    assert ack["tick"] >= 1
+    # the acked tick is the first frame computed with the whole batch applied
+    assert frame["pmw"] == pytest.approx(0.9)
+    earlier = [m for m in msgs if "c" in m and m["time"] < ack["time"] - 1e-9]
+    assert all(m["pmw"] == pytest.approx(0.5) for m in earlier)
+
+
+def test_field_subscriptions_limit_what_is_computed_and_sent(fresh_server, monkeypatch):
+    computed = []
+    step = fresh_server.eng.step
+    monkeypatch.setattr(fresh_server.eng, "step",
+                        lambda s, kx=1, ky=2, fields=None: computed.append(fields) or step(s, kx, ky, fields))
+    with TestClient(es.app) as client:
+        with client.websocket_connect("/telemetry?fields=c,pmw") as cube, \
+                client.websocket_connect("/telemetry") as hud:
+            hud.send_json({"type": "subscribe", "fields": ["stokes", "entropy"]})
+            while set(hud.receive_json()) != {"stokes", "entropy", "time", "quality"}:
+                pass
+            frame = cube.receive_json()
+            while computed[-1] is None:
+                hud.receive_json()
+            assert set(computed[-1]) == {"stokes", "entropy"}
+        assert es.runner.subscriptions.union() is None   # nobody left: back to everything
+
+    assert set(frame) == {"c", "pmw", "time", "quality"}
@@ -0,0 +1,215 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from signal_form_split_servers_and_configs import engine_server as es
+from signal_form_split_servers_and_configs import frame_bus as fb
+from signal_form_split_servers_and_configs import telemetry_codec as codec
+from signal_form_split_servers_and_configs.frame_ring import FrameRing
+from signal_form_split_servers_and_configs.telemetry_delta import DeltaEncoder
+
+
+KEY = b"k" * 32
+
+
+@pytest.fixture
+def bus():
+    name = f"sfbus_test_{os.getpid()}"
+    writer = fb.FrameBusWriter(name, slots=4, slot_size=8192)
+    yield writer
+    writer.close()
+
+
+def publish(writer, runner, seq, delta=None):
+    frame = codec.EncodedFrame(runner.step(), seq)
+    if delta is not None:
+        frame.encode_delta(delta)
+    writer.write(frame, len(runner.pulses))
+    return frame
+
+
+def read_head(name, out):
+    reader = fb.FrameBusReader(name)
+    frame = reader.read(reader.head)
+    out.put((frame.seq, frame.text, frame.binary))
+    reader.close()
+
+
+def test_reader_gets_the_writers_encodings_and_detects_overwrites(bus):
+    runner = es.EngineRunner(n=128, K=16)
+    enc = DeltaEncoder()
+    sent = [publish(bus, runner, seq, enc) for seq in range(1, 7)]
+    reader = fb.FrameBusReader(bus.name)
+    assert reader.head == 6
+    frame = reader.read(6)
+    assert frame.text == sent[-1].text and frame.binary == sent[-1].binary
+    assert frame.delta == sent[-1].delta and frame.delta_keyframe == sent[-1].delta_keyframe
+    assert frame._tel is None                # forwarded as-is: no JSON parse per frame
+    assert reader.pmw == pytest.approx(sent[-1].tel["pmw"]) and reader.pulses == len(runner.pulses)
+    assert frame.text_for(frozenset({"c"}))  # a field subset parses on demand
+    assert frame._tel is not None and frame._tel["time"] == pytest.approx(sent[-1].tel["time"])
+    assert reader.read(2) is None            # lapped by frame 6 in a 4-slot ring
+    off = fb.BUS_HEADER.size + 5 % bus.slots * bus.slot_size
+    gen = fb.GEN.unpack_from(bus.buf, off)[0]
+    fb.GEN.pack_into(bus.buf, off, gen + 1)  # writer stuck mid-write
+    assert reader.read(5) is None
+    reader.close()
+
+
+def test_other_processes_read_the_same_frame(bus):
+    runner = es.EngineRunner(n=128, K=16)
+    last = [publish(bus, runner, seq) for seq in range(1, 4)][-1]
+    ctx = multiprocessing.get_context("spawn")   # like uvicorn's workers
+    out = ctx.Queue()
+    procs = [ctx.Process(target=read_head, args=(bus.name, out)) for _ in range(3)]
+    for p in procs:
+        p.start()
+    got = [out.get(timeout=10) for _ in procs]
+    for p in procs:
+        p.join(10)
+    assert got == [(3, last.text, last.binary)] * 3
+
+
+def test_control_socket_lives_in_a_private_directory(bus):
+    path = os.path.dirname(fb.control_address(bus.name))
+    assert os.stat(path).st_uid == os.getuid() and os.stat(path).st_mode & 0o077 == 0
+    reader = fb.FrameBusReader(bus.name)
+    assert reader.authkey == bus.authkey and len(bus.authkey) == 32
+    reader.close()
+
+
+def test_control_link_applies_acks_and_subscribes(tmp_path):
+    runner = es.EngineRunner(n=128, K=16)
+    address = str(tmp_path / "bus.ctl")
+    server = fb.ControlServer(address, runner, KEY)
+    remote = fb.RemoteRunner("unused")
+    remote.address = address
+
+    async def scenario():
+        with pytest.raises(multiprocessing.AuthenticationError):
+            remote.connect(asyncio.get_running_loop(), b"not the key")
+        remote.connect(asyncio.get_running_loop(), KEY)
+        acked = asyncio.get_running_loop().create_future()
+        remote.commands.push([("pmw", 0.9)], None, lambda tick, t: acked.set_result((tick, t)))
+        remote.subscriptions.set(1, frozenset({"c", "stokes"}))
+        while len(runner.commands) == 0 or runner.subscriptions.union() is None:
+            await asyncio.sleep(0.001)
+        tel = runner.step()
+        for on_applied in runner.applied:
+            on_applied(41, tel["time"])
+        return await asyncio.wait_for(acked, 5), tel
+
+    (tick, t), tel = asyncio.run(scenario())
+    assert tick == 41 and t == tel["time"] and tel["pmw"] == 0.9
+    assert runner.subscriptions.union() == {"c", "stokes"} and "green" not in tel
+    remote.close()   # a worker going away drops its subscriptions
+    deadline = time.monotonic() + 5
+    while runner.subscriptions.union() is not None and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert runner.subscriptions.union() is None
+    server.close()
+
+
+def test_worker_serves_engine_frames(bus, monkeypatch):
+    engine = es.EngineRunner(n=128, K=16)
+    server = fb.ControlServer(fb.control_address(bus.name), engine, bus.authkey)
+    monkeypatch.setattr(es, "BUS_NAME", bus.name)
+    monkeypatch.setattr(es, "runner", fb.RemoteRunner(bus.name))
+    monkeypatch.setattr(es, "ring", FrameRing(es.RING_CAPACITY))
+    stop = threading.Event()
+    times = {}
+
+    def tick():
+        seq = 0
+        while not stop.is_set():
+            seq += 1
+            times[seq] = publish(bus, engine, seq).tel["time"]
+            time.sleep(0.005)
+
+    thread = threading.Thread(target=tick)
+    thread.start()
+    try:
+        with TestClient(es.app) as client:
+            with client.websocket_connect("/telemetry") as ws:
+                frames = [ws.receive_json() for _ in range(3)]
+                client.post("/control", json={"set": {"pmw": 0.2}})
+                while ws.receive_json()["pmw"] != pytest.approx(0.2):
+                    pass
+    finally:
+        stop.set()
+        thread.join()
+        server.close()
+    assert all(min(abs(f["time"] - t) for t in times.values()) < 1e-9 for f in frames)
+    assert engine.pmw == 0.2
+
+
+def test_ring_reset_releases_waiters_from_the_old_numbering():
+    async def scenario():
+        ring = FrameRing(8)
+        for seq in range(1, 51):
+            ring.publish(f"old-{seq}", seq)
+        waiter = asyncio.create_task(ring.next_after(50))
+        await asyncio.sleep(0)
+        ring.reset()
+        ring.publish("new-1", 1)
+        late = await ring.next_after(50)   # a handler that had not reached next_after yet
+        return await asyncio.wait_for(waiter, 1), late
+
+    assert asyncio.run(scenario()) == ((1, "new-1"), (1, "new-1"))
+
+
+def test_worker_follows_a_restarted_engine_and_forwards_its_stats(monkeypatch):
+    name = f"sfbus_restart_{os.getpid()}"
+    monkeypatch.setattr(es, "BUS_NAME", name)
+    monkeypatch.setattr(es, "BUS_STALE", 0.05)
+    monkeypatch.setattr(es, "runner", fb.RemoteRunner(name))
+    monkeypatch.setattr(es, "ring", FrameRing(es.RING_CAPACITY))
+
+    def engine(generation, ready, stop):
+        runner = es.EngineRunner(n=128, K=16)
+        writer = fb.FrameBusWriter(name, slots=4, slot_size=8192)
+        server = fb.ControlServer(fb.control_address(name), runner, writer.authkey,
+                                  stats=lambda: {"clock": {"generation": generation}, "quality": {"level": 0}})
+        ready.set()
+        seq = 0
+        try:
+            while not stop.is_set():
+                seq += 1
+                publish(writer, runner, seq)
+                time.sleep(0.005)
+        finally:
+            server.close()
+            writer.close()
+
+    def start(generation):
+        ready, stop = threading.Event(), threading.Event()
+        thread = threading.Thread(target=engine, args=(generation, ready, stop))
+        thread.start()
+        assert ready.wait(5)
+        return thread, stop
+
+    thread, stop = start(1)
+    try:
+        with TestClient(es.app) as client:
+            with client.websocket_connect("/telemetry") as ws:
+                before = [ws.receive_json() for _ in range(20)]
+                assert client.get("/clock").json() == {"generation": 1}
+                stop.set(); thread.join()   # the engine exits and unlinks its block
+                thread, stop = start(2)     # a new one counts seq and time from the start
+                after = ws.receive_json()
+                while after["time"] >= before[-1]["time"]:   # the old engine's last frames
+                    after = ws.receive_json()
+                deadline = time.monotonic() + 5
+                while client.get("/clock").json() != {"generation": 2} and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                assert client.get("/clock").json() == {"generation": 2}
+                assert client.get("/quality").json() == {"level": 0}
+    finally:
+        stop.set()
+        thread.join()
+    assert after["time"] < before[-1]["time"] and es.ring.seq < 1000
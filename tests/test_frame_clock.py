@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from signal_form_split_servers_and_configs.frame_clock import FrameClock
+
+
+class FakeTime:
+    def __init__(self, oversleep=0.0):
+        self.now = 100.0
+        self.oversleep = oversleep
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, dt):
+        self.now += dt + self.oversleep
+
+
+def run_frames(clock, fake, work):
+    async def scenario():
+        out = []
+        for w in work:
+            fake.now += w
+            out.append((await clock.wait(), fake.now))
+        return out
+    return asyncio.run(scenario())
+
+
+def test_deadlines_do_not_drift_with_work_time():
+    fake = FakeTime()
+    clock = FrameClock(60, clock=fake, sleep=fake.sleep)
+    wakes = run_frames(clock, fake, [0.004] * 601)
+    start = wakes[0][1]
+    # 600 frames later we are exactly 10 s on, although every tick spent 4 ms working
+    assert wakes[-1][1] - start == pytest.approx(10.0)
+    assert clock.skipped == 0 and clock.frame == 600
+
+
+def test_overrun_skips_frames_and_keeps_phase():
+    fake = FakeTime()
+    clock = FrameClock(100, clock=fake, sleep=fake.sleep)
+    wakes = run_frames(clock, fake, [0.0, 0.001, 0.035, 0.001])
+    start = wakes[0][1]
+    # the 35 ms tick overran frames 2..4; the loop resumes on frame 5, on the grid
+    assert [m for m, _ in wakes] == [0, 0, 3, 0]
+    assert clock.skipped == 3
+    assert wakes[2][1] - start == pytest.approx(0.05)
+    assert wakes[3][1] - start == pytest.approx(0.06)
+
+
+def test_jitter_stats_report_lateness():
+    fake = FakeTime(oversleep=0.002)
+    clock = FrameClock(120, clock=fake, sleep=fake.sleep)
+    run_frames(clock, fake, [0.0] * 50)
+    stats = clock.stats()
+    assert stats["jitter_mean_ms"] == pytest.approx(2.0)
+    assert stats["jitter_max_ms"] == pytest.approx(2.0)
+    assert stats["fps"] == 120 and stats["skipped"] == 0
+    clock.reset()
+    assert clock.stats()["frame"] == 0 and clock.stats()["jitter_p99_ms"] == 0.0
+
+
+def test_set_fps_keeps_the_current_deadline():
+    fake = FakeTime()
+    clock = FrameClock(60, clock=fake, sleep=fake.sleep)
+    wakes = run_frames(clock, fake, [0.0] * 11)
+    clock.set_fps(30)
+    wakes += run_frames(clock, fake, [0.0] * 3)
+    assert wakes[10][1] - wakes[0][1] == pytest.approx(10 / 60)
+    assert [b[1] - a[1] for a, b in zip(wakes[10:], wakes[11:])] == pytest.approx([1 / 30] * 3)
+    assert clock.skipped == 0
@@ -0,0 +1,49 @@
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from signal_form_split_servers_and_configs import basis_cache
+from signal_form_split_servers_and_configs import engine as eng
+from signal_form_split_servers_and_configs import graph_builder as gb
+
+
+def test_adjacency_is_symmetric_and_merges_repeats():
+    A = gb.adjacency(4, [0, 1, 2, 2, 3], [1, 0, 2, 3, 2], [1.0, 3.0, 5.0, 1.0, 2.0])
+    assert A.toarray().tolist() == [[0, 3, 0, 0], [3, 0, 0, 0], [0, 0, 0, 2], [0, 0, 2, 0]]
+
+
+def test_matrix_graph_config_matches_edge_list():
+    edges = [(i, (i + d) % 50, 1.0) for i in range(50) for d in (1, 2, -1, -2)]
+    ref = eng.build_laplacian(eng.GraphConfig(nodes=50, edges=edges))
+    for A in (gb.ring_lattice(50), gb.ring_lattice(50).tocoo(), gb.from_edges(50, edges)):
+        assert abs(eng.build_laplacian(eng.GraphConfig(nodes=50, edges=A)) - ref).max() < 1e-12
+
+
+def test_sphere_and_knn_are_geometric():
+    V, F = gb.icosphere(3)
+    A = gb.geodesic_sphere(3)
+    assert A.shape == (642, 642) and gb.edge_count(A) == 30 * 4 ** 3
+    deg = np.diff(A.indptr)
+    assert set(deg) == {5, 6} and (deg == 5).sum() == 12   # the icosahedron's corners stay 5-valent
+    np.testing.assert_allclose(np.linalg.norm(V, axis=1), 1.0)
+    K = gb.knn_graph(V, k=5, weighted=True)
+    assert (K != K.T).nnz == 0 and 0 < K.data.min() and K.data.max() <= 1.0
+    assert np.diff(K.indptr).min() >= 5
+
+
+def test_million_node_ring_builds_without_edge_tuples():
+    t0 = time.perf_counter()
+    A = gb.ring_lattice(1_000_000, 2)
+    built = time.perf_counter() - t0
+    assert A.nnz == 4_000_000 and sp.isspmatrix_csr(A)
+    assert built < 5.0
+    L = eng.build_laplacian(eng.GraphConfig(nodes=1_000_000, edges=A))
+    assert abs(L.diagonal() - 1.0).max() < 1e-12
+
+
+def test_cache_key_of_a_matrix_ignores_its_storage_format():
+    A = gb.torus(8, 8)
+    key = basis_cache.graph_key(64, A, True, 8)
+    assert key == basis_cache.graph_key(64, A.tocoo(), True, 8)
+    assert key != basis_cache.graph_key(64, gb.grid(8, 8), True, 8)
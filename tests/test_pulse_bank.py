@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from signal_form_split_servers_and_configs import engine_runner as er
+from signal_form_split_servers_and_configs.pulse_bank import PulseBank
+
+
+def reference_step(pulses: list, c: np.ndarray) -> None:
+    # the original list-of-dicts implementation
+    for p in list(pulses):
+        c[p["k"]] += p["amp"] * p["ttl"]
+        p["ttl"] *= p["decay"]
+        if p["ttl"] < 1e-3:
+            pulses.remove(p)
+
+
+def test_matches_list_of_dicts_behaviour():
+    rng = np.random.default_rng(0)
+    bank = PulseBank(capacity=4)
+    pulses = []
+    for tick in range(200):
+        for _ in range(rng.integers(0, 6)):
+            k, amp, decay = int(rng.integers(0, 32)), float(rng.uniform(0, 1)), float(rng.uniform(0.5, 0.99))
+            bank.add(k, amp, decay)
+            pulses.append({"k": k, "amp": amp, "decay": decay, "ttl": 1.0})
+        c_bank = np.zeros(32, dtype=np.complex128)
+        c_ref = np.zeros(32, dtype=np.complex128)
+        bank.accumulate(c_bank)
+        reference_step(pulses, c_ref)
+        assert c_bank == pytest.approx(c_ref)
+        assert len(bank) == len(pulses)
+
+
+def test_add_many_and_expiry():
+    bank = PulseBank(capacity=2)
+    bank.add_many([1, 1, 3], amp=[0.5, 0.25, 1.0], decay=0.0)
+    c = np.zeros(4)
+    bank.accumulate(c)
+    assert c.tolist() == [0.0, 0.75, 0.0, 1.0]
+    assert len(bank) == 0
+
+
+def test_thousands_of_pulses_accumulate_in_one_pass():
+    # no wall-clock bound (machine-dependent): the bulk path must add every pulse on every tick
+    bank = PulseBank()
+    k = np.arange(5000) % 32
+    bank.add_many(k, amp=0.5, decay=0.999)
+    c = np.zeros(32, dtype=np.complex128)
+    for _ in range(100):
+        bank.accumulate(c)
+    assert len(bank) == 5000
+    assert c.real == pytest.approx(np.bincount(k) * 0.5 * (1 - 0.999 ** 100) / (1 - 0.999))
+
+
+def test_runner_pulses_are_clamped_and_decay():
+    runner = er.EngineRunner(n=128, K=16)
+    runner.add_pulse(99, 0.8, 0.5)
+    assert runner.pulses.k[0] == 15
+    for _ in range(12):
+        runner.step()
+    assert len(runner.pulses) == 0
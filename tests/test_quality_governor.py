@@ -0,0 +1,89 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from signal_form_split_servers_and_configs import engine_runner as er
+from signal_form_split_servers_and_configs import engine_server as es
+from signal_form_split_servers_and_configs import telemetry_codec as codec
+from signal_form_split_servers_and_configs import topology as tp
+from signal_form_split_servers_and_configs.telemetry_codec import EncodedFrame
+from signal_form_split_servers_and_configs.quality_governor import QualityGovernor
+from signal_form_split_servers_and_configs.telemetry_delta import DeltaDecoder, DeltaEncoder
+
+
+def test_governor_degrades_step_by_step_and_restores_with_hysteresis():
+    gov = QualityGovernor(1 / 60, degrade_after=5, restore_after=20)
+    levels = [gov.observe(0.02) for _ in range(12)]
+    assert levels[3] == 0 and levels[4] == 1 and levels[9] == 2 and levels[11] == 2
+    # in the band between LOW and HIGH nothing moves, however long it lasts
+    assert {gov.observe(0.7 / 60) for _ in range(100)} == {2}
+    assert [gov.observe(0.002) for _ in range(20)][-2:] == [2, 1]
+    # a skipped deadline counts as an overrun even when the tick itself was cheap
+    for _ in range(5):
+        gov.observe(0.001, skipped=1)
+    assert gov.level == 2 and gov.stats()["changes"] == 4
+
+
+def test_quality_levels_reduce_work_and_are_reported(monkeypatch):
+    runner = er.EngineRunner(n=128, K=16)
+    computed = []
+    step = runner.eng.step
+    monkeypatch.setattr(runner.eng, "step",
+                        lambda s, kx=1, ky=2, fields=None: computed.append(fields) or step(s, kx, ky, fields))
+    runner.set_quality(1)
+    tel = runner.step()
+    assert len(tel["c"]) == 8 and tel["quality"] == 1
+
+    runner.set_quality(2)
+    first, second = runner.step(), runner.step()
+    # every analytic field stays at its last values: the engine only advances c
+    assert computed[-1] == [] and er.ANALYTIC_FIELDS == set(er.OUTPUT_FIELDS)
+    assert second["S"] == first["S"] and second["R"] == first["R"] and second["entropy"] == first["entropy"]
+    assert not np.array_equal(second["c"], first["c"])
+    # frozen fields stay in the JSON text for viewers that connect at this level
+    assert runner.held == () and '"lambdas"' in EncodedFrame(second, 2, runner.held).text
+
+    assert runner.build_coarse().n == 64
+    runner.set_quality(4)
+    t0 = runner.t
+    tel = runner.step()
+    assert runner.eng.n == 64 and runner.n == 64 and runner.stride == 2
+    assert tel["time"] == pytest.approx(t0 + runner.dt) and runner.t == pytest.approx(t0 + 2 * runner.dt)
+
+    runner.set_quality(0)
+    tel = runner.step()
+    assert runner.n == 128 and len(tel["c"]) == 16 and tel["quality"] == 0 and runner.held == ()
+
+
+def test_quality_level_travels_in_binary_and_delta_frames():
+    tel = er.EngineRunner(n=128, K=16).step()
+    tel["quality"] = 3
+    assert codec.decode_binary(codec.encode_binary(tel))["quality"] == 3
+    frame = codec.EncodedFrame(tel, 1)
+    frame.encode_delta(DeltaEncoder())
+    assert DeltaDecoder().apply(frame.delta)["quality"] == 3
+    assert np.allclose(codec.decode_binary(frame.binary)["c"], tel["c"], atol=1e-6)
+
+
+def test_server_rebuilds_the_coarse_engine_for_a_new_topology(monkeypatch):
+    runner = er.EngineRunner(n=128, K=16)
+    monkeypatch.setattr(es, "runner", runner)
+    for name in ("coarse_for", "coarse_build"):
+        monkeypatch.setattr(es.app.state, name, None, raising=False)
+
+    async def scenario():
+        runner.set_topology(tp.parse_topology({"kind": "torus", "rows": 12, "cols": 12}))
+        es.set_quality(3)   # the coarse build starts for the ring before the switch lands
+        ring_coarse = await es.app.state.coarse_build
+        await asyncio.wrap_future(runner._next_topology)
+        runner.step()
+        assert runner.topology["kind"] == "torus" and runner.coarse is None and runner.eng.n == 144
+        es.set_quality(3)   # what the tick loop does once it sees the new topology
+        assert es.app.state.coarse_for is runner.topology
+        coarse = await es.app.state.coarse_build
+        await asyncio.sleep(0)   # the build's done callback switches level 3 onto it
+        return ring_coarse, coarse
+
+    ring_coarse, coarse = asyncio.run(scenario())
+    assert ring_coarse.n == 64 and coarse is runner.coarse and runner.eng is coarse and coarse.n < 144
@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import pytest
+import websockets
+from fastapi.testclient import TestClient
+
+from signal_form_split_servers_and_configs import engine_server as es
+from signal_form_split_servers_and_configs import relay_server as rs
+from signal_form_split_servers_and_configs import telemetry_codec as codec
+from signal_form_split_servers_and_configs.frame_ring import FrameRing
+
+
+@pytest.fixture
+def fresh_server(monkeypatch):
+    runner = es.EngineRunner(n=128, K=16)
+    monkeypatch.setattr(es, "runner", runner)
+    monkeypatch.setattr(es, "ring", FrameRing(es.RING_CAPACITY))
+    return runner
+
+
+def test_frame_time_reads_both_encodings_without_decoding():
+    frame = codec.EncodedFrame({"time": 1.25, "pmw": 0.5, "c": [0.0, 1.0]}, seq=7)
+    assert rs.frame_time(frame.binary) == 1.25
+    assert rs.frame_time(frame.text) == 1.25
+    assert rs.frame_time(json.dumps({"type": "ack", "tick": 3, "time": 1.0})) is None
+
+
+def test_relay_chain_passes_frames_through_unchanged(fresh_server):
+    async def scenario():
+        engine = await rs.serve(es.app)
+        relay_a = rs.Relay(engine.url)
+        a = await rs.serve(rs.make_app(relay_a))
+        relay_b = rs.Relay(a.url)
+        b = await rs.serve(rs.make_app(relay_b))
+        got = [{} for _ in range(3)]
+
+        async def listen(i, url):
+            async with websockets.connect(url, subprotocols=[codec.BINARY_SUBPROTOCOL]) as ws:
+                while True:
+                    payload = await ws.recv()
+                    got[i][codec.decode_binary(payload)["seq"]] = payload
+
+        tasks = [asyncio.create_task(listen(i, s.url)) for i, s in enumerate((engine, a, b))]
+        try:
+            while len(got[0].keys() & got[1].keys() & got[2].keys()) < 10:
+                await asyncio.sleep(0.01)
+            hops = await rs.measure_hops([engine.url, a.url, b.url], frames=30)
+            with pytest.raises(websockets.exceptions.InvalidStatus):
+                async with websockets.connect(a.url):   # JSON viewer on an f32 relay
+                    pass
+            assert relay_b.upstream == a.url
+            return got, hops, relay_a.stats(), relay_b.stats()
+        finally:
+            for t in tasks:
+                t.cancel()
+            for r in (relay_b, relay_a):
+                await r.stop()
+            for s in (b, a, engine):
+                s.should_exit = True
+                await s.task
+            await es.stop_tick()
+
+    got, hops, stats_a, stats_b = asyncio.run(asyncio.wait_for(scenario(), 30))
+    for seq in got[0].keys() & got[1].keys() & got[2].keys():
+        assert got[0][seq] == got[1][seq] == got[2][seq]
+    assert len(hops) == 2 and all(0 <= h < 0.05 for h in hops)
+    assert stats_a["connected"] and stats_a["frames"] > 0 and stats_a["viewers"] >= 1
+    assert stats_b["connected"] and stats_b["lag_ms"] >= 0 and stats_b["dropped"] >= 0
+
+
+def test_relay_reports_stats_before_upstream_connects():
+    relay = rs.Relay("ws://127.0.0.1:9/telemetry", fmt="json")
+    with TestClient(rs.make_app(relay)) as client:
+        stats = client.get("/relay").json()
+        assert stats["format"] == "json" and not stats["connected"] and stats["age_ms"] is None
+        assert client.get("/connections").json() == []
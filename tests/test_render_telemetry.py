@@ -0,0 +1,43 @@
+import json
+
+import numpy as np
+import pytest
+
+from signal_form_split_servers_and_configs import engine_server as es
+from signal_form_split_servers_and_configs import render_telemetry as rt
+
+
+def test_render_matches_live_ticks_and_is_worker_independent(tmp_path):
+    one = rt.render(str(tmp_path / "one"), duration=200 * es.FPS ** -1, n=64, K=16,
+                    chunk_frames=80, block=32, workers=1)
+    two = rt.render(str(tmp_path / "two"), duration=200 * es.FPS ** -1, n=64, K=16,
+                    chunk_frames=80, block=32, workers=2)
+    assert [c["frames"] for c in one["chunks"]] == [80, 80, 40]
+    assert json.load(open(tmp_path / "one" / rt.MANIFEST))["fields"]["c"] == [16]
+
+    a = rt.RenderReader(str(tmp_path / "one")).load()
+    b = rt.RenderReader(str(tmp_path / "two")).load()
+    assert a["frame"].tolist() == list(range(200))
+    assert all(np.array_equal(a[k], b[k]) for k in a)
+
+    # the first chunk starts cold, exactly like a freshly started server
+    runner = es.EngineRunner(n=64, K=16)
+    live = [runner.step() for _ in range(80)]
+    assert a["c"][:80] == pytest.approx(np.array([f["c"] for f in live]), abs=1e-12)
+    assert a["entropy"][:80] == pytest.approx([f["entropy"] for f in live], abs=1e-12)
+    # later chunks start from a warm-up, so they continue the live run seamlessly
+    live += [runner.step() for _ in range(120)]
+    assert a["c"][80:] == pytest.approx(np.array([f["c"] for f in live[80:]]), abs=1e-6)
+
+
+def test_reader_time_ranges_and_telemetry_frames(tmp_path):
+    rt.render(str(tmp_path), duration=1.0, n=64, K=16, chunk_frames=25)
+    reader = rt.RenderReader(str(tmp_path))
+    cols = reader.load(0.5, 0.6, fields=["time", "R"])
+    assert set(cols) == {"time", "R"}
+    assert cols["time"][0] == pytest.approx(0.5) and cols["time"][-1] <= 0.6
+    frames = reader.frames(t0=0.9)
+    first = next(frames)
+    assert first["time"] == pytest.approx(0.9)
+    assert set(first) == set(es.runner.step())
+    assert len(list(frames)) == 59 - 54
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from signal_form_split_servers_and_configs.send_queue import ConnectionSender, SendQueueClosed
+
+
+class SlowWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.gate = asyncio.Event()
+
+    async def send_text(self, payload):
+        await self.gate.wait()
+        self.sent.append(payload)
+
+    async def send_bytes(self, payload):
+        await self.send_text(payload)
+
+
+class BrokenWebSocket:
+    async def send_text(self, payload):
+        raise RuntimeError("socket closed")
+
+
+def test_slow_link_drops_oldest_frames_but_keeps_events():
+    async def scenario():
+        ws = SlowWebSocket()
+        sender = ConnectionSender(ws, frames=2, name="wifi").start()
+        sender.offer("frame0")
+        await asyncio.sleep(0)              # writer takes frame0 and blocks on the socket
+        for i in range(1, 10):
+            sender.offer(f"frame{i}")      # producer never waits on the socket
+        sender.put("join")
+        sender.put("leave")
+        ws.gate.set()
+        while sender.stats()["queued_frames"] or sender.stats()["queued_events"]:
+            await asyncio.sleep(0)
+        await sender.close()
+        return ws.sent, sender.stats()
+
+    sent, stats = asyncio.run(scenario())
+    # frame0 was already in flight; events jump the frame queue; only the newest frames survive
+    assert sent == ["frame0", "join", "leave", "frame8", "frame9"]
+    assert stats["dropped"] == 7 and stats["sent"] == 5 and stats["name"] == "wifi"
+
+
+def test_writer_failure_surfaces_to_producers():
+    async def scenario():
+        sender = ConnectionSender(BrokenWebSocket()).start()
+        sender.offer("frame")
+        await asyncio.sleep(0)
+        with pytest.raises(SendQueueClosed):
+            sender.offer("next")
+        with pytest.raises(SendQueueClosed):
+            sender.put("event")
+
+    asyncio.run(scenario())
+
+
+def test_event_overflow_closes_the_link():
+    async def scenario():
+        ws = SlowWebSocket()
+        sender = ConnectionSender(ws, events=3).start()
+        for i in range(3):
+            sender.put(str(i))
+        with pytest.raises(SendQueueClosed):
+            sender.put("one too many")
+        await asyncio.sleep(0)
+        assert sender.closed
+
+    asyncio.run(scenario())
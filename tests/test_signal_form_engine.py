@@ -0,0 +1,208 @@
+import numpy as np
+import pytest
+
+from signal_form_split_servers_and_configs import basis_cache, chebyshev
+from signal_form_split_servers_and_configs import engine as eng
+from signal_form_split_servers_and_configs import engine_server as es
+from signal_form_split_servers_and_configs import graph_builder as gb
+
+
+def make_engine(n: int = 256, K: int = 16, **kwargs) -> eng.SignalFormEngine:
+    gcfg = eng.GraphConfig(nodes=n, edges=gb.ring_lattice(n), normalized=True)
+    return eng.SignalFormEngine(gcfg, eng.EngineConfig(K=K, **kwargs))
+
+
+def test_normalized_laplacian_is_symmetric_with_unit_diagonal():
+    L = eng.build_laplacian(eng.GraphConfig(nodes=64, edges=gb.ring_lattice(64)))
+    assert abs(L - L.T).max() < 1e-12
+    assert np.allclose(L.diagonal(), 1.0)
+    assert np.allclose(L @ np.ones(64), 0.0)
+
+
+def test_undirected_edge_lists_are_mirrored():
+    L = eng.build_laplacian(eng.GraphConfig(nodes=3, edges=[(0, 1, 1.0), (1, 2, 1.0)], normalized=False))
+    assert np.allclose(L.toarray(), [[1, -1, 0], [-1, 2, -1], [0, -1, 1]])
+
+
+@pytest.mark.parametrize("solver", ["lanczos", "lobpcg"])
+def test_partial_eigensolvers_match_dense(solver):
+    L = eng.build_laplacian(eng.GraphConfig(nodes=1500, edges=gb.ring_lattice(1500)))
+    w_dense, _ = eng.lowest_modes(L, 12, "dense")
+    w, V = eng.lowest_modes(L, 12, solver)
+    assert np.allclose(w, w_dense, atol=1e-6)
+    assert np.allclose(V.T @ V, np.eye(12), atol=1e-5)
+
+
+def test_step_projects_onto_modes_and_reports_telemetry():
+    engine = make_engine(smooth=0.0)
+    tel = engine.step(engine.modes[:, 3] * 2.0)
+
+    assert len(tel["c"]) == engine.K
+    assert tel["c"][3] == pytest.approx(2.0)
+    assert tel["S"]["U"] == pytest.approx(1.0)
+    assert 0.0 <= tel["entropy"] <= 1.0
+    assert tel["lambdas"] == pytest.approx(engine.lambdas[:8].tolist())
+    assert tel["stokes"]["pair"] == [1, 2]
+
+
+def test_resonance_tracks_consecutive_frames():
+    engine = make_engine(smooth=0.0)
+    field = engine.modes[:, 1] + engine.modes[:, 5]
+    engine.step(field)
+    assert engine.step(field)["R"] == pytest.approx(1.0)
+    assert engine.step(-field)["R"] == pytest.approx(0.0)
+
+
+def test_rejects_signal_of_wrong_length():
+    engine = make_engine(n=128)
+    with pytest.raises(ValueError):
+        engine.step(np.zeros(64))
+
+
+def test_runner_uses_real_engine():
+    runner = es.EngineRunner(n=128, K=16)
+    assert isinstance(runner.eng, eng.SignalFormEngine)
+    tel = runner.step()
+    assert len(tel["c"]) == 16
+    assert tel["pmw"] == pytest.approx(0.5)
+
+
+def test_eigenbasis_cache_round_trips_through_mmap(tmp_path):
+    cold = make_engine(n=300, K=12, cache_dir=str(tmp_path))
+    assert len(list(tmp_path.glob("*.npy"))) == 2
+
+    warm = make_engine(n=300, K=12, cache_dir=str(tmp_path))
+    assert isinstance(warm._basis_T, np.memmap)
+    assert np.array_equal(np.asarray(warm.lambdas), np.asarray(cold.lambdas))
+    signal = np.random.default_rng(1).standard_normal(300)
+    assert warm.step(signal)["c"] == pytest.approx(cold.step(signal)["c"])
+
+
+def test_eigenbasis_cache_key_covers_topology_and_K():
+    edges = gb.ring_lattice(32)
+    key = basis_cache.graph_key(32, edges, True, 8)
+    assert key == basis_cache.graph_key(32, edges.tocoo(), True, 8)
+    assert key != basis_cache.graph_key(32, edges, True, 9)
+    assert key != basis_cache.graph_key(32, edges, False, 8)
+    assert key != basis_cache.graph_key(32, gb.ring_lattice(32, k=3), True, 8)
+
+
+def test_incomplete_cache_entry_is_recomputed(tmp_path):
+    make_engine(n=200, K=8, cache_dir=str(tmp_path))
+    next(tmp_path.glob("*.lambdas.npy")).unlink()
+    engine = make_engine(n=200, K=8, cache_dir=str(tmp_path))
+    assert engine.K == 8
+    assert len(list(tmp_path.glob("*.lambdas.npy"))) == 1
+
+
+def test_heat_kernel_matches_truncated_matrix_exponential():
+    engine = make_engine(n=128, K=16)
+    t = 5.0
+    Phi = np.asarray(engine.modes)
+    expected = Phi @ np.diag(np.exp(-t * np.asarray(engine.lambdas))) @ Phi.T[:, 7]
+    assert engine.heat_kernel(7, t) == pytest.approx(expected, abs=1e-10)
+
+
+def test_heat_filters_are_memoized_and_bounded(monkeypatch):
+    engine = make_engine(n=128, K=16)
+    g1, r1 = engine.heat_filter(3, 0.5)
+    g2, r2 = engine.heat_filter(3, 0.5)
+    assert g1 is g2 and r1 == r2 > 0.0
+    for x0 in range(eng.HEAT_CACHE_SIZE + 5):
+        engine.heat_filter(x0, 0.5)
+    assert len(engine._heat) == eng.HEAT_CACHE_SIZE
+    assert len(engine._dist) <= eng.DISTANCE_CACHE_SIZE
+
+
+def test_green_block_follows_set_heat():
+    engine = make_engine(n=128, K=16)
+    engine.set_heat(x0=500, t=-1.0)
+    assert (engine.cfg.x0, engine.cfg.t_heat) == (127, 0.0)
+    engine.set_heat(x0=10, t=40.0)
+    green = engine.step(np.zeros(128))["green"]
+    assert green["x0"] == 10 and green["t"] == 40.0
+    assert green["summary"]["radius"] == pytest.approx(engine.heat_filter(10, 40.0)[1])
+
+
+def test_control_endpoint_updates_heat_parameters(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    runner = es.EngineRunner(n=128, K=16)
+    monkeypatch.setattr(es, "runner", runner)
+    response = TestClient(es.app).post("/control", json={"set": {"t_heat": 2.5, "x0": 9}})
+    assert response.status_code == 200
+    runner.step()   # commands land at the next tick boundary
+    assert (runner.eng.cfg.x0, runner.eng.cfg.t_heat) == (9, 2.5)
+
+
+def test_chebyshev_moments_match_dense_recurrence():
+    L = eng.build_laplacian(eng.GraphConfig(nodes=60, edges=gb.ring_lattice(60)))
+    Ls = chebyshev.scaled_operator(L, 2.0)
+    s = np.random.default_rng(2).standard_normal(60)
+    D = Ls.toarray()
+    T = [np.eye(60), D]
+    for _ in range(9):
+        T.append(2.0 * D @ T[-1] - T[-2])
+    assert chebyshev.moments(Ls, s, 10) == pytest.approx([s @ Tj @ s for Tj in T], rel=1e-9, abs=1e-9)
+
+
+def test_chebyshev_backend_is_selected_by_config_and_keeps_contract():
+    gcfg = eng.GraphConfig(nodes=400, edges=gb.ring_lattice(400))
+    cheb = eng.create_engine(gcfg, eng.EngineConfig(K=8, backend="chebyshev", cheb_order=96))
+    assert isinstance(cheb, eng.ChebyshevEngine)
+    assert not hasattr(cheb, "modes")
+
+    s = np.random.default_rng(3).standard_normal(400)
+    # the bands tile the whole spectrum, so their energies add up to |s|^2
+    assert cheb.band_energies(s).sum() == pytest.approx(s @ s, rel=1e-2)
+    tel = cheb.step(s)
+    assert set(tel) == set(make_engine(n=64, K=8).step(np.zeros(64)))
+    assert len(tel["c"]) == 8 and tel["green"]["summary"]["radius"] > 0.0
+
+    with pytest.raises(ValueError):
+        eng.create_engine(gcfg, eng.EngineConfig(backend="bogus"))
+
+
+def test_chebyshev_heat_kernel_matches_expm():
+    from scipy.sparse.linalg import expm_multiply
+
+    gcfg = eng.GraphConfig(nodes=300, edges=gb.ring_lattice(300))
+    cheb = eng.ChebyshevEngine(gcfg, eng.EngineConfig(K=8, cheb_order=48))
+    e = np.zeros(300); e[11] = 1.0
+    assert cheb.heat_kernel(11, 3.0) == pytest.approx(expm_multiply(-3.0 * cheb.L, e), abs=1e-10)
+
+
+def test_runner_accepts_chebyshev_backend():
+    runner = es.EngineRunner(n=256, K=16, backend="chebyshev")
+    assert isinstance(runner.eng, eng.ChebyshevEngine)
+    assert "c" in runner.step()
+
+
+@pytest.mark.parametrize("backend", ["eigen", "chebyshev"])
+def test_step_block_matches_sequential_steps(backend):
+    gcfg = eng.GraphConfig(nodes=96, edges=gb.ring_lattice(96))
+    ecfg = lambda: eng.EngineConfig(K=12, backend=backend, cheb_order=32)
+    S = np.random.default_rng(4).standard_normal((40, 96))
+    seq, block = eng.create_engine(gcfg, ecfg()), eng.create_engine(gcfg, ecfg())
+    seq.step(S[0]); block.step_block(S[:1])      # carried state across the block boundary too
+    frames = [seq.step(s) for s in S[1:]]
+    cols = block.step_block(S[1:])
+    assert cols["c"] == pytest.approx(np.array([f["c"] for f in frames]), abs=1e-12)
+    for key in ("entropy", "R"):
+        assert cols[key] == pytest.approx([f[key] for f in frames], abs=1e-12)
+    assert cols["S.F"] == pytest.approx([f["S"]["F"] for f in frames], abs=1e-12)
+    assert cols["stokes.S3"] == pytest.approx([f["stokes"]["S3"] for f in frames], abs=1e-12)
+    assert cols["green.radius"][-1] == pytest.approx(frames[-1]["green"]["summary"]["radius"])
+    assert block.step(S[0])["c"] == pytest.approx(seq.step(S[0])["c"], abs=1e-12)
+
+
+def test_step_computes_only_requested_fields():
+    full, part = make_engine(), make_engine()
+    rng = np.random.default_rng(3)
+    for _ in range(3):
+        s = rng.standard_normal(full.n)
+        a = full.step(s)
+        b = part.step(s, fields=("entropy",))
+    assert set(b) == {"c", "entropy"}
+    # smoothing and running power advance regardless of what was reported
+    assert b["c"] == pytest.approx(a["c"]) and b["entropy"] == pytest.approx(a["entropy"])
@@ -0,0 +1,99 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from signal_form_split_servers_and_configs import engine_server as es
+from signal_form_split_servers_and_configs import telemetry_codec as codec
+
+
+def sample_frame() -> dict:
+    runner = es.EngineRunner(n=128, K=16)
+    runner.step()
+    return runner.step()
+
+
+def assert_close_tree(actual, expected):
+    if isinstance(expected, dict):
+        assert set(actual) == set(expected)
+        for key in expected:
+            assert_close_tree(actual[key], expected[key])
+    elif isinstance(expected, (list, tuple)):
+        assert len(actual) == len(expected)
+        for a, e in zip(actual, expected):
+            assert_close_tree(a, e)
+    elif isinstance(expected, float):
+        assert actual == pytest.approx(expected, rel=1e-6, abs=1e-12)
+    else:
+        assert actual == expected
+
+
+def test_fast_path_matches_json_dumps_at_float32_precision():
+    tel = sample_frame()
+    text = codec.encode_json(tel)
+    assert text.startswith('{"c":[')
+    assert_close_tree(json.loads(text), json.loads(codec.dumps(tel)))
+
+
+def test_fast_path_accepts_numpy_values_and_keeps_time_resolution():
+    tel = sample_frame()
+    tel["c"] = np.asarray(tel["c"])
+    tel["lambdas"] = np.asarray(tel["lambdas"], dtype=np.float32)
+    tel["entropy"] = np.float64(tel["entropy"])
+    tel["time"] = 7200.0 + 1.0 / 60.0
+    decoded = json.loads(codec.encode_json(tel))
+    assert decoded["c"] == pytest.approx(tel["c"].tolist(), rel=1e-6)
+    assert decoded["time"] == pytest.approx(tel["time"], abs=1e-6)
+
+
+def test_extra_keys_and_non_finite_values_fall_back_to_json():
+    tel = sample_frame()
+    tel["type"] = "telemetry"
+    tel["collaboration"] = {"users_count": 2}
+    decoded = json.loads(codec.encode_json(tel))
+    assert decoded["type"] == "telemetry"
+    assert decoded["collaboration"] == {"users_count": 2}
+
+    tel["R"] = math.nan
+    assert '"R":NaN' in codec.encode_json(tel)
+
+    stub = {"S": {"U": 0.5}, "entropy": np.float64(0.4), "lambdas": np.zeros(2)}
+    assert json.loads(codec.encode_json(stub)) == {"S": {"U": 0.5}, "entropy": 0.4, "lambdas": [0.0, 0.0]}
+
+
+def test_encoded_frame_encodes_once_and_caches_variants(monkeypatch):
+    calls = []
+    real = codec.encode_json
+    monkeypatch.setattr(codec, "encode_json", lambda tel: calls.append(1) or real(tel))
+
+    frame = codec.EncodedFrame(sample_frame())
+    assert frame.text is frame.text
+    a = frame.text_with(("s1", 2), {"type": "telemetry", "session_id": "s1"})
+    assert frame.text_with(("s1", 2), {"type": "telemetry", "session_id": "s1"}) is a
+    assert json.loads(a)["session_id"] == "s1"
+    assert len(calls) == 1
+
+
+def test_binary_frames_round_trip_at_float32():
+    tel = sample_frame()
+    data = codec.encode_binary(tel, seq=42)
+    assert data[:4] == codec.BINARY_MAGIC
+    assert len(data) == codec.BINARY_HEADER.size + 4 * (len(codec.BINARY_SCALARS) + 16 + 8)
+
+    out = codec.decode_binary(data)
+    assert out["seq"] == 42
+    assert out["time"] == tel["time"]
+    assert out["c"].dtype == np.float32
+    assert out["c"] == pytest.approx(np.asarray(tel["c"]), rel=1e-6, abs=1e-7)
+    assert out["lambdas"] == pytest.approx(np.asarray(tel["lambdas"]), rel=1e-6, abs=1e-7)
+    assert out["stokes"]["pair"] == [1, 2]
+    assert out["S"]["U"] == pytest.approx(tel["S"]["U"], rel=1e-6)
+    assert out["pmw"] == pytest.approx(tel["pmw"])
+
+
+def test_binary_decoder_rejects_unknown_versions():
+    data = bytearray(codec.encode_binary(sample_frame()))
+    data[4] = 99
+    with pytest.raises(ValueError):
+        codec.decode_binary(bytes(data))
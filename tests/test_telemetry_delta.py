@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from signal_form_split_servers_and_configs import engine_runner as er
+from signal_form_split_servers_and_configs import engine_server as es
+from signal_form_split_servers_and_configs import telemetry_codec as codec
+from signal_form_split_servers_and_configs import telemetry_delta as delta
+from signal_form_split_servers_and_configs.frame_ring import FrameRing
+
+
+def run_frames(count: int, n: int = 128, K: int = 16, pulses: bool = False):
+    runner = er.EngineRunner(n=n, K=K)
+    frames = []
+    for i in range(count):
+        if pulses and i % 40 == 20:
+            runner.apply([("pulse", i % K, 0.8, 0.95)])
+        frames.append(runner.step())
+    return frames
+
+
+def test_decoder_tracks_encoder_within_epsilon():
+    frames = run_frames(240, pulses=True)
+    encoder = delta.DeltaEncoder(keyframe_interval=30)
+    decoder = delta.DeltaDecoder()
+    states = []
+    for seq, tel in enumerate(frames, start=1):
+        payload, _ = encoder.encode(tel, seq)
+        state = decoder.apply(payload)
+        assert state["seq"] == seq
+        assert state["pmw"] == pytest.approx(tel["pmw"], rel=1e-3)
+        assert state["stokes"]["pair"] == tel["stokes"]["pair"]
+        assert state["time"] == tel["time"]
+        states.append(state)
+
+    def worst(get):
+        # round-trip error relative to the largest magnitude the field reached
+        sent = np.array([np.asarray(get(t), dtype=np.float64) for t in frames])
+        got = np.array([np.asarray(get(s), dtype=np.float64) for s in states])
+        return np.abs(got - sent).max() / np.abs(sent).max()
+
+    assert worst(lambda t: t["c"]) < 1e-3
+    assert worst(lambda t: t["lambdas"][1]) < 1e-3   # the smallest nonzero eigenvalue, ~1e-3
+    assert worst(lambda t: t["entropy"]) < 1e-3
+    for k in ("U", "F", "blend"):
+        assert worst(lambda t: t["S"][k]) < 1e-3
+    for k in ("S0", "S1", "S2", "S3"):   # S3 is ~50x smaller than S0
+        assert worst(lambda t: t["stokes"][k]) < 1e-3
+
+
+def test_deltas_are_much_smaller_than_json():
+    frames = run_frames(240)
+    encoder = delta.DeltaEncoder()
+    delta_bytes = sum(len(encoder.encode(tel, i)[0]) for i, tel in enumerate(frames, start=1))
+    json_bytes = sum(len(codec.encode_json(tel)) for tel in frames)
+    assert json_bytes / delta_bytes > 4
+
+
+def test_gap_requires_keyframe():
+    frames = run_frames(30)   # past the start-up ramp, whose growing fields force early rescaling keyframes
+    encoder = delta.DeltaEncoder()
+    payloads = [encoder.encode(tel, i) for i, tel in enumerate(frames, start=1)][-6:]
+    decoder = delta.DeltaDecoder()
+    assert decoder.apply(delta.keyframe_from_snapshot(payloads[0][1], 25, frames[24]["time"])) is not None
+    assert decoder.apply(payloads[2][0]) is None          # seq 26 was lost
+    assert decoder.needs_keyframe
+    assert decoder.apply(payloads[3][0]) is None          # still waiting
+    key = delta.keyframe_from_snapshot(payloads[4][1], 29, frames[28]["time"])
+    assert decoder.apply(key)["seq"] == 29
+    assert decoder.apply(payloads[5][0])["seq"] == 30
+
+
+def test_large_source_node_survives_quantization():
+    tel = run_frames(1)[0]
+    tel["green"] = dict(tel["green"], x0=123456)
+    payload, _ = delta.DeltaEncoder().encode(tel, 1)
+    assert delta.DeltaDecoder().apply(payload)["green"]["x0"] == 123456
+
+
+def test_server_streams_delta_frames(monkeypatch):
+    monkeypatch.setattr(es, "runner", er.EngineRunner(n=128, K=16))
+    monkeypatch.setattr(es, "ring", FrameRing(es.RING_CAPACITY))
+    monkeypatch.setattr(es, "delta_encoder", delta.DeltaEncoder())
+    decoder = delta.DeltaDecoder()
+    with TestClient(es.app) as client:
+        with client.websocket_connect("/telemetry", subprotocols=[delta.DELTA_SUBPROTOCOL]) as ws:
+            assert ws.accepted_subprotocol == delta.DELTA_SUBPROTOCOL
+            first = decoder.apply(ws.receive_bytes())
+            assert first is not None                       # late joiners start on a keyframe
+            for _ in range(5):
+                assert decoder.apply(ws.receive_bytes())["seq"] == decoder.seq
+            ws.send_json({"type": "keyframe"})
+            for _ in range(10):
+                data = ws.receive_bytes()
+                if data[5] & delta.FLAG_KEYFRAME:
+                    break
+            else:
+                pytest.fail("keyframe request was not honoured")
@@ -0,0 +1,111 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from signal_form_split_servers_and_configs import engine_server as es
+from signal_form_split_servers_and_configs import replay_server as rp
+from signal_form_split_servers_and_configs import telemetry_codec as codec
+from signal_form_split_servers_and_configs import telemetry_delta as delta
+from signal_form_split_servers_and_configs import telemetry_log as tlog
+from signal_form_split_servers_and_configs.frame_ring import FrameRing
+
+
+@pytest.fixture
+def recording(tmp_path):
+    path = str(tmp_path / "show.sflog")
+    runner = es.EngineRunner(n=128, K=16)
+    log = tlog.LogWriter(path, index_every=10)
+    for seq in range(1, 301):
+        log.append(seq, runner.t, codec.EncodedFrame(runner.step(), seq).text.encode())
+    log.close()
+    return path
+
+
+def test_index_seeks_and_truncated_tail_is_ignored(recording):
+    reader = tlog.LogReader(recording)
+    assert len(reader._offsets) == 30
+    seq, t, payload = next(reader.frames(2.0))
+    assert t == pytest.approx(2.0) and seq == 121
+    assert json.loads(bytes(payload))["time"] == pytest.approx(t)
+    reader.close()
+
+    with open(recording, "ab") as fh:
+        fh.write(tlog.RECORD.pack(500, 301, 5.0, 5.0) + b"{")   # crash mid-record
+    open(recording + ".idx", "wb").close()                  # and lost the index
+    reader = tlog.LogReader(recording)
+    frames = list(reader.frames())
+    assert len(frames) == 300 and frames[-1][0] == 300
+    assert len(reader._offsets) == 300 // tlog.INDEX_EVERY   # index rebuilt from the record headers
+    assert next(reader.frames(2.5))[0] == 151
+    reader.close()
+
+
+def test_restart_rotates_and_seeks_keep_the_record_clock_monotonic(recording, tmp_path):
+    log = tlog.LogWriter(recording, index_every=2)   # a restarted server reopens the same path
+    assert log.rotated == str(tmp_path / "show.1.sflog")
+    dt = 1.0 / 60
+    times = [10 + i * dt for i in range(10)] + [1 + i * dt for i in range(10)]   # seek back to t=1
+    for seq, t in enumerate(times, 1):
+        log.append(seq, t, b"{}")
+    log.close()
+
+    assert [f[0] for f in tlog.LogReader(log.rotated).frames()] == list(range(1, 301))
+    reader = tlog.LogReader(recording)
+    clocks = [clock for _, clock, _ in reader.frames()]
+    assert len(clocks) == 20 and clocks[0] == pytest.approx(10.0)
+    assert clocks[-1] == pytest.approx(10 + 19 * dt) and sorted(clocks) == clocks
+    seq, clock, _ = next(reader.frames(10 + 12.5 * dt))
+    assert seq == 14 and clock == pytest.approx(10 + 13 * dt)
+    reader.close()
+
+
+def test_engine_server_tees_frames_into_the_log(tmp_path, monkeypatch):
+    path = str(tmp_path / "live.sflog")
+    monkeypatch.setattr(es, "RECORD_PATH", path)
+    monkeypatch.setattr(es, "runner", es.EngineRunner(n=128, K=16))
+    monkeypatch.setattr(es, "ring", FrameRing(es.RING_CAPACITY))
+    with TestClient(es.app) as client:
+        with client.websocket_connect("/telemetry") as ws:
+            sent = [ws.receive_text() for _ in range(5)]
+    recorded = [bytes(p).decode() for _, _, p in tlog.LogReader(path).frames()]
+    assert set(sent) <= set(recorded)
+
+
+def test_replay_serves_the_telemetry_protocol_with_speed_and_seek(recording, monkeypatch):
+    monkeypatch.setattr(rp, "source", rp.ReplaySource(recording))
+    client = TestClient(rp.app)
+    with client.websocket_connect("/telemetry?speed=8&t=1.0") as ws:
+        times = [ws.receive_json()["time"] for _ in range(20)]
+        ws.send_json({"type": "replay", "seek": 4.5, "speed": 100})
+        state = next(m for m in iter(ws.receive_json, None) if m.get("type") == "replay_state")
+        after = next(m for m in iter(ws.receive_json, None) if m.get("time", 0) >= 4.5)
+    assert times[0] == pytest.approx(1.0)
+    assert times == sorted(times) and len(set(times)) == 20
+    assert state["speed"] == rp.MAX_SPEED and state["time"] >= 4.5
+    assert after["time"] == pytest.approx(4.5)
+
+    with client.websocket_connect("/telemetry?t=4.9&speed=8", subprotocols=[codec.BINARY_SUBPROTOCOL]) as ws:
+        first = codec.decode_binary(ws.receive_bytes())
+        end = next(m for m in iter(ws.receive, None) if "text" in m)
+    assert first["time"] == pytest.approx(4.9) and first["seq"] == 1
+    assert json.loads(end["text"])["ended"] is True
+
+    with client.websocket_connect("/telemetry?t=4.9&speed=8&loop=1", subprotocols=[delta.DELTA_SUBPROTOCOL]) as ws:
+        dec = delta.DeltaDecoder()
+        states, resyncs, gap = [], [], False
+        for _ in range(200):
+            data = ws.receive_bytes()
+            state = dec.apply(data)
+            if state is None:
+                gap = True   # the drop-oldest queue evicted a delta at speed 8; the server follows with a keyframe
+                continue
+            if gap:
+                resyncs.append(bool(delta.DELTA_HEADER.unpack_from(data)[2] & delta.FLAG_KEYFRAME))
+                gap = False
+            states.append(state)
+            if len(states) == 12:
+                break
+    times = [s["time"] for s in states]
+    assert len(states) == 12 and all(resyncs)
+    assert times[0] == pytest.approx(4.9) and min(times) == pytest.approx(0.0)   # wrapped around
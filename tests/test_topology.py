@@ -0,0 +1,87 @@
+import threading
+
+import numpy as np
+import pytest
+
+from signal_form_split_servers_and_configs import engine as eng
+from signal_form_split_servers_and_configs import engine_runner as er
+from signal_form_split_servers_and_configs import graph_builder as gb
+from signal_form_split_servers_and_configs import topology as tp
+
+
+def graph(spec):
+    return tp.build_graph(tp.parse_topology(spec))
+
+
+def test_ring_matches_ring_lattice():
+    L = eng.build_laplacian(graph({"kind": "ring", "n": 64}))
+    ref = eng.build_laplacian(eng.GraphConfig(nodes=64, edges=[(i, (i + d) % 64, 1.0)
+                                                               for i in range(64) for d in (1, 2)]))
+    assert abs(L - ref).max() < 1e-12
+
+
+@pytest.mark.parametrize("spec, nodes, edges", [
+    ({"kind": "grid", "rows": 4, "cols": 5}, 20, 4 * 4 + 5 * 3),
+    ({"kind": "torus", "rows": 4, "cols": 5}, 20, 2 * 20),
+    ({"kind": "sphere", "subdivisions": 2}, 162, 30 * 16),
+    ({"kind": "small_world", "n": 50, "k": 3, "p": 0.0}, 50, 150),
+    ({"kind": "knn", "points": np.random.default_rng(0).random((40, 3)).tolist(), "k": 4}, 40, None),
+    ({"kind": "edges", "n": 4, "edges": [[0, 1], [1, 2, 2.0], [2, 3]]}, 4, 3),
+])
+def test_builders_have_expected_size(spec, nodes, edges):
+    g = graph(spec)
+    assert g.nodes == nodes and g.edges.shape == (nodes, nodes)
+    assert edges is None or gb.edge_count(g.edges) == edges
+    assert (g.edges != g.edges.T).nnz == 0 and g.edges.diagonal().max() == 0
+    assert np.diff(g.edges.indptr).min() > 0   # no isolated nodes
+
+
+def test_small_world_rewires_but_stays_simple():
+    A = graph({"kind": "small_world", "n": 200, "k": 2, "p": 0.3, "seed": 1}).edges
+    ring = gb.ring_lattice(200, 2)
+    assert A.diagonal().max() == 0 and A.data.max() == 1.0
+    moved = (A - ring).maximum(0).nnz // 2
+    assert 0 < moved < gb.edge_count(A)
+
+
+@pytest.mark.parametrize("spec", [
+    {"kind": "hexagon"}, {"kind": "ring", "n": 2}, {"kind": "torus", "rows": 2, "cols": 9},
+    {"kind": "sphere", "subdivisions": 12}, {"kind": "small_world", "p": 1.5},
+    {"kind": "edges", "n": 3, "edges": [[0, 3]]}, {"kind": "edges", "n": 3, "edges": []},
+    {"kind": "knn", "points": [[0, 0], [1, 1]]},
+])
+def test_bad_specs_are_rejected_when_parsed(spec):
+    with pytest.raises(ValueError):
+        er.parse_control({"topology": spec})
+
+
+def test_runner_switches_topology_without_stalling_a_tick(monkeypatch):
+    runner = er.EngineRunner(n=128, K=16)
+    gate, released, switched_on_done = threading.Event(), [], []
+    build, switch = runner._build_topology, runner._switch_topology
+
+    def gated_build(spec, with_coarse):
+        released.append(gate.wait(10))   # False only if a step sat waiting on the build
+        return build(spec, with_coarse)
+
+    def checked_switch():
+        switched_on_done.append(runner._next_topology.done())
+        switch()
+
+    monkeypatch.setattr(runner, "_build_topology", gated_build)
+    monkeypatch.setattr(runner, "_switch_topology", checked_switch)
+    runner.commands.push(*er.parse_control({"topology": {"kind": "torus", "rows": 12, "cols": 12}}))
+    frames = [runner.step() for _ in range(10)]   # the build is parked: steps must not wait for it
+    pending = runner._next_topology
+    assert not pending.done() and runner.topology["kind"] == "ring" and runner.eng.n == 128
+    assert all(b["time"] > a["time"] for a, b in zip(frames, frames[1:]))   # frames keep advancing
+    gate.set()
+    pending.result(10)
+    for _ in range(er.TOPOLOGY_FADE + 2):
+        frames.append(runner.step())
+    assert released == [True] and switched_on_done == [True]
+    assert runner.topology["kind"] == "torus" and runner.eng.n == 144 and runner._fade is None
+    assert runner.eng.cfg.cache_dir is None   # runtime graphs never reach the disk basis cache
+    jumps = [np.linalg.norm(b["c"] - a["c"]) for a, b in zip(frames, frames[1:])]
+    assert max(jumps) < 5 * np.median(jumps) + 1e-9   # crossfaded, no step at the switch
+    assert all(len(f["c"]) == 16 for f in frames)